@@ -0,0 +1,238 @@
+import os
+import sys
+import json
+import threading
+
+import datastore
+import attendance_store
+
+# -----------------------------------------------------------
+# Attendance threshold alerts
+# -----------------------------------------------------------
+#
+# The outbox listens to an attendance store. Every counter write hands it the
+# counters before and after, so a crossing is one comparison per threshold:
+#
+#   below      the percentage fell under a threshold it was at or above
+#   recovered  it climbed back to a threshold it was under
+#
+# A subject without classes counts as above every threshold. Crossings are
+# appended to <master>.alerts.jsonl, one JSON object per line with a running
+# "id". An open (roll, subject, threshold) alert is not repeated until the
+# student recovers, so the outbox never holds two "below" lines in a row for
+# the same key.
+#
+# Readers keep a cursor (a byte offset into the outbox) and only read what was
+# appended since; per-user cursors live in <master>.alerts.cursors.json.
+#
+# Thresholds come from EDUTRACK_ALERT_THRESHOLDS, a comma-separated list of
+# percentages (default "75,65"). Whole-document writes are not inspected.
+
+BELOW = "below"
+RECOVERED = "recovered"
+
+
+def _thresholds(raw):
+    out = []
+    for part in str(raw or "").split(","):
+        try:
+            out.append(float(part))
+        except ValueError:
+            continue
+    return tuple(sorted(set(out), reverse=True))
+
+
+THRESHOLDS = _thresholds(os.environ.get("EDUTRACK_ALERT_THRESHOLDS", "75,65")) or (75.0, 65.0)
+
+
+def outbox_path_for(json_path):
+    return os.path.splitext(os.path.abspath(json_path))[0] + ".alerts.jsonl"
+
+
+def crossings(old, new, thresholds=THRESHOLDS):
+    """Yield (threshold, BELOW | RECOVERED) for a percentage change.
+
+    old/new are percentages, or None for a subject without classes.
+    """
+    for t in thresholds:
+        was_below = old is not None and old < t
+        is_below = new is not None and new < t
+        if is_below and not was_below:
+            yield t, BELOW
+        elif was_below and not is_below:
+            yield t, RECOVERED
+
+
+def _pct(counts):
+    working, present = counts
+    return attendance_store.percentage(working, present) if working > 0 else None
+
+
+class AlertOutbox:
+    """JSONL outbox of threshold crossings for one attendance store."""
+
+    def __init__(self, path, store=None, catalogue=None, thresholds=THRESHOLDS):
+        self.path = os.path.abspath(path)
+        self.cursors_path = os.path.splitext(self.path)[0] + ".cursors.json"
+        self.store = store
+        self.catalogue = catalogue
+        self.thresholds = tuple(thresholds)
+        self._lock = threading.Lock()
+        self._open = set()     # (roll, code, threshold) currently below
+        self._offset = 0       # how far _open has been folded from the file
+        self._next_id = 1
+        if store is not None:
+            attendance_store.add_listener(self._on_write)
+
+    def close(self):
+        attendance_store.remove_listener(self._on_write)
+
+    # -- writes ------------------------------------------------------
+
+    def _code(self, key, det):
+        cat = self.catalogue
+        return (cat.resolve(key) if cat else None) or \
+            (cat.resolve(det.get("subject_name")) if cat else None) or key
+
+    def _catch_up(self):
+        """Fold lines other writers appended since the last look."""
+        alerts, self._offset = _read_lines(self.path, self._offset)
+        for a in alerts:
+            key = (a["roll"], a["subject"], a["threshold"])
+            if a["kind"] == BELOW:
+                self._open.add(key)
+            else:
+                self._open.discard(key)
+            self._next_id = max(self._next_id, int(a.get("id", 0)) + 1)
+
+    def _on_write(self, store, events, updated, previous=None):
+        if store is not self.store or events is None or previous is None:
+            return
+        candidates = []
+        for event, det, prev in zip(events, updated, previous):
+            old = _pct(prev)
+            new = _pct(attendance_store.new_counts(*prev, event))
+            for t, kind in crossings(old, new, self.thresholds):
+                candidates.append((event, det, old, new, t, kind))
+        if candidates:
+            self.emit(candidates)
+
+    def emit(self, candidates):
+        """Append the crossings that are not duplicates. Returns the alerts written."""
+        with self._lock, datastore.locked(self.path):
+            self._catch_up()
+            written = []
+            for event, det, old, new, t, kind in candidates:
+                code = self._code(event["subject"], det)
+                key = (event["roll"], code, t)
+                if (kind == BELOW) == (key in self._open):
+                    continue
+                if kind == BELOW:
+                    self._open.add(key)
+                else:
+                    self._open.discard(key)
+                written.append({
+                    "id": self._next_id,
+                    "ts": event.get("ts") or attendance_store.now(),
+                    "kind": kind,
+                    "roll": event["roll"],
+                    "subject": code,
+                    "subject_name": det.get("subject_name") or code,
+                    "section": str(event.get("section") or "").upper(),
+                    "threshold": t,
+                    "previous": old,
+                    "percentage": new,
+                    "teacher": event.get("teacher") or "",
+                })
+                self._next_id += 1
+            if written:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(json.dumps(a) + "\n" for a in written))
+                    datastore.sync(f, self.path)
+                self._offset = os.path.getsize(self.path)
+            return written
+
+    # -- reads -------------------------------------------------------
+
+    def read(self, cursor=0, limit=None):
+        """Return (alerts appended after cursor, new cursor)."""
+        return _read_lines(self.path, cursor, limit)
+
+    def cursor(self, user):
+        try:
+            doc = datastore.load(self.cursors_path, {})
+        except (OSError, ValueError):
+            doc = {}
+        return int(doc.get(user, 0)) if isinstance(doc, dict) else 0
+
+    def set_cursor(self, user, cursor):
+        with datastore.locked(self.cursors_path):
+            doc = datastore.load_fresh(self.cursors_path, {})
+            doc = dict(doc) if isinstance(doc, dict) else {}
+            doc[user] = int(cursor)
+            datastore.save(self.cursors_path, doc)
+
+    def unread(self, user, sections=None, advance=True):
+        """Return the alerts user has not seen, optionally only for sections.
+
+        The user's cursor moves past everything read, filtered out or not.
+        """
+        start = self.cursor(user)
+        alerts, cursor = self.read(start)
+        if sections is not None:
+            wanted = {str(s).upper() for s in sections}
+            alerts = [a for a in alerts if a.get("section") in wanted]
+        if advance and cursor != start:
+            self.set_cursor(user, cursor)
+        return alerts
+
+
+def _read_lines(path, offset=0, limit=None):
+    """Read complete JSONL lines from byte offset. Returns (items, new offset)."""
+    items = []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return items, offset
+    with f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # a writer is mid-line; pick it up next time
+            offset += len(raw)
+            try:
+                items.append(json.loads(raw))
+            except ValueError:
+                continue
+            if limit is not None and len(items) >= limit:
+                break
+    return items, offset
+
+
+_outboxes = {}
+_outboxes_lock = threading.Lock()
+
+
+def watch(store, json_path, catalogue=None):
+    """Return the outbox for the master file at json_path, listening to store."""
+    key = outbox_path_for(json_path)
+    with _outboxes_lock:
+        box = _outboxes.get(key)
+        if box is None or box.store is not store:
+            if box is not None:
+                box.close()
+            box = _outboxes[key] = AlertOutbox(key, store, catalogue)
+        return box
+
+
+def print_alerts(alerts, out=None):
+    out = out or sys.stdout
+    if not alerts:
+        print("No new attendance alerts.", file=out)
+        return
+    print(f"\n--- {len(alerts)} new attendance alert(s) ---", file=out)
+    for a in alerts:
+        arrow = "fell below" if a["kind"] == BELOW else "recovered to"
+        now = "-" if a["percentage"] is None else f"{a['percentage']}%"
+        print(f"  [{a['ts'][:10]}] {a['roll']} ({a['section'] or '-'}) {a['subject']}: "
+              f"{arrow} {a['threshold']:g}% (now {now})", file=out)
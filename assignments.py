@@ -1,7 +1,7 @@
 import os
 import shutil
-import fitz  
-import json
+
+import datastore
 
 SECTIONS_FILE = "sections.json"      
 TEACHER_SECTIONS_FILE = "teachersections.json"  # teacher_name → [sections]
@@ -18,8 +18,7 @@ def submit_assignment(student_id, source_path):
         print("sections.json not found.")
         return
 
-    with open(SECTIONS_FILE, "r") as f:
-        sections = json.load(f)
+    sections = datastore.load(SECTIONS_FILE, {})
 
     student_section = sections.get(student_id)
     if not student_section:
@@ -58,8 +57,7 @@ def view_assignments(teacher_name):
         print("teachersections.json not found.")
         return
 
-    with open(TEACHER_SECTIONS_FILE, "r") as f:
-        teacher_data = json.load(f)
+    teacher_data = datastore.load(TEACHER_SECTIONS_FILE, {})
 
     teacher_sections = teacher_data.get(teacher_name)
     if not teacher_sections:
@@ -94,6 +92,7 @@ def view_pdf_content(pdf_path, page_number=None):
             print("File not found.")
             return
 
+        import fitz  # PyMuPDF, only needed to read PDFs
         doc = fitz.open(pdf_path)
         total_pages = len(doc)
         print(f"\nViewing '{os.path.basename(pdf_path)}' ({total_pages} pages)\n")
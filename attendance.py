@@ -1,9 +1,15 @@
-import json
-import matplotlib.pyplot as plt
-import numpy as np
 import os
+import sys
+import time
 from datetime import datetime
 
+import datastore
+import attendance_store
+import attendance_ledger
+import subject_catalogue
+import roster
+import alerts
+
 ATTENDANCE_MASTER_FILE = "attendance_master.json"
 TEACHER_SECTIONS_FILE = "teachersections.json"
 SECTIONS_FILE = "sections.json"
@@ -17,38 +23,107 @@ def _resolve_path(filename):
 def load_json_file(filename):
     """Load JSON data from file (resolved to project root)"""
     filepath = _resolve_path(filename)
-    if not os.path.exists(filepath):
-        return {}
     try:
-        with open(filepath, "r") as f:
-            return json.load(f)
+        return datastore.load(filepath, {})
     except Exception as e:
         print("Error loading JSON", e)
         return {}
 
 def save_json_file(filename, data):
     """Save JSON data to file (resolved to project root)"""
-    filepath = _resolve_path(filename)
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, "w") as f:
-        json.dump(data, f, indent=2)
+    datastore.save(_resolve_path(filename), data)
+
+
+def get_attendance_store():
+    """Return the configured attendance backend for the master file"""
+    path = _resolve_path(ATTENDANCE_MASTER_FILE)
+    store = attendance_store.get_store(path)
+    alerts.watch(store, path, get_subject_catalogue())
+    return store
+
+def get_alerts():
+    """Return the threshold alert outbox for the master file"""
+    path = _resolve_path(ATTENDANCE_MASTER_FILE)
+    return alerts.watch(attendance_store.get_store(path), path, get_subject_catalogue())
 
+def view_alerts(username, teachername=None):
+    """Print the alerts username has not seen yet (a teacher only sees their sections)"""
+    sections = get_roster().sections_of(teachername) if teachername else None
+    alerts.print_alerts(get_alerts().unread(username, sections))
 
 def load_attendance_master():
-    """Load attendance data from master file"""
-    return load_json_file(ATTENDANCE_MASTER_FILE)
+    """Load attendance data from the configured backend"""
+    try:
+        return get_attendance_store().load()
+    except Exception as e:
+        print("Error loading attendance", e)
+        return {}
 
 def save_attendance_master(data):
-    """Save attendance data to master file"""
+    """Save the whole attendance document to the configured backend"""
     data["metadata"]["last_updated"] = datetime.now().strftime("%Y-%m-%d")
     data["metadata"]["total_students"] = len(data["attendance_records"])
-    save_json_file(ATTENDANCE_MASTER_FILE, data)
+    get_attendance_store().save(data)
+
+def get_ledger():
+    """Return the dated attendance ledger for the master file, seeded from the store"""
+    catalogue = get_subject_catalogue()
+    return attendance_ledger.get_ledger(_resolve_path(ATTENDANCE_MASTER_FILE), load=get_attendance_store().load,
+                                        subject_key=lambda key: catalogue.resolve(key) or key)
+
+def commit_marks(marks, teachername, section, date=None, store=None, ledger=None, period=None):
+    """Record dated marks in the ledger and project them onto the counters.
+
+    marks is a list of (roll, record key, subject code, subject name, present).
+    Without period the marks are a new class that day and each adds a working
+    day. With period they correct that class: an unchanged status changes
+    nothing and a flipped one moves only the present count (see
+    attendance_ledger). Returns the counter events that were applied.
+    """
+    store = store or get_attendance_store()
+    ledger = ledger or get_ledger()
+    date = date or attendance_store.today()
+    ts = f"{date}T{datetime.now().strftime('%H:%M:%S')}"
+    applied = []
+
+    def project(deltas):
+        events = [attendance_store.make_event(roll, key, "add", dw, dp, teacher=teachername,
+                                              subject_name=name, section=section, ts=ts)
+                  for (roll, key, code, name, present), (dw, dp) in zip(marks, deltas) if dw or dp]
+        if events:
+            store.apply(events)
+        applied.extend(events)
+
+    ledger.record([(roll, code, section, date, present, teachername)
+                   for roll, key, code, name, present in marks], apply=project, period=period)
+    return applied
+
+def correct_counts(roll, key, code, name, working, present, teachername, section, store=None, ledger=None):
+    """Set a student's totals for one subject by hand, through the ledger.
+
+    The ledger records the correction so its totals keep matching the
+    counters. Returns the updated subject entry.
+    """
+    store = store or get_attendance_store()
+    ledger = ledger or get_ledger()
+    event = attendance_store.make_event(roll, key, "set", working, present, teacher=teachername,
+                                        subject_name=name, section=section)
+    updated = []
+    ledger.correct(roll, code, section, working, present, teachername,
+                   apply=lambda: updated.extend(store.apply([event])))
+    return updated[0]
+
+def get_subject_catalogue():
+    """Return the subject catalogue for subjects.json"""
+    return subject_catalogue.get_catalogue(_resolve_path(SUBJECTS_FILE))
+
+def get_roster():
+    """Return the section/teacher roster indexes"""
+    return roster.get_roster(_resolve_path(SECTIONS_FILE), _resolve_path(TEACHER_SECTIONS_FILE))
 
 def can_teacher_access_section(teachername, section):
     """Check if teacher is authorized to access this section"""
-    teacher_sections = load_json_file(TEACHER_SECTIONS_FILE)
-    teacher_sections_list = teacher_sections.get(teachername, [])
-    return section.upper() in [s.upper() for s in teacher_sections_list]
+    return get_roster().teaches(teachername, section)
 
 def get_student_section(roll_number):
     """Get section of a student"""
@@ -57,53 +132,104 @@ def get_student_section(roll_number):
 
 def initialize_student_attendance(roll_number, section, subject_names):
     """Initialize attendance record for a new student"""
-    attendance_data = load_attendance_master()
-    subjects_data = load_json_file(SUBJECTS_FILE)
+    store = get_attendance_store()
+    if store.get_record(roll_number) is not None:
+        return
+
+    catalogue = get_subject_catalogue()
     
-    # Create subject name to code mapping
-    subject_name_to_code = {}
-    for subject in subjects_data.get("subjects", []):
-        subject_name_to_code[subject["name"]] = subject["code"]
+    # Initialize all subjects with zero attendance
+    subjects = {}
+    for subject_name in subject_names:
+        subject_code = catalogue.code_for(subject_name)
+        if subject_code:
+            subjects[subject_code] = subject_name
     
-    if roll_number not in attendance_data.get("attendance_records", {}):
-        attendance_data.setdefault("attendance_records", {})[roll_number] = {
-            "name": roll_number,
-            "section": section,
-            "subjects": {}
-        }
-        
-        # Initialize all subjects with zero attendance
-        for subject_name in subject_names:
-            subject_code = subject_name_to_code.get(subject_name)
+    store.ensure_student(roll_number, roll_number, section, subjects, _metadata_defaults(catalogue))
+    print(f"Attendance initialized for student {roll_number} in section {section}")
+
+def _metadata_defaults(catalogue):
+    # Metadata defaults are only used if the document has none yet
+    return {
+        "last_updated": datetime.now().strftime("%Y-%m-%d"),
+        "total_students": 0,
+        "academic_year": "2024-2025",
+        "total_subjects": len(catalogue.subjects())
+    }
+
+def initialize_all_attendance(assignments, section_subjects, store=None):
+    """Seed attendance for every roll -> section pair in one store write.
+
+    Missing students get zeroed records for their section's subjects, existing
+    ones get any missing subjects added and their section brought in line.
+    Returns a stats dict with the rolls created/updated and per-phase timings.
+    """
+    timings = {}
+    t = time.perf_counter()
+    store = store or get_attendance_store()
+    catalogue = get_subject_catalogue()
+    records = store.load().get("attendance_records", {})
+    timings["load"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    wanted_by_section = {}
+    for section, names in section_subjects.items():
+        wanted = {}
+        for subject_name in names if isinstance(names, list) else []:
+            subject_code = catalogue.code_for(subject_name)
             if subject_code:
-                attendance_data["attendance_records"][roll_number]["subjects"][subject_code] = {
-                    "subject_name": subject_name,
-                    "total_working_days": 0,
-                    "total_present_days": 0,
-                    "attendance_percentage": 0.0,
-                    "last_updated": datetime.now().strftime("%Y-%m-%d")
-                }
-        
-        # Initialize metadata if not exists
-        if "metadata" not in attendance_data:
-            attendance_data["metadata"] = {
-                "last_updated": datetime.now().strftime("%Y-%m-%d"),
-                "total_students": 0,
-                "academic_year": "2024-2025",
-                "total_subjects": len(subjects_data.get("subjects", []))
-            }
-        
-        save_attendance_master(attendance_data)
-        print(f"Attendance initialized for student {roll_number} in section {section}")
+                wanted[subject_code] = subject_name
+        wanted_by_section[str(section).upper()] = wanted
+
+    resolved = {}
+    def resolve(text):
+        if text not in resolved:
+            resolved[text] = catalogue.resolve(text)
+        return resolved[text]
+
+    batch, created, updated, added_subjects, skipped = [], [], [], 0, []
+    for roll, section in assignments.items():
+        subjects = wanted_by_section.get(str(section).upper())
+        if not subjects:
+            skipped.append(roll)
+            continue
+        rec = records.get(roll)
+        if rec is None:
+            batch.append((roll, roll, section, subjects))
+            created.append(roll)
+            continue
+        # existing keys may be codes or (older records) subject names
+        have = set()
+        for key, det in (rec.get("subjects") or {}).items():
+            have.add(resolve(key) or key)
+            if isinstance(det, dict) and det.get("subject_name"):
+                have.add(resolve(det["subject_name"]))
+        missing = {code: nm for code, nm in subjects.items() if code not in have}
+        if missing or str(rec.get("section") or "").upper() != str(section).upper():
+            batch.append((roll, roll, section, missing))
+            updated.append(roll)
+            added_subjects += len(missing)
+    timings["plan"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    if batch:
+        store.ensure_students(batch, _metadata_defaults(catalogue), fill_subjects=True)
+    timings["commit"] = time.perf_counter() - t
+    return {
+        "students": len(assignments),
+        "created": created,
+        "updated": updated,
+        "subjects_added": added_subjects,
+        "skipped": skipped,
+        "timings": timings,
+    }
 
 def view_attendance(teachername=None, student_roll=None):
     """View attendance chart - can be used by teachers for their sections or students for their own"""
-    attendance_data = load_attendance_master()
-    
     if student_roll:
         # Student viewing their own attendance
-        if student_roll in attendance_data.get("attendance_records", {}):
-            student_data = attendance_data["attendance_records"][student_roll]
+        student_data = get_attendance_store().get_record(student_roll)
+        if student_data is not None:
             subjects = []
             attendance_percentages = []
             
@@ -115,7 +241,9 @@ def view_attendance(teachername=None, student_roll=None):
                 print("No attendance data found for this student.")
                 return
             
-            # Create chart
+            # Create chart (matplotlib/numpy are only imported when a chart is drawn)
+            import matplotlib.pyplot as plt
+            import numpy as np
             colors = plt.cm.viridis(np.linspace(0.2, 0.9, len(subjects))) # type: ignore
             plt.figure(figsize=(12, 6))
             bars = plt.bar(subjects, attendance_percentages, color=colors, edgecolor="gray", linewidth=0.8)
@@ -138,19 +266,22 @@ def view_attendance(teachername=None, student_roll=None):
     
     elif teachername:
         # Teacher viewing attendance for their sections
-        teacher_sections = load_json_file(TEACHER_SECTIONS_FILE)
-        teacher_sections_list = teacher_sections.get(teachername, [])
+        section_rolls = get_roster().rolls_for_teacher(teachername)
         
-        if not teacher_sections_list:
+        if not section_rolls:
             print("No sections assigned to this teacher.")
             return
         
-        # Collect data for all students in teacher's sections
+        # Collect data for the students of the teacher's sections only
+        records = attendance_store.load_sections(get_attendance_store(), section_rolls).get("attendance_records", {})
         all_subjects = []
         all_attendance = []
         
-        for roll_number, student_data in attendance_data.get("attendance_records", {}).items():
-            if student_data["section"] in teacher_sections_list:
+        for rolls in section_rolls.values():
+            for roll_number in rolls:
+                student_data = records.get(roll_number)
+                if not student_data:
+                    continue
                 for subject_code, subject_data in student_data["subjects"].items():
                     all_subjects.append(f"{roll_number} - {subject_data['subject_name']}")
                     all_attendance.append(subject_data["attendance_percentage"])
@@ -160,6 +291,8 @@ def view_attendance(teachername=None, student_roll=None):
             return
         
         # Create chart
+        import matplotlib.pyplot as plt
+        import numpy as np
         colors = plt.cm.viridis(np.linspace(0.2, 0.9, len(all_subjects))) # type: ignore
         plt.figure(figsize=(14, 8))
         bars = plt.bar(all_subjects, all_attendance, color=colors, edgecolor="gray", linewidth=0.8)
@@ -195,67 +328,29 @@ def mark_attendance(teachername, student_roll, subject_code, is_present=True):
             print(f"Unauthorized: You are not assigned to section {student_section}.")
             return False
 
-        # 3. Load attendance master
-        attendance_data = load_attendance_master()
-        attendance_records = attendance_data.get("attendance_records", {})
-
-        # If student record missing, create basic one
-        if student_roll not in attendance_records:
-            attendance_records[student_roll] = {
-                "name": student_roll,
-                "section": student_section,
-                "subjects": {}
-            }
-
-        student_record = attendance_records[student_roll]
+        # 3. Load the student's attendance record (the store creates it on first mark)
+        student_record = get_attendance_store().get_record(student_roll) or {}
         subjects_dict = student_record.get("subjects", {})
 
-        # 4. Load subjects.json to map code -> name
-        subj_file = load_json_file(SUBJECTS_FILE)
-        subj_list = subj_file.get("subjects", []) if isinstance(subj_file, dict) else []
-        code_to_name = {s.get("code"): s.get("name") for s in subj_list if isinstance(s, dict) and s.get("code")}
-
-        subject_name_for_code = code_to_name.get(subject_code)
+        # 4. Resolve the subject (code, name or alias) through the catalogue
+        catalogue = get_subject_catalogue()
+        canonical_code = catalogue.resolve(subject_code)
+        subject_name_for_code = catalogue.name_for(canonical_code) if canonical_code else None
 
-        # 5. Try to find the existing subject key in student's subjects:
-        found_key = None
-
-        # a) direct match by code (some records may already use codes as keys)
-        if subject_code in subjects_dict:
-            found_key = subject_code
-        else:
-            # b) if we can map code -> name, try name as key
-            if subject_name_for_code and subject_name_for_code in subjects_dict:
-                found_key = subject_name_for_code
-            else:
-                # c) try to find a key whose 'subject_name' equals the mapped name
-                if subject_name_for_code:
-                    for k, v in subjects_dict.items():
-                        if isinstance(v, dict) and v.get("subject_name", "").strip().lower() == subject_name_for_code.strip().lower():
-                            found_key = k
-                            break
+        # 5. Find the existing subject key in student's subjects (a dict hit
+        #    on the code; legacy name keys only behind the compat fallback)
+        found_key = catalogue.record_key(subjects_dict, subject_code)
 
         # 6. If not found, create a new subject entry (key by code if code available, otherwise by name)
         if not found_key:
             # Determine the key we will use for the new subject entry
-            new_key = subject_code if subject_code else (subject_name_for_code or subject_code or "UNKNOWN")
+            new_key = canonical_code or subject_code or "UNKNOWN"
             new_subject_name = subject_name_for_code if subject_name_for_code else subject_code
-            # ensure subjects_dict exists
-            if not isinstance(subjects_dict, dict):
-                subjects_dict = {}
-            subjects_dict[new_key] = {
-                "subject_name": new_subject_name,
-                "total_working_days": 0,
-                "total_present_days": 0,
-                "attendance_percentage": 0.0,
-                "last_updated": ""
-            }
             found_key = new_key
-            # attach back
-            student_record["subjects"] = subjects_dict
-            attendance_records[student_roll] = student_record
             # save immediately so subsequent read sees it
-            save_attendance_master(attendance_data)
+            subjects_dict = {new_key: get_attendance_store().apply([attendance_store.make_event(
+                student_roll, new_key, "set", 0, 0, teacher=teachername,
+                subject_name=new_subject_name, section=student_section)])[0]}
             print(f"⚠️ Subject entry for '{subject_code}' was missing for {student_roll}. Created new entry '{found_key}'.")
 
         # 7. Now get the subject data to update
@@ -271,31 +366,16 @@ def mark_attendance(teachername, student_roll, subject_code, is_present=True):
             print("Attendance marking cancelled.")
             return False
 
-        # 9. Update attendance counters
-        subject_data["total_working_days"] = int(subject_data.get("total_working_days", 0)) + 1
+        # 9. Record the class in the ledger; the counters get one working day
+        #    (and one present day if present)
+        commit_marks([(student_roll, found_key, canonical_code or found_key,
+                       subject_data.get("subject_name", found_key), is_present)],
+                     teachername, student_section)
         if is_present:
-            subject_data["total_present_days"] = int(subject_data.get("total_present_days", 0)) + 1
             print(f"Marked {student_roll} present for {subject_data.get('subject_name', found_key)}")
         else:
-            # absent: working days incremented already
             print(f"Marked {student_roll} absent for {subject_data.get('subject_name', found_key)}")
 
-        # 10. Recalculate percentage
-        tw = subject_data.get("total_working_days", 0)
-        tp = subject_data.get("total_present_days", 0)
-        if tw > 0:
-            subject_data["attendance_percentage"] = round((tp / tw) * 100, 2)
-        else:
-            subject_data["attendance_percentage"] = 0.0
-
-        # 11. Update last_updated
-        subject_data["last_updated"] = datetime.now().strftime("%Y-%m-%d")
-
-        # 12. Persist updated attendance_data
-        attendance_records[student_roll] = student_record
-        attendance_data["attendance_records"] = attendance_records
-        save_attendance_master(attendance_data)
-
         print("Attendance updated successfully!")
         return True
 
@@ -316,78 +396,33 @@ def update_attendance(teachername, student_roll, subject_code):
         print(f"Unauthorized: You are not assigned to section {student_section}.")
         return
 
-    attendance_data = load_attendance_master()
-    attendance_records = attendance_data.get("attendance_records", {})
+    student_record = get_attendance_store().get_record(student_roll)
 
-    if student_roll not in attendance_records:
+    if student_record is None:
         print("Student not found in attendance records.")
         return
 
-    student_record = attendance_records[student_roll]
     subjects_dict = student_record.get("subjects", {})
 
-    # Load subjects.json to map code -> name
-    subj_file = load_json_file(SUBJECTS_FILE)
-    subj_list = subj_file.get("subjects", []) if isinstance(subj_file, dict) else []
-    code_to_name = {s.get("code"): s.get("name") for s in subj_list if isinstance(s, dict) and s.get("code")}
-    name_to_code = {s.get("name"): s.get("code") for s in subj_list if isinstance(s, dict) and s.get("name")}
-
     # Normalize input
     subject_code = subject_code.strip() if isinstance(subject_code, str) else subject_code
 
-    # Try to find the student's subject entry in several ways:
-    found_key = None     # key as stored in subjects_dict (could be code or name)
+    # Find the student's subject entry; the catalogue accepts a code, name or
+    # alias and knows records may be keyed by code or by name
+    catalogue = get_subject_catalogue()
+    canonical_code = catalogue.resolve(subject_code)
+    found_key = catalogue.record_key(subjects_dict, subject_code)
 
-    # 1) Direct by code key
-    if subject_code in subjects_dict:
-        found_key = subject_code
-    else:
-        # 2) If code -> name mapping available, try that name as key
-        subj_name = code_to_name.get(subject_code)
-        if subj_name and subj_name in subjects_dict:
-            found_key = subj_name
-        else:
-            # 3) Try to find a subject entry whose 'subject_name' matches the code->name
-            if subj_name:
-                for k, v in subjects_dict.items():
-                    if isinstance(v, dict) and v.get("subject_name", "").strip().lower() == subj_name.strip().lower():
-                        found_key = k
-                        break
-            # 4) Try if teacher passed subject *name* instead of code
-            if not found_key and subject_code in name_to_code:
-                # subject_code is actually a name, use it as key if present
-                if subject_code in subjects_dict:
-                    found_key = subject_code
-            # 5) As last resort, try matching by subject_name field equals the provided string
-            if not found_key:
-                for k, v in subjects_dict.items():
-                    if isinstance(v, dict) and v.get("subject_name", "").strip().lower() == str(subject_code).strip().lower():
-                        found_key = k
-                        break
-
-    # If still not found, create a new subject entry keyed by the subject_code (preferred)
+    # If still not found, create a new subject entry keyed by the subject code (preferred)
     if not found_key:
         # Determine subject_name to use
-        subject_name = code_to_name.get(subject_code) or subject_code or "Unknown Subject"
-
-        # Ensure the subjects_dict is a dict
-        if not isinstance(subjects_dict, dict):
-            subjects_dict = {}
-
-        # Create entry keyed by subject_code so future marks by code work
-        new_key = subject_code if subject_code else subject_name
-        subjects_dict[new_key] = {
-            "subject_name": subject_name,
-            "total_working_days": 0,
-            "total_present_days": 0,
-            "attendance_percentage": 0.0,
-            "last_updated": ""
-        }
-        # attach back
-        student_record["subjects"] = subjects_dict
-        attendance_records[student_roll] = student_record
-        attendance_data["attendance_records"] = attendance_records
-        save_attendance_master(attendance_data)
+        subject_name = (catalogue.name_for(canonical_code) if canonical_code else None) or subject_code or "Unknown Subject"
+
+        # Create entry keyed by subject code so future marks by code work
+        new_key = canonical_code or subject_code or subject_name
+        subjects_dict = {new_key: get_attendance_store().apply([attendance_store.make_event(
+            student_roll, new_key, "set", 0, 0, teacher=teachername,
+            subject_name=subject_name, section=student_section)])[0]}
         print(f"⚠️ Subject '{subject_code}' was missing for {student_roll}. Created new entry '{new_key}'.")
         found_key = new_key
 
@@ -419,34 +454,310 @@ def update_attendance(teachername, student_roll, subject_code):
         print("Update cancelled.")
         return
 
-    # Update attendance
-    subject_data["total_working_days"] = new_working_days
-    subject_data["total_present_days"] = new_present_days
+    # Update attendance (recorded in the ledger as a correction)
+    subject_data = correct_counts(student_roll, found_key, canonical_code or found_key,
+                                  subject_data.get("subject_name", found_key),
+                                  new_working_days, new_present_days, teachername, student_section)
 
-    if new_working_days > 0:
-        subject_data["attendance_percentage"] = round(
-            (new_present_days / new_working_days) * 100, 2
-        )
-    else:
-        subject_data["attendance_percentage"] = 0.0
+    print("\nAttendance updated successfully!")
+    print(f"New attendance %: {subject_data['attendance_percentage']}%")
 
-    subject_data["last_updated"] = datetime.now().strftime("%Y-%m-%d")
 
-    # Persist changes
-    attendance_records[student_roll] = student_record
-    attendance_data["attendance_records"] = attendance_records
-    save_attendance_master(attendance_data)
+def take_session(teachername, section, subject_code, present_rolls, date=None,
+                 store=None, section_roster=None, catalogue=None, ledger=None, marked=None, period=None):
+    """Record one class session for a whole section with a single commit.
 
-    print("\nAttendance updated successfully!")
-    print(f"New attendance %: {subject_data['attendance_percentage']}%")
+    Every student of the section gets one working day for the subject and
+    the rolls in present_rolls also get a present day. Passing the period of
+    a session already taken that day corrects it instead of counting twice. Raises PermissionError
+    if the teacher does not teach the section and ValueError for an unknown
+    subject, bad date or present rolls outside the section; nothing is
+    written in that case. Returns a summary dict.
+
+    marked limits the session to those rolls of the section; the others are
+    left unrecorded.
+    """
+    store = store or get_attendance_store()
+    section_roster = section_roster or get_roster()
+    catalogue = catalogue or get_subject_catalogue()
+
+    section = str(section or "").strip().upper()
+    if not section_roster.teaches(teachername, section):
+        raise PermissionError(f"You are not assigned to section {section}.")
+    code = catalogue.resolve(subject_code)
+    if code is None:
+        raise ValueError(f"Unknown subject '{subject_code}'.")
+    date = date or attendance_store.today()
+    datetime.strptime(date, "%Y-%m-%d")  # raises ValueError
+
+    rolls = section_roster.rolls_in(section)
+    if not rolls:
+        raise ValueError(f"No students are assigned to section {section}.")
+    present = set(present_rolls)
+    outside = sorted(present.union(marked or ()).difference(rolls))
+    if outside:
+        raise ValueError(f"Not in section {section}: {', '.join(outside)}")
+    if marked is not None:
+        marked = set(marked) | present
+        rolls = [r for r in rolls if r in marked]
+
+    # One load to resolve every student's subject key; one ledger transaction
+    # and one store.apply to commit
+    records = attendance_store.load_sections(store, [section]).get("attendance_records", {})
+    subject_name = catalogue.name_for(code)
+    marks, created = [], []
+    for roll in rolls:
+        subjects = (records.get(roll) or {}).get("subjects", {})
+        key = catalogue.record_key(subjects, code)
+        if key is None:
+            key = code
+            created.append(roll)
+        marks.append((roll, key, code, (subjects.get(key) or {}).get("subject_name", subject_name), roll in present))
+    applied = commit_marks(marks, teachername, section, date, store=store, ledger=ledger, period=period)
+
+    return {
+        "section": section,
+        "subject": code,
+        "subject_name": subject_name,
+        "date": date,
+        "students": len(rolls),
+        "present": sum(1 for r in rolls if r in present),
+        "absent": sorted(r for r in rolls if r not in present),
+        "created": created,
+        "changed": len(applied),
+    }
+
+
+def _pick_section(teachername, section_roster):
+    """Ask which of the teacher's sections to use; None if there is none"""
+    sections = section_roster.sections_of(teachername)
+    if not sections:
+        print("No sections assigned to this teacher.")
+        return None
+    if len(sections) == 1:
+        return sections[0]
+    for i, sec in enumerate(sections, 1):
+        print(f"{i}. {sec}")
+    try:
+        return sections[int(input("Select section: ").strip()) - 1]
+    except (ValueError, IndexError):
+        print("Invalid choice.")
+        return None
+
+
+def take_session_interactive(teachername):
+    """CLI flow: pick section and subject, enter absentees, commit once"""
+    section_roster = get_roster()
+    section = _pick_section(teachername, section_roster)
+    if section is None:
+        return
+
+    rolls = section_roster.rolls_in(section)
+    if not rolls:
+        print(f"No students are assigned to section {section}.")
+        return
+    code = input("Enter subject code: ").strip().upper()
+    date = input(f"Session date YYYY-MM-DD (Enter for {attendance_store.today()}): ").strip() or None
+
+    print(f"\nStudents in {section}: {', '.join(rolls)}")
+    raw = input("Enter absent roll numbers (comma separated, Enter if everyone is present): ")
+    absent = {r.strip() for r in raw.split(",") if r.strip()}
+    unknown = sorted(absent.difference(rolls))
+    if unknown:
+        print(f"Not in section {section}: {', '.join(unknown)}")
+        return
+
+    confirm = input(f"Save session: {len(rolls) - len(absent)} present, {len(absent)} absent? (y/n): ").strip().lower()
+    if confirm not in ["y", "yes"]:
+        print("Session cancelled.")
+        return
+    try:
+        result = take_session(teachername, section, code, set(rolls) - absent, date)
+    except (PermissionError, ValueError) as e:
+        print("Error:", e)
+        return
+    print(f"Recorded {result['subject_name']} ({result['subject']}) on {result['date']} for section {result['section']}: "
+          f"{result['present']}/{result['students']} present.")
+    if result["changed"] < result["students"]:
+        print(f"{result['students'] - result['changed']} student(s) were already recorded with the same status for that date.")
+    if result["created"]:
+        print(f"Created subject entries for: {', '.join(result['created'])}")
+
+
+def _read_key():
+    """Read one keystroke without waiting for Enter where the terminal allows it"""
+    if not sys.stdin.isatty():
+        line = sys.stdin.readline()
+        return "q" if not line else (line.strip()[:1] or "\n")
+    try:
+        import msvcrt
+        return msvcrt.getwch()
+    except ImportError:
+        import termios
+        import tty
+        fd = sys.stdin.fileno()
+        old = termios.tcgetattr(fd)
+        try:
+            tty.setraw(fd)
+            return sys.stdin.read(1)
+        finally:
+            termios.tcsetattr(fd, termios.TCSADRAIN, old)
+
+
+ROLL_CALL_KEYS = {
+    "p": "present", "a": "absent",
+    "s": "skip", " ": "skip", "\r": "skip", "\n": "skip",
+    "u": "undo", "\x7f": "undo", "\x08": "undo",
+    "q": "quit", "\x03": "quit", "\x1b": "quit",
+}
+
+
+def roll_call_interactive(teachername):
+    """CLI rapid roll call: one keystroke per student, one commit at the end.
+
+    Keys: p present, a absent, s/space/Enter skip, u/Backspace undo, q finish.
+    Skipped students are not recorded for the session.
+    """
+    section_roster = get_roster()
+    section = _pick_section(teachername, section_roster)
+    if section is None:
+        return
+    catalogue = get_subject_catalogue()
+    raw = input("Enter subject code: ").strip()
+    code = catalogue.resolve(raw)
+    if code is None:
+        print(f"Unknown subject '{raw}'.")
+        return
+    date = input(f"Session date YYYY-MM-DD (Enter for {attendance_store.today()}): ").strip() or attendance_store.today()
+    try:
+        datetime.strptime(date, "%Y-%m-%d")
+    except ValueError:
+        print("Invalid date.")
+        return
+    rolls = section_roster.rolls_in(section)
+    if not rolls:
+        print(f"No students are assigned to section {section}.")
+        return
+
+    import rollnumbers
+    registry = rollnumbers.get_registry(_resolve_path("rollnumbers.json"))
+    print(f"\nRoll call: {section} {catalogue.name_for(code)} ({code}) on {date}, {len(rolls)} students")
+    print("Keys: p present, a absent, s/space skip, u undo, q finish")
+    marks = {}    # roll -> True/False; skipped rolls stay out
+    i = 0
+    while i < len(rolls):
+        roll = rolls[i]
+        owner = registry.owner(roll)
+        print(f"[{i + 1}/{len(rolls)}] {roll} {owner[1] if owner else ''}: ", end="", flush=True)
+        action = ROLL_CALL_KEYS.get(_read_key().lower())
+        if action == "quit":
+            print("finish")
+            break
+        if action == "undo":
+            if i == 0:
+                print("nothing to undo")
+                continue
+            i -= 1
+            marks.pop(rolls[i], None)
+            print("undo")
+            continue
+        if action is None:
+            print("?")
+            continue
+        if action != "skip":
+            marks[roll] = action == "present"
+        print(action)
+        i += 1
+
+    if not marks:
+        print("Nobody was marked; nothing saved.")
+        return
+    present = sorted(r for r, p in marks.items() if p)
+    absent = sorted(r for r, p in marks.items() if not p)
+    skipped = [r for r in rolls if r not in marks]
+    print(f"\nPresent: {len(present)}  Absent: {len(absent)}  Not recorded: {len(skipped)}")
+    if absent:
+        print(f"Absent: {', '.join(absent)}")
+    if skipped:
+        print(f"Not recorded: {', '.join(skipped)}")
+    if input("Save this roll call? (y/n): ").strip().lower() not in ["y", "yes"]:
+        print("Roll call discarded.")
+        return
+    t = time.perf_counter()
+    try:
+        result = take_session(teachername, section, code, present, date,
+                              section_roster=section_roster, catalogue=catalogue, marked=marks)
+    except (PermissionError, ValueError) as e:
+        print("Error:", e)
+        return
+    print(f"Saved {result['present']}/{result['students']} present in {time.perf_counter() - t:.2f}s.")
+    if result["changed"] < result["students"]:
+        print(f"{result['students'] - result['changed']} student(s) were already recorded with the same status for that date.")
+
+
+def view_attendance_range(teachername):
+    """CLI: per-student attendance for one of the teacher's classes over a date range"""
+    sections = get_roster().sections_of(teachername)
+    if not sections:
+        print("No sections assigned to this teacher.")
+        return
+    section = input(f"Section ({', '.join(sections)}): ").strip().upper()
+    if section not in sections:
+        print(f"Unauthorized: You are not assigned to section {section}.")
+        return
+    code = get_subject_catalogue().resolve(input("Enter subject code: ").strip())
+    if code is None:
+        print("Unknown subject.")
+        return
+    start = input("From date YYYY-MM-DD (Enter for all): ").strip() or None
+    end = input("To date YYYY-MM-DD (Enter for today): ").strip() or None
+    attendance_ledger.print_report(get_ledger(), section, code, start, end)
+
+
+def attendance_analytics_report(threshold=75.0):
+    """Print campus-wide attendance analytics (admin)"""
+    try:
+        import attendance_matrix
+    except ImportError:
+        print("numpy is not installed; analytics are unavailable.")
+        return
+    matrix = attendance_matrix.get_matrix(get_attendance_store(), get_subject_catalogue())
+    if not matrix.n_students:
+        print("No attendance records yet.")
+        return
+    attendance_matrix.print_report(matrix, threshold)
+
+
+def get_eligibility():
+    """Return the exam eligibility engine (needs numpy)"""
+    import eligibility
+    import exam_date
+    return eligibility.get_engine(get_attendance_store(), get_subject_catalogue(),
+                                  os.path.abspath(exam_date.EXAMFILE))
+
+def exam_eligibility_report():
+    """Print debarred and at-risk students per subject (admin)"""
+    try:
+        import eligibility
+        engine = get_eligibility()
+    except ImportError:
+        print("numpy is not installed; eligibility is unavailable.")
+        return
+    eligibility.print_report(engine)
+
+def student_eligibility(student_roll):
+    """Return {code: (status, percentage)} for a student's flagged subjects"""
+    try:
+        return get_eligibility().for_student(student_roll)
+    except ImportError:
+        return {}
 
 
 def get_student_attendance_summary(student_roll):
     """Get attendance summary for a student"""
-    attendance_data = load_attendance_master()
+    student_data = get_attendance_store().get_record(student_roll)
     
-    if student_roll in attendance_data.get("attendance_records", {}):
-        student_data = attendance_data["attendance_records"][student_roll]
+    if student_data is not None:
         print(f"\n--- Attendance Summary for {student_roll} ---")
         print(f"Section: {student_data['section']}")
         print("\nSubject-wise Attendance:")
@@ -0,0 +1,316 @@
+import os
+import sys
+import copy
+import glob
+import time
+import threading
+from datetime import datetime
+
+import datastore
+import attendance_store
+
+# -----------------------------------------------------------
+# Append-only attendance journal
+# -----------------------------------------------------------
+#
+# Marks are appended to <master>.journal as one line per event:
+#
+#   ts \t roll \t subject \t op \t working \t present \t teacher \t section \t subject_name
+#
+# attendance_master.json stays the snapshot. When the journal grows past
+# COMPACT_MAX_BYTES or its oldest event is older than COMPACT_MAX_AGE seconds,
+# a background thread folds it into the snapshot:
+#
+#   1. under the journal lock, rename <master>.journal to <master>.journal.<N>
+#      (new marks go to a fresh journal straight away)
+#   2. replay every sealed segment onto the snapshot and save it with
+#      metadata["journal_compacted"] = N
+#   3. delete the sealed segments
+#
+# Readers take the snapshot, replay sealed segments newer than
+# journal_compacted, then the live journal. That makes a crash between any two
+# steps safe.
+
+COMPACT_MAX_BYTES = 64 * 1024
+COMPACT_MAX_AGE = 10 * 60
+
+FIELDS = ("ts", "roll", "subject", "op", "working", "present", "teacher", "section", "subject_name")
+
+
+def _clean(value):
+    return str(value if value is not None else "").replace("\t", " ").replace("\n", " ")
+
+
+def format_event(event):
+    return "\t".join(_clean(event.get(f)) for f in FIELDS) + "\n"
+
+
+def parse_event(line):
+    parts = line.rstrip("\n").split("\t")
+    if len(parts) != len(FIELDS):
+        return None
+    event = dict(zip(FIELDS, parts))
+    try:
+        event["working"] = int(event["working"])
+        event["present"] = int(event["present"])
+    except ValueError:
+        return None
+    if event["op"] not in ("add", "set"):
+        return None
+    event["section"] = event["section"] or None
+    event["subject_name"] = event["subject_name"] or None
+    return event
+
+
+def _read_events(path, offset=0):
+    """Return (events, new_offset) for complete lines after offset.
+
+    A trailing line without a newline (a crash mid-append) is left for later.
+    """
+    events = []
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith("\n"):
+                    break
+                offset += len(line.encode("utf-8"))
+                ev = parse_event(line)
+                if ev is not None:
+                    events.append(ev)
+    except FileNotFoundError:
+        pass
+    return events, offset
+
+
+class JournalAttendanceStore:
+    """JSON snapshot plus an append-only journal of marks."""
+
+    name = "journal"
+
+    def __init__(self, path, max_bytes=None, max_age=None):
+        self.path = os.path.abspath(path)
+        self.journal_path = os.path.splitext(self.path)[0] + ".journal"
+        self.max_bytes = COMPACT_MAX_BYTES if max_bytes is None else max_bytes
+        self.max_age = COMPACT_MAX_AGE if max_age is None else max_age
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        self._compactor = None
+        # merged view: snapshot object + sealed segments + live journal offset
+        self._base = None
+        self._segments = ()
+        self._offset = 0
+        self._merged = None
+        self._first_ts = None
+
+    # -- segments ----------------------------------------------------
+
+    def _sealed(self, compacted):
+        out = []
+        for p in glob.glob(glob.escape(self.journal_path) + ".*"):
+            suffix = p.rsplit(".", 1)[-1]
+            if suffix.isdigit() and int(suffix) > compacted:
+                out.append((int(suffix), p))
+        return tuple(p for _, p in sorted(out))
+
+    @staticmethod
+    def _compacted(doc):
+        try:
+            return int(doc.get("metadata", {}).get("journal_compacted", 0))
+        except (TypeError, ValueError):
+            return 0
+
+    # -- reads -------------------------------------------------------
+
+    def load(self):
+        with self._lock:
+            for _ in range(3):
+                base = datastore.load(self.path, attendance_store.empty_document())
+                segments = self._sealed(self._compacted(base))
+                if base is not self._base or segments != self._segments or self._merged is None:
+                    merged = copy.deepcopy(base)
+                    for seg in segments:
+                        for ev in _read_events(seg)[0]:
+                            attendance_store.apply_event(merged, ev)
+                    self._base, self._segments, self._merged = base, segments, merged
+                    self._offset = 0
+                    self._first_ts = None
+                events, offset = _read_events(self.journal_path, self._offset)
+                # a compaction may have sealed the journal under us; retry
+                if segments != self._sealed(self._compacted(base)):
+                    self._merged = None
+                    continue
+                if events and self._first_ts is None and self._offset == 0:
+                    self._first_ts = events[0]["ts"]
+                for ev in events:
+                    attendance_store.apply_event(self._merged, ev)
+                self._offset = offset
+                return self._merged
+            return self._merged
+
+    def get_record(self, roll):
+        return self.load().get("attendance_records", {}).get(roll)
+
+    def revision(self):
+        """Changes whenever the snapshot, the sealed segments or the journal change."""
+        sig = []
+        for p in (self.path, self.journal_path):
+            try:
+                st = os.stat(p)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return (tuple(sig), self._sealed(0))
+
+    # -- writes ------------------------------------------------------
+
+    def apply(self, events):
+        lines = "".join(format_event(e) for e in events)
+        with self._lock:
+            with datastore.locked(self.journal_path):
+                # every writer appends under this lock, so the replayed state
+                # is exactly what our events start from
+                current, previous = self.load(), []
+                seen = {}
+                for e in events:
+                    k = (e["roll"], e["subject"])
+                    previous.append(seen.get(k) or attendance_store.counts_of(current, *k))
+                    seen[k] = attendance_store.new_counts(*previous[-1], e)
+                with open(self.journal_path, "a", encoding="utf-8") as f:
+                    f.write(lines)
+                    datastore.sync(f, self.journal_path)
+            # replaying the tail picks up our events (and any other writer's)
+            merged = self.load()
+            attendance_store.touch_metadata(merged)
+            records = merged.get("attendance_records", {})
+            updated = [records[e["roll"]]["subjects"][e["subject"]] for e in events]
+        attendance_store.notify(self, events, updated, previous)
+        self.maybe_compact()
+        return updated
+
+    def save(self, data):
+        """Replace the whole document; pending journal events are superseded.
+
+        Marks appended after data was loaded are dropped with the journal, so
+        callers that build data from load() hold both locks (self.path, then
+        self.journal_path) from the load until this returns.
+        """
+        with self._lock, datastore.locked(self.path), datastore.locked(self.journal_path):
+            seal = self._seal()
+            if seal:
+                data.setdefault("metadata", {})["journal_compacted"] = seal
+            datastore.save(self.path, data)
+            self._drop_segments(seal)
+            self._merged = None
+        attendance_store.notify(self, None, None)
+
+    def ensure_student(self, roll, name, section, subjects, metadata_defaults=None):
+        return bool(self.ensure_students([(roll, name, section, subjects)], metadata_defaults))
+
+    def ensure_students(self, students, metadata_defaults=None, fill_subjects=False):
+        # hold the journal lock too, so no mark lands between load and save
+        with self._lock, datastore.locked(self.path), datastore.locked(self.journal_path):
+            datastore.load_fresh(self.path, None)  # see other writers' snapshot
+            doc = copy.deepcopy(self.load())
+            if not doc.get("metadata"):
+                doc.pop("metadata", None)
+            created = attendance_store.ensure_records(doc, students, metadata_defaults, fill_subjects)
+            attendance_store.touch_metadata(doc)
+            self.save(doc)
+            return created
+
+    def rekey_subjects(self, changes):
+        # hold the journal lock too, so no mark lands between load and save
+        with self._lock, datastore.locked(self.path), datastore.locked(self.journal_path):
+            datastore.load_fresh(self.path, None)
+            doc = copy.deepcopy(self.load())
+            merged = attendance_store.rekey_records(doc, changes)
+            self.save(doc)
+            return merged
+
+    # -- compaction --------------------------------------------------
+
+    def _seal(self):
+        """Rename the live journal to a numbered segment. Call under the lock."""
+        if not os.path.exists(self.journal_path) or os.path.getsize(self.journal_path) == 0:
+            return 0
+        seal = time.time_ns()
+        os.replace(self.journal_path, f"{self.journal_path}.{seal}")
+        return seal
+
+    def _drop_segments(self, upto):
+        for p in glob.glob(glob.escape(self.journal_path) + ".*"):
+            suffix = p.rsplit(".", 1)[-1]
+            if suffix.isdigit() and int(suffix) <= upto:
+                try:
+                    os.remove(p)
+                except OSError:
+                    pass
+
+    def needs_compaction(self):
+        try:
+            size = os.path.getsize(self.journal_path)
+        except OSError:
+            return False
+        if size == 0:
+            return False
+        if size >= self.max_bytes:
+            return True
+        if self._first_ts:
+            try:
+                first = datetime.strptime(self._first_ts[:19], "%Y-%m-%dT%H:%M:%S")
+            except ValueError:
+                return False
+            return (datetime.now() - first).total_seconds() >= self.max_age
+        return False
+
+    def compact(self):
+        """Fold the journal into attendance_master.json. Returns events folded.
+
+        Marks keep going to the fresh journal while the fold runs.
+        """
+        with self._compact_lock:
+            with datastore.locked(self.journal_path):
+                seal = self._seal()
+            with datastore.locked(self.path):
+                base = datastore.load_fresh(self.path, attendance_store.empty_document())
+                segments = self._sealed(self._compacted(base))
+                if not segments:
+                    return 0
+                doc = copy.deepcopy(base)
+                count = 0
+                for seg in segments:
+                    for ev in _read_events(seg)[0]:
+                        attendance_store.apply_event(doc, ev)
+                        count += 1
+                attendance_store.touch_metadata(doc)
+                doc["metadata"]["journal_compacted"] = max(seal, max(int(s.rsplit(".", 1)[-1]) for s in segments))
+                datastore.save(self.path, doc)
+            self._drop_segments(doc["metadata"]["journal_compacted"])
+            return count
+
+    def maybe_compact(self):
+        """Start a background compaction if the journal passed a threshold."""
+        if not self.needs_compaction():
+            return False
+        with self._compact_lock:
+            if self._compactor is not None and self._compactor.is_alive():
+                return False
+            # not a daemon: an exiting process finishes the compaction first
+            self._compactor = threading.Thread(target=self._compact_quietly, name="attendance-compactor")
+            self._compactor.start()
+            return True
+
+    def _compact_quietly(self):
+        try:
+            self.compact()
+        except Exception as e:
+            print("Attendance journal compaction failed:", e)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] != "compact":
+        print("Usage: python attendance_journal.py compact <attendance_master.json>")
+        sys.exit(1)
+    n = JournalAttendanceStore(sys.argv[2]).compact()
+    print(f"Folded {n} journal events into {sys.argv[2]}")
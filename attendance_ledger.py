@@ -0,0 +1,359 @@
+import os
+import sys
+import sqlite3
+import threading
+
+import attendance_store
+
+# -----------------------------------------------------------
+# Dated attendance ledger
+# -----------------------------------------------------------
+#
+# One row per (roll, subject code, day, period) with the status of that class:
+#
+#   roll | subject | section | day (YYYY-MM-DD) | period | status (1/0) | teacher | recorded
+#
+# stored in <master>.ledger.db next to attendance_master.json, with an index
+# on (section, subject, day) for range queries over a class.
+#
+# The counters in the attendance store are a projection of the ledger:
+# record() upserts the rows and returns the change each one makes to the
+# (working, present) counters, which the caller applies to the store inside
+# the same ledger transaction.
+#
+# period numbers the classes of a subject on one day, from 1. Marking a
+# student without a period records the next class of that day, so every mark
+# adds a working day as it always has; passing the period of a class already
+# recorded corrects that class instead. Ledgers created before periods
+# existed are migrated with every row as period 1.
+#
+# Corrections (a teacher setting the totals by hand) go through correct(),
+# which stores the difference between the requested totals and what the
+# ledger already holds as an undated row in the adjustments table, so the
+# ledger totals keep matching the counters. Undated queries include the
+# adjustments; range queries only see dated sessions.
+#
+# Counters that predate the ledger have no dated rows. seed() folds them in
+# once, as one adjustment per student and subject, the first time the ledger
+# is opened together with its store (get_ledger(..., load=store.load)); a
+# row in the meta table records that it ran.
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS sessions (
+        roll TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        section TEXT NOT NULL DEFAULT '',
+        day TEXT NOT NULL,
+        period INTEGER NOT NULL DEFAULT 1,
+        status INTEGER NOT NULL,
+        teacher TEXT NOT NULL DEFAULT '',
+        recorded TEXT NOT NULL DEFAULT '',
+        PRIMARY KEY (roll, subject, day, period)
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS sessions_by_class ON sessions (section, subject, day);
+    CREATE TABLE IF NOT EXISTS adjustments (
+        id INTEGER PRIMARY KEY,
+        roll TEXT NOT NULL,
+        subject TEXT NOT NULL,
+        section TEXT NOT NULL DEFAULT '',
+        working INTEGER NOT NULL,
+        present INTEGER NOT NULL,
+        teacher TEXT NOT NULL DEFAULT '',
+        recorded TEXT NOT NULL DEFAULT ''
+    );
+    CREATE INDEX IF NOT EXISTS adjustments_by_student ON adjustments (roll, subject);
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    );
+"""
+
+
+def ledger_path_for(json_path):
+    return os.path.splitext(os.path.abspath(json_path))[0] + ".ledger.db"
+
+
+class AttendanceLedger:
+    """Dated per-class attendance rows in SQLite."""
+
+    def __init__(self, db_path):
+        self.db_path = os.path.abspath(db_path)
+        self._seeded = False
+        conn = self._connect()
+        try:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(sessions)")]
+            if columns and "period" not in columns:
+                self._add_periods(conn)
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _add_periods(conn):
+        """Rebuild a one-session-per-day table with every row as period 1."""
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("ALTER TABLE sessions RENAME TO sessions_v1")
+            conn.execute("DROP INDEX IF EXISTS sessions_by_class")
+            for statement in SCHEMA.split(";"):
+                if statement.strip():
+                    conn.execute(statement)
+            conn.execute("INSERT INTO sessions (roll, subject, section, day, period, status, teacher, recorded) "
+                         "SELECT roll, subject, section, day, 1, status, teacher, recorded FROM sessions_v1")
+            conn.execute("DROP TABLE sessions_v1")
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    # -- writes ------------------------------------------------------
+
+    def record(self, entries, apply=None, period=None):
+        """Upsert (roll, subject, section, day, status, teacher) entries.
+
+        Without period, every (subject, day) in entries is recorded as a new
+        class: the period after the highest one any of its students has that
+        day. With period, that class is recorded or corrected.
+
+        Returns one (working_delta, present_delta) per entry: (1, status) for
+        a new class, (0, +/-1) when a class's status flips and (0, 0) when it
+        is unchanged. If apply is given it is called with the deltas before
+        the ledger commits, and an exception from it rolls the ledger back.
+        """
+        recorded = attendance_store.now()
+        entries = list(entries)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            periods = {}
+            if period is None:
+                for roll, subject, section, day, status, teacher in entries:
+                    last = conn.execute("SELECT COALESCE(MAX(period), 0) FROM sessions "
+                                        "WHERE roll = ? AND subject = ? AND day = ?",
+                                        (roll, subject, day)).fetchone()[0]
+                    periods[(subject, day)] = max(periods.get((subject, day), 1), last + 1)
+            deltas = []
+            for roll, subject, section, day, status, teacher in entries:
+                status = 1 if status else 0
+                n = periods[(subject, day)] if period is None else int(period)
+                row = conn.execute("SELECT status FROM sessions "
+                                   "WHERE roll = ? AND subject = ? AND day = ? AND period = ?",
+                                   (roll, subject, day, n)).fetchone()
+                if row is None:
+                    deltas.append((1, status))
+                else:
+                    deltas.append((0, status - row[0]))
+                conn.execute(
+                    "INSERT INTO sessions (roll, subject, section, day, period, status, teacher, recorded) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT (roll, subject, day, period) DO UPDATE SET "
+                    "status = excluded.status, section = excluded.section, "
+                    "teacher = excluded.teacher, recorded = excluded.recorded",
+                    (roll, subject, str(section or "").upper(), day, n, status, teacher or "", recorded))
+            if apply is not None:
+                apply(deltas)
+            conn.execute("COMMIT")
+            return deltas
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def correct(self, roll, subject, section, working, present, teacher="", apply=None):
+        """Set the (working, present) totals of one student and subject.
+
+        Stores the difference from the ledger's current totals as an
+        adjustment and returns it as (working_delta, present_delta). apply,
+        if given, is called with no arguments before the ledger commits.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            w, p = self._totals(conn, roll, subject)
+            delta = (int(working) - w, int(present) - p)
+            if delta != (0, 0):
+                conn.execute(
+                    "INSERT INTO adjustments (roll, subject, section, working, present, teacher, recorded) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (roll, subject, str(section or "").upper(), delta[0], delta[1], teacher or "",
+                     attendance_store.now()))
+            if apply is not None:
+                apply()
+            conn.execute("COMMIT")
+            return delta
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def seed(self, load, subject_key=None):
+        """Fold the store's pre-ledger counters in as adjustments, once.
+
+        load returns the attendance document; it is called inside the ledger
+        transaction, so no mark lands between the read and the seed.
+        subject_key maps a record key to its subject code. Returns the number
+        of adjustments written, or None if the ledger was already seeded.
+        """
+        if self._seeded:
+            return None
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM meta WHERE key = 'seeded'").fetchone():
+                conn.execute("COMMIT")
+                self._seeded = True
+                return None
+            counters = {}
+            for roll, rec in load().get("attendance_records", {}).items():
+                for key, det in (rec.get("subjects") or {}).items():
+                    if not isinstance(det, dict):
+                        continue
+                    code = subject_key(key) if subject_key else key
+                    section, w, p = counters.get((roll, code), (rec.get("section"), 0, 0))
+                    counters[(roll, code)] = (section, w + int(det.get("total_working_days", 0)),
+                                              p + int(det.get("total_present_days", 0)))
+            recorded, written = attendance_store.now(), 0
+            for (roll, code), (section, w, p) in counters.items():
+                lw, lp = self._totals(conn, roll, code)
+                if (w - lw, p - lp) != (0, 0):
+                    conn.execute(
+                        "INSERT INTO adjustments (roll, subject, section, working, present, teacher, recorded) "
+                        "VALUES (?, ?, ?, ?, ?, '', ?)",
+                        (roll, code, str(section or "").upper(), w - lw, p - lp, recorded))
+                    written += 1
+            conn.execute("INSERT INTO meta (key, value) VALUES ('seeded', ?)", (recorded,))
+            conn.execute("COMMIT")
+            self._seeded = True
+            return written
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _totals(conn, roll, subject):
+        w, p = conn.execute("SELECT COUNT(*), COALESCE(SUM(status), 0) FROM sessions "
+                            "WHERE roll = ? AND subject = ?", (roll, subject)).fetchone()
+        aw, ap = conn.execute("SELECT COALESCE(SUM(working), 0), COALESCE(SUM(present), 0) FROM adjustments "
+                              "WHERE roll = ? AND subject = ?", (roll, subject)).fetchone()
+        return w + aw, p + ap
+
+    # -- range queries -----------------------------------------------
+
+    @staticmethod
+    def _where(roll=None, section=None, subject=None, start=None, end=None):
+        clauses, args = [], []
+        if section is not None:
+            clauses.append("section = ?"); args.append(str(section).upper())
+        if subject is not None:
+            clauses.append("subject = ?"); args.append(subject)
+        if roll is not None:
+            clauses.append("roll = ?"); args.append(roll)
+        if start is not None:
+            clauses.append("day >= ?"); args.append(start)
+        if end is not None:
+            clauses.append("day <= ?"); args.append(end)
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", args
+
+    def summary(self, section=None, subject=None, start=None, end=None, roll=None):
+        """Return {(roll, subject): (working, present)} for the matching days.
+
+        Without start and end the totals include corrections.
+        """
+        where, args = self._where(roll, section, subject, start, end)
+        conn = self._connect()
+        try:
+            out = {(r, s): (w, p) for r, s, w, p in conn.execute(
+                "SELECT roll, subject, COUNT(*), SUM(status) FROM sessions" + where +
+                " GROUP BY roll, subject", args)}
+            if start is None and end is None:
+                for r, s, w, p in conn.execute(
+                        "SELECT roll, subject, SUM(working), SUM(present) FROM adjustments" + where +
+                        " GROUP BY roll, subject", args):
+                    ow, op = out.get((r, s), (0, 0))
+                    out[(r, s)] = (ow + w, op + p)
+            return dict(sorted(out.items()))
+        finally:
+            conn.close()
+
+    def daily(self, section, subject, start=None, end=None):
+        """Return [(day, period, present, marked)] for one class, oldest first."""
+        where, args = self._where(None, section, subject, start, end)
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT day, period, SUM(status), COUNT(*) FROM sessions" + where +
+                                " GROUP BY day, period ORDER BY day, period", args).fetchall()
+        finally:
+            conn.close()
+
+    def counts(self, roll, subject, start=None, end=None):
+        """Derive (working, present) for one student and subject from the ledger.
+
+        Without start and end this matches the store's counters once the
+        ledger has been seeded (see seed()); a range counts dated sessions only.
+        """
+        return self.summary(subject=subject, start=start, end=end, roll=roll).get((roll, subject), (0, 0))
+
+    def status(self, roll, subject, day, period=1):
+        """Return 1/0 for a recorded class, or None."""
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT status FROM sessions "
+                               "WHERE roll = ? AND subject = ? AND day = ? AND period = ?",
+                               (roll, subject, day, period)).fetchone()
+            return None if row is None else row[0]
+        finally:
+            conn.close()
+
+
+_ledgers = {}
+_ledgers_lock = threading.Lock()
+
+
+def get_ledger(json_path, load=None, subject_key=None):
+    """Return the ledger that belongs to the master file at json_path.
+
+    With load (the store's load), the ledger is seeded from the store's
+    counters the first time; see AttendanceLedger.seed().
+    """
+    key = ledger_path_for(json_path)
+    with _ledgers_lock:
+        ledger = _ledgers.get(key)
+        if ledger is None:
+            ledger = _ledgers[key] = AttendanceLedger(key)
+    if load is not None:
+        ledger.seed(load, subject_key)
+    return ledger
+
+
+def print_report(ledger, section, subject, start=None, end=None):
+    rows = ledger.summary(section=section, subject=subject, start=start, end=end)
+    span = f"{start or 'start'} .. {end or 'today'}"
+    if not rows:
+        print(f"No sessions recorded for {section.upper()} {subject} ({span}).")
+        return
+    days = ledger.daily(section, subject, start, end)
+    print(f"\n--- {section.upper()} {subject}: {len(days)} session(s), {span} ---")
+    for (roll, _), (working, present) in rows.items():
+        print(f"  {roll}: {present}/{working} ({attendance_store.percentage(working, present)}%)")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) not in (5, 6, 7) or sys.argv[1] != "report":
+        print("Usage: python attendance_ledger.py report <attendance_master.json> <section> <subject> [start] [end]")
+        sys.exit(1)
+    import subject_catalogue
+    path = os.path.abspath(sys.argv[2])
+    catalogue = subject_catalogue.get_catalogue(os.path.join(os.path.dirname(path), "subjects.json"))
+    ledger = get_ledger(path, load=attendance_store.get_store(path).load,
+                        subject_key=lambda key: catalogue.resolve(key) or key)
+    print_report(ledger, sys.argv[3], sys.argv[4].upper(), *sys.argv[5:7])
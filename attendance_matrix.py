@@ -0,0 +1,243 @@
+import sys
+import threading
+
+import numpy as np
+
+# -----------------------------------------------------------
+# Columnar attendance matrix for analytics
+# -----------------------------------------------------------
+#
+# attendance_records is turned into dense students x subjects arrays:
+#
+#   working[i, j], present[i, j]   int32 counters
+#   enrolled[i, j]                 the student has an entry for the subject
+#   percentage[i, j]               present / working * 100 (0 where working == 0)
+#
+# with index maps roll -> row, subject code -> column and a section index per
+# row. Subject keys are canonicalized through the subject catalogue, so
+# records keyed by subject name land in the same column as those keyed by
+# code. Every query below is a handful of vectorized NumPy operations.
+#
+# get_matrix() rebuilds only when the store's revision() changes.
+
+DEFAULT_BINS = (0, 50, 60, 75, 90, 100)
+
+
+class AttendanceMatrix:
+    """Dense NumPy view of an attendance_master document."""
+
+    def __init__(self, doc, catalogue=None):
+        records = doc.get("attendance_records", {}) if isinstance(doc, dict) else {}
+        self.rolls = list(records)
+        self.roll_index = {r: i for i, r in enumerate(self.rolls)}
+        self.names = []
+        self.codes = []
+        self.code_index = {}
+        self.subject_names = {}
+        self.sections = []
+        self.section_index = {}
+
+        n = len(self.rolls)
+        section_of = np.zeros(n, dtype=np.int32)
+        rows, cols, working, present = [], [], [], []
+        resolve = {}
+        for i, roll in enumerate(self.rolls):
+            rec = records[roll]
+            self.names.append(rec.get("name", roll))
+            sec = str(rec.get("section") or "").strip().upper()
+            s = self.section_index.get(sec)
+            if s is None:
+                s = self.section_index[sec] = len(self.sections)
+                self.sections.append(sec)
+            section_of[i] = s
+            for key, det in (rec.get("subjects") or {}).items():
+                if not isinstance(det, dict):
+                    continue
+                code = resolve.get(key)
+                if code is None:
+                    code = resolve[key] = (catalogue.resolve(key) if catalogue else None) or \
+                        (catalogue.resolve(det.get("subject_name")) if catalogue else None) or key
+                j = self.code_index.get(code)
+                if j is None:
+                    j = self.code_index[code] = len(self.codes)
+                    self.codes.append(code)
+                    self.subject_names[code] = det.get("subject_name") or code
+                rows.append(i)
+                cols.append(j)
+                working.append(det.get("total_working_days", 0))
+                present.append(det.get("total_present_days", 0))
+
+        shape = (n, len(self.codes))
+        self.section_of = section_of
+        self.working = np.zeros(shape, dtype=np.int32)
+        self.present = np.zeros(shape, dtype=np.int32)
+        self.enrolled = np.zeros(shape, dtype=bool)
+        if rows:
+            r = np.asarray(rows, dtype=np.int64)
+            c = np.asarray(cols, dtype=np.int64)
+            # += so a student with the same subject under two keys is summed
+            np.add.at(self.working, (r, c), np.asarray(working, dtype=np.int32))
+            np.add.at(self.present, (r, c), np.asarray(present, dtype=np.int32))
+            self.enrolled[r, c] = True
+        self.percentage = _pct(self.present, self.working)
+        self._row_working = self.working.sum(axis=1)
+        self._row_present = self.present.sum(axis=1)
+
+    # -- shape -------------------------------------------------------
+
+    @property
+    def n_students(self):
+        return len(self.rolls)
+
+    @property
+    def n_subjects(self):
+        return len(self.codes)
+
+    def _column(self, code):
+        j = self.code_index.get(code)
+        if j is None:
+            raise KeyError(f"No attendance for subject {code}")
+        return j
+
+    # -- per-student -------------------------------------------------
+
+    def overall(self):
+        """Overall percentage per student across all subjects."""
+        return _pct(self._row_present, self._row_working)
+
+    def counted(self):
+        """Mask of (student, subject) cells with at least one working day."""
+        return self.enrolled & (self.working > 0)
+
+    # -- queries -----------------------------------------------------
+
+    def section_means(self):
+        """Return {section: mean overall percentage of students with classes}."""
+        has_classes = self._row_working > 0
+        sec = self.section_of[has_classes]
+        totals = np.bincount(sec, weights=self.overall()[has_classes], minlength=len(self.sections))
+        counts = np.bincount(sec, minlength=len(self.sections))
+        return {name: round(float(totals[k] / counts[k]), 2)
+                for k, name in enumerate(self.sections) if counts[k]}
+
+    def section_subject_means(self):
+        """Return {(section, code): aggregate percentage} over counted cells."""
+        if not self.n_students or not self.n_subjects:
+            return {}
+        # group rows by section, then one reduceat per counter
+        order = np.argsort(self.section_of, kind="stable")
+        secs = self.section_of[order]
+        starts = np.flatnonzero(np.r_[True, secs[1:] != secs[:-1]])
+        w = np.add.reduceat(self.working[order].astype(np.int64), starts, axis=0)
+        p = np.add.reduceat(self.present[order].astype(np.int64), starts, axis=0)
+        pct = _pct(p, w)
+        present_secs = secs[starts]
+        out = {}
+        for s, j in zip(*np.nonzero(w)):
+            out[(self.sections[present_secs[s]], self.codes[j])] = round(float(pct[s, j]), 2)
+        return out
+
+    def percentiles(self, q=(10, 25, 50, 75, 90), code=None):
+        """Percentiles of overall attendance, or of one subject's column."""
+        if code is None:
+            values = self.overall()[self._row_working > 0]
+        else:
+            j = self._column(code)
+            values = self.percentage[self.counted()[:, j], j]
+        if values.size == 0:
+            return {int(x): 0.0 for x in q}
+        return {int(x): round(float(v), 2) for x, v in zip(q, np.percentile(values, q))}
+
+    def below(self, threshold, code=None):
+        """Boolean mask of counted cells under threshold (one column if code)."""
+        mask = self.counted() & (self.percentage < threshold)
+        return mask[:, self._column(code)] if code is not None else mask
+
+    def students_below(self, threshold, code=None):
+        """Return [(roll, code, percentage)] under threshold, lowest first."""
+        mask = self.below(threshold)
+        if code is not None:
+            keep = np.zeros_like(mask)
+            keep[:, self._column(code)] = True
+            mask &= keep
+        i, j = np.nonzero(mask)
+        pct = self.percentage[i, j]
+        order = np.argsort(pct, kind="stable")
+        i, j = i[order], j[order]
+        rolls = np.asarray(self.rolls, dtype=object)[i].tolist()
+        codes = np.asarray(self.codes, dtype=object)[j].tolist()
+        return list(zip(rolls, codes, pct[order].tolist()))
+
+    def subject_distribution(self, bins=DEFAULT_BINS):
+        """Return {code: counts per bin} for counted cells; the last bin is closed."""
+        edges = np.asarray(bins, dtype=float)
+        counted = self.counted()
+        # bucket index per cell, 100% lands in the last bucket
+        idx = np.clip(np.searchsorted(edges, self.percentage, side="right") - 1, 0, len(edges) - 2)
+        out = {}
+        for j, code in enumerate(self.codes):
+            col = counted[:, j]
+            out[code] = np.bincount(idx[col, j], minlength=len(edges) - 1).tolist()
+        return out
+
+    def summary(self):
+        overall = self.overall()[self._row_working > 0]
+        return {
+            "students": self.n_students,
+            "subjects": self.n_subjects,
+            "sections": len([s for s in self.sections if s]),
+            "average": round(float(overall.mean()), 2) if overall.size else 0.0,
+        }
+
+
+def _pct(present, working):
+    present = np.asarray(present, dtype=np.float64)
+    working = np.asarray(working, dtype=np.float64)
+    out = np.zeros(np.broadcast(present, working).shape, dtype=np.float64)
+    np.divide(present * 100.0, working, out=out, where=working > 0)
+    return np.round(out, 2)
+
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def get_matrix(store, catalogue=None):
+    """Return the matrix for a store, rebuilding only when it changed."""
+    rev = store.revision() if hasattr(store, "revision") else None
+    key = id(store)
+    with _cache_lock:
+        hit = _cache.get(key)
+        if hit is not None and rev is not None and hit[0] == rev:
+            return hit[1]
+    matrix = AttendanceMatrix(store.load(), catalogue)
+    with _cache_lock:
+        _cache[key] = (rev, matrix)
+    return matrix
+
+
+def print_report(matrix, threshold=75.0, out=None):
+    out = out or sys.stdout
+    s = matrix.summary()
+    print(f"\n--- Attendance analytics: {s['students']} students, {s['subjects']} subjects, "
+          f"{s['sections']} sections ---", file=out)
+    print(f"Campus average: {s['average']}%", file=out)
+    pcts = matrix.percentiles()
+    print("Percentiles: " + ", ".join(f"p{k} {v}%" for k, v in pcts.items()), file=out)
+
+    print("\nSection averages:", file=out)
+    for sec, mean in sorted(matrix.section_means().items()):
+        print(f"  {sec or '(none)'}: {mean}%", file=out)
+
+    edges = DEFAULT_BINS
+    labels = [f"{edges[k]}-{edges[k + 1]}" for k in range(len(edges) - 1)]
+    print("\nSubject distribution (" + " | ".join(labels) + "):", file=out)
+    for code, counts in sorted(matrix.subject_distribution().items()):
+        print(f"  {code:<8} {matrix.subject_names.get(code, code):<24} " + " | ".join(str(c) for c in counts), file=out)
+
+    low = matrix.students_below(threshold)
+    print(f"\nStudent-subject pairs below {threshold}%: {len(low)}", file=out)
+    for roll, code, pct in low[:20]:
+        print(f"  {roll} {code}: {pct}%", file=out)
+    if len(low) > 20:
+        print(f"  ... and {len(low) - 20} more", file=out)
@@ -0,0 +1,333 @@
+import os
+import sys
+import copy
+import threading
+from contextlib import ExitStack
+
+import datastore
+import attendance_store
+
+# -----------------------------------------------------------
+# Per-section attendance shards
+# -----------------------------------------------------------
+#
+# Records live in one file per section next to the master file:
+#
+#   attendance/<SECTION>.json    {"attendance_records": {roll: record}}
+#   attendance/_unassigned.json  records without a section
+#   attendance/manifest.json     {"metadata": {...}, "rolls": {roll: SECTION},
+#                                 "shards": {SECTION: student count}}
+#
+# The manifest holds the document metadata and routes a roll to its shard, so
+# marking a student locks, reads and rewrites only that section's file. The
+# manifest itself is rewritten only when students are added or move section,
+# or once a day for metadata["last_updated"].
+#
+# A missing manifest is created by splitting attendance_master.json, which is
+# left untouched. load() merges every shard; load_sections() reads only the
+# shards of the given sections. Both take a record only from the shard the
+# manifest routes its roll to.
+#
+# Moving a student writes the destination shard, then the manifest, then
+# removes the record from the old shard, all under the manifest lock and the
+# locks of every shard involved. A crash part-way leaves a stale copy in one
+# shard, never a record in none; the manifest decides which copy counts.
+# apply() re-reads the routing under each shard lock and sends a mark for a
+# roll that moved meanwhile on to its new shard.
+
+SHARD_DIR = "attendance"
+MANIFEST = "manifest.json"
+UNASSIGNED = "_unassigned"
+
+
+def shard_dir_for(json_path):
+    return os.path.join(os.path.dirname(os.path.abspath(json_path)), SHARD_DIR)
+
+
+def _norm(section):
+    return str(section or "").strip().upper()
+
+
+def _empty_manifest():
+    return {"metadata": {}, "rolls": {}, "shards": {}}
+
+
+class ShardedAttendanceStore:
+    """attendance_master.json split into one JSON file per section."""
+
+    name = "sharded"
+
+    def __init__(self, json_path, shard_dir=None):
+        self.json_path = os.path.abspath(json_path)
+        self.dir = os.path.abspath(shard_dir or shard_dir_for(json_path))
+        self.manifest_path = os.path.join(self.dir, MANIFEST)
+        self._lock = threading.RLock()
+        self._merged = None      # (revision, document)
+        os.makedirs(self.dir, exist_ok=True)
+        if not os.path.exists(self.manifest_path):
+            self._split_master()
+
+    # -- layout ------------------------------------------------------
+
+    def shard_path(self, section):
+        name = _norm(section) or UNASSIGNED
+        # section names are user input; keep them to a single file name
+        safe = "".join(ch if ch.isalnum() or ch in "-_" else "_" for ch in name)
+        return os.path.join(self.dir, safe + ".json")
+
+    def _manifest(self, fresh=False):
+        load = datastore.load_fresh if fresh else datastore.load
+        doc = load(self.manifest_path, None)
+        return doc if isinstance(doc, dict) else _empty_manifest()
+
+    def _shard(self, section, fresh=False):
+        """Return a shard document; fresh=True gives a private copy to edit and save."""
+        load = datastore.load_fresh if fresh else datastore.load
+        doc = load(self.shard_path(section), None)
+        if not isinstance(doc, dict) or not isinstance(doc.get("attendance_records"), dict):
+            return {"attendance_records": {}}
+        return copy.deepcopy(doc) if fresh else doc
+
+    def _split_master(self):
+        with datastore.locked(self.manifest_path):
+            if os.path.exists(self.manifest_path):
+                return
+            try:
+                master = datastore.load(self.json_path, attendance_store.empty_document())
+            except (OSError, ValueError):
+                master = attendance_store.empty_document()
+            self._write_all(master)
+
+    def _write_all(self, doc):
+        """Write doc as shards plus manifest; drop shards that emptied out."""
+        shards = {}
+        for roll, rec in doc.get("attendance_records", {}).items():
+            shards.setdefault(_norm(rec.get("section")), {})[roll] = rec
+        old = self._manifest(fresh=True).get("shards", {})
+        for section, records in shards.items():
+            datastore.save(self.shard_path(section), {"attendance_records": records})
+        for section in set(old) - set(shards):
+            try:
+                os.remove(self.shard_path(section))
+            except FileNotFoundError:
+                pass
+            datastore.invalidate(self.shard_path(section))
+        metadata = dict(doc.get("metadata", {}))
+        metadata["total_students"] = sum(len(r) for r in shards.values())
+        datastore.save(self.manifest_path, {
+            "metadata": metadata,
+            "rolls": {roll: sec for sec, records in shards.items() for roll in records},
+            "shards": {sec: len(records) for sec, records in shards.items()},
+        })
+
+    # -- reads -------------------------------------------------------
+
+    def sections(self):
+        return sorted(self._manifest().get("shards", {}))
+
+    def section_of(self, roll):
+        return self._manifest().get("rolls", {}).get(roll)
+
+    def load_sections(self, sections):
+        """Return a document holding only the records of the given sections."""
+        manifest = self._manifest()
+        records = {}
+        for section in {_norm(s) for s in sections}:
+            records.update(self._routed(manifest, section))
+        return {"attendance_records": records, "metadata": dict(manifest.get("metadata", {}))}
+
+    def load(self):
+        with self._lock:
+            rev = self.revision()
+            if self._merged is not None and self._merged[0] == rev:
+                return self._merged[1]
+            manifest = self._manifest()
+            records = {}
+            for section in manifest.get("shards", {}):
+                records.update(self._routed(manifest, section))
+            doc = {"attendance_records": records, "metadata": dict(manifest.get("metadata", {}))}
+            self._merged = (rev, doc)
+            return doc
+
+    def _routed(self, manifest, section):
+        """Records of a shard that the manifest routes to it (skips stale copies)."""
+        rolls = manifest.get("rolls", {})
+        return {roll: rec for roll, rec in self._shard(section)["attendance_records"].items()
+                if rolls.get(roll, section) == section}
+
+    def get_record(self, roll):
+        section = self.section_of(roll)
+        if section is None:
+            return None
+        return self._shard(section)["attendance_records"].get(roll)
+
+    def revision(self):
+        """Changes whenever the manifest or any shard changes."""
+        sig = []
+        for section in [None] + self.sections():
+            path = self.manifest_path if section is None else self.shard_path(section)
+            try:
+                st = os.stat(path)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    # -- writes ------------------------------------------------------
+
+    def _touch_manifest(self, added=None):
+        """Record new rolls ({roll: SECTION}) and today's date in the manifest."""
+        manifest = self._manifest()
+        if not added and manifest.get("metadata", {}).get("last_updated") == attendance_store.today():
+            return
+        with datastore.locked(self.manifest_path):
+            manifest = self._manifest(fresh=True)
+            manifest = {"metadata": dict(manifest.get("metadata", {})),
+                        "rolls": dict(manifest.get("rolls", {})),
+                        "shards": dict(manifest.get("shards", {}))}
+            for roll, section in (added or {}).items():
+                old = manifest["rolls"].get(roll)
+                if old == section:
+                    continue
+                if old is not None:
+                    manifest["shards"][old] = max(0, manifest["shards"].get(old, 1) - 1)
+                manifest["rolls"][roll] = section
+                manifest["shards"][section] = manifest["shards"].get(section, 0) + 1
+            manifest["metadata"]["last_updated"] = attendance_store.today()
+            manifest["metadata"]["total_students"] = len(manifest["rolls"])
+            datastore.save(self.manifest_path, manifest)
+
+    def apply(self, events):
+        previous, updated = [None] * len(events), [None] * len(events)
+        with self._lock:
+            pending, touched = list(range(len(events))), False
+            while pending:
+                rolls = self._manifest(fresh=True).get("rolls", {})
+                groups, added = {}, {}
+                for i in pending:
+                    section = rolls.get(events[i]["roll"])
+                    if section is None:
+                        section = added.setdefault(events[i]["roll"], _norm(events[i].get("section")))
+                    groups.setdefault(section, []).append(i)
+                if added:
+                    # register new rolls first so readers can route to them
+                    self._touch_manifest(added)
+                    touched = True
+                pending = []
+                for section, idx in groups.items():
+                    path = self.shard_path(section)
+                    with datastore.locked(path):
+                        # ensure_students() may have moved a roll since we routed it
+                        rolls = self._manifest(fresh=True).get("rolls", {})
+                        doc = self._shard(section, fresh=True)
+                        applied = False
+                        for i in idx:
+                            e = events[i]
+                            if rolls.get(e["roll"], section) != section:
+                                pending.append(i)
+                                continue
+                            previous[i] = attendance_store.counts_of(doc, e["roll"], e["subject"])
+                            updated[i] = attendance_store.apply_event(doc, e)
+                            applied = True
+                        if applied:
+                            datastore.save(path, doc)
+            if not touched:
+                self._touch_manifest()
+        attendance_store.notify(self, events, updated, previous)
+        return updated
+
+    def save(self, data):
+        """Replace the whole document."""
+        with self._lock, datastore.locked(self.manifest_path):
+            self._write_all(data)
+        attendance_store.notify(self, None, None)
+
+    def rekey_subjects(self, changes):
+        """Rename subject keys ({roll: {old: new}}), writing each touched shard once."""
+        rolls = self._manifest(fresh=True).get("rolls", {})
+        groups = {}
+        for roll, mapping in changes.items():
+            if roll in rolls:
+                groups.setdefault(rolls[roll], {})[roll] = mapping
+        merged = 0
+        with self._lock:
+            for section, group in groups.items():
+                path = self.shard_path(section)
+                with datastore.locked(path):
+                    doc = self._shard(section, fresh=True)
+                    merged += attendance_store.rekey_records(doc, group)
+                    datastore.save(path, doc)
+        attendance_store.notify(self, None, None)
+        return merged
+
+    def ensure_student(self, roll, name, section, subjects, metadata_defaults=None):
+        """Create roll with zeroed subjects if missing, else move it to section.
+
+        Returns True if created.
+        """
+        return bool(self.ensure_students([(roll, name, section, subjects)], metadata_defaults))
+
+    def ensure_students(self, students, metadata_defaults=None, fill_subjects=False):
+        """ensure_student() for many students, writing each touched shard once.
+
+        Returns the created rolls.
+        """
+        students = list(students)
+        with self._lock, ExitStack() as stack:
+            stack.enter_context(datastore.locked(self.manifest_path))
+            rolls = self._manifest(fresh=True).get("rolls", {})
+            groups, leaving = {}, {}
+            for student in students:
+                section_key = _norm(student[2])
+                groups.setdefault(section_key, []).append(student)
+                old = rolls.get(student[0])
+                if old is not None and old != section_key:
+                    leaving.setdefault(old, []).append(student[0])
+            # hold every shard involved until the old copies are gone, so a
+            # concurrent apply() either lands before the copy or sees the move
+            for section in sorted(set(groups) | set(leaving)):
+                stack.enter_context(datastore.locked(self.shard_path(section)))
+            moved = {}
+            for old, out in leaving.items():
+                records = self._shard(old, fresh=True)["attendance_records"]
+                moved.update({roll: records[roll] for roll in out if roll in records})
+            created = []
+            for section_key, group in groups.items():
+                doc = self._shard(section_key, fresh=True)
+                for student in group:
+                    if student[0] in moved:
+                        doc["attendance_records"][student[0]] = moved[student[0]]
+                created += attendance_store.ensure_records(doc, group, fill_subjects=fill_subjects)
+                datastore.save(self.shard_path(section_key), doc)
+            if metadata_defaults and not self._manifest().get("metadata"):
+                manifest = dict(self._manifest(fresh=True))
+                manifest["metadata"] = dict(metadata_defaults)
+                datastore.save(self.manifest_path, manifest)
+            self._touch_manifest({student[0]: _norm(student[2]) for student in students})
+            # last: the manifest already routes these rolls away from here
+            for old, out in leaving.items():
+                doc = self._shard(old, fresh=True)
+                for roll in out:
+                    doc["attendance_records"].pop(roll, None)
+                datastore.save(self.shard_path(old), doc)
+        attendance_store.notify(self, None, None)
+        return created
+
+
+def export_json(shard_dir, json_path):
+    """Merge the shards back into one attendance_master.json."""
+    store = ShardedAttendanceStore(json_path, shard_dir)
+    datastore.save(json_path, store.load())
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3 or sys.argv[1] not in ("split", "export"):
+        print("Usage: python attendance_shards.py split|export <attendance_master.json>")
+        sys.exit(1)
+    path = os.path.abspath(sys.argv[2])
+    if sys.argv[1] == "split":
+        store = ShardedAttendanceStore(path)
+        print(f"{len(store.sections())} shard(s) in {store.dir}")
+    else:
+        export_json(shard_dir_for(path), path)
+        print(f"Exported shards to {path}")
@@ -0,0 +1,659 @@
+import os
+import sys
+import copy
+import json
+import sqlite3
+import threading
+from datetime import datetime
+
+import datastore
+
+# -----------------------------------------------------------
+# Attendance storage backends
+# -----------------------------------------------------------
+#
+# Writers describe a change as an event and hand it to the store:
+#
+#   {"roll": "20250001", "subject": "TMA101", "op": "add",
+#    "working": 1, "present": 1, "teacher": "utkarsh pant",
+#    "ts": "2025-11-05T09:12:00", "subject_name": "Basic Maths", "section": "AI"}
+#
+# op "add" adds the working/present deltas, op "set" replaces the counters.
+# Every store can hand back the whole document in the attendance_master.json
+# schema, so read paths do not care which backend is active.
+#
+# The backend is chosen with the EDUTRACK_ATTENDANCE_BACKEND environment
+# variable: "journal" (default, see attendance_journal), "json", "sqlite" or
+# "sharded" (one file per section, see attendance_shards).
+
+BACKEND = os.environ.get("EDUTRACK_ATTENDANCE_BACKEND", "journal").strip().lower() or "journal"
+
+
+def today():
+    return datetime.now().strftime("%Y-%m-%d")
+
+
+def now():
+    return datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+
+
+def percentage(working, present):
+    if working > 0:
+        return round((present / working) * 100, 2)
+    return 0.0
+
+
+def empty_document():
+    return {"attendance_records": {}, "metadata": {}}
+
+
+def new_subject_entry(subject_name, last_updated=None):
+    return {
+        "subject_name": subject_name,
+        "total_working_days": 0,
+        "total_present_days": 0,
+        "attendance_percentage": 0.0,
+        "last_updated": today() if last_updated is None else last_updated,
+    }
+
+
+def make_event(roll, subject, op="add", working=1, present=1, teacher="", subject_name=None, section=None, ts=None):
+    """Build an attendance event. See the module comment for the fields."""
+    return {
+        "roll": str(roll),
+        "subject": subject,
+        "op": op,
+        "working": int(working),
+        "present": int(present),
+        "teacher": teacher or "",
+        "ts": ts or now(),
+        "subject_name": subject_name,
+        "section": section,
+    }
+
+
+def new_counts(old_working, old_present, event):
+    """Return the (working, present) counters after applying event."""
+    if event["op"] == "set":
+        return int(event["working"]), int(event["present"])
+    return int(old_working) + int(event["working"]), int(old_present) + int(event["present"])
+
+
+def apply_event(doc, event):
+    """Apply one event to an attendance_master-shaped document in memory.
+
+    Missing student records and subject entries are created. Returns the
+    updated subject entry.
+    """
+    records = doc.setdefault("attendance_records", {})
+    roll = event["roll"]
+    rec = records.get(roll)
+    if rec is None:
+        rec = records[roll] = {"name": roll, "section": event.get("section") or "", "subjects": {}}
+    subjects = rec.get("subjects")
+    if not isinstance(subjects, dict):
+        subjects = rec["subjects"] = {}
+    key = event["subject"]
+    det = subjects.get(key)
+    if not isinstance(det, dict):
+        det = subjects[key] = new_subject_entry(event.get("subject_name") or key, "")
+    tw, tp = new_counts(det.get("total_working_days", 0), det.get("total_present_days", 0), event)
+    det["total_working_days"] = tw
+    det["total_present_days"] = tp
+    det["attendance_percentage"] = percentage(tw, tp)
+    det["last_updated"] = event["ts"][:10]
+    return det
+
+
+# -----------------------------------------------------------
+# Write listeners
+# -----------------------------------------------------------
+#
+# Derived views (eligibility, alerts) register a callback here instead of
+# rescanning the records. After every committed write each store calls
+#
+#   listener(store, events, updated, previous)
+#
+# with the applied events, the resulting subject entries and the
+# (working, present) counters each event started from, or with events=None
+# after a whole-document write (save/ensure_student/import), which means
+# "anything may have changed".
+
+_listeners = []
+
+
+def add_listener(fn):
+    if fn not in _listeners:
+        _listeners.append(fn)
+
+
+def remove_listener(fn):
+    if fn in _listeners:
+        _listeners.remove(fn)
+
+
+def notify(store, events, updated, previous=None):
+    for fn in list(_listeners):
+        try:
+            fn(store, events, updated, previous)
+        except Exception as e:
+            print("Attendance listener failed:", e)
+
+
+def counts_of(doc, roll, subject):
+    """Return the (working, present) counters of one subject entry, or (0, 0)."""
+    rec = doc.get("attendance_records", {}).get(roll) or {}
+    det = (rec.get("subjects") or {}).get(subject)
+    if not isinstance(det, dict):
+        return 0, 0
+    return int(det.get("total_working_days", 0)), int(det.get("total_present_days", 0))
+
+
+def ensure_records(doc, students, metadata_defaults=None, fill_subjects=False):
+    """Create or re-section student records in an attendance document in memory.
+
+    students is an iterable of (roll, name, section, subjects), where subjects
+    maps subject key -> subject name. New rolls get zeroed subject entries;
+    existing ones have their section updated and, with fill_subjects, a zeroed
+    entry for every subject key they lack. Returns the created rolls.
+    """
+    records = doc.setdefault("attendance_records", {})
+    created = []
+    for roll, name, section, subjects in students:
+        if roll in records:
+            records[roll]["section"] = section
+            if fill_subjects:
+                have = records[roll].setdefault("subjects", {})
+                for key, nm in subjects.items():
+                    if key not in have:
+                        have[key] = new_subject_entry(nm)
+            continue
+        records[roll] = {
+            "name": name or roll,
+            "section": section,
+            "subjects": {key: new_subject_entry(nm) for key, nm in subjects.items()},
+        }
+        created.append(roll)
+    if metadata_defaults and "metadata" not in doc:
+        doc["metadata"] = dict(metadata_defaults)
+    return created
+
+
+def rekey_records(doc, changes):
+    """Rename subject keys in an attendance document in memory.
+
+    changes is {roll: {old key: new key}}. An entry whose new key already
+    exists is merged into it: the counters are summed and the later
+    last_updated kept. Returns the number of merged entries.
+    """
+    records = doc.get("attendance_records", {})
+    merged = 0
+    for roll, mapping in changes.items():
+        subjects = (records.get(roll) or {}).get("subjects")
+        if not isinstance(subjects, dict):
+            continue
+        for old, new in mapping.items():
+            det = subjects.pop(old, None) if old != new else None
+            if det is None:
+                continue
+            into = subjects.get(new)
+            if into is None:
+                subjects[new] = det
+                continue
+            tw = into.get("total_working_days", 0) + det.get("total_working_days", 0)
+            tp = into.get("total_present_days", 0) + det.get("total_present_days", 0)
+            into["total_working_days"], into["total_present_days"] = tw, tp
+            into["attendance_percentage"] = percentage(tw, tp)
+            into["last_updated"] = max(into.get("last_updated", ""), det.get("last_updated", ""))
+            merged += 1
+    return merged
+
+
+def writable(doc, rolls):
+    """Return a copy of doc that is safe to edit for the given rolls.
+
+    datastore hands out its shared cached object, so writers change a copy and
+    only a successful save() replaces the cached entry. The records of rolls
+    are deep-copied; the rest is shared with doc and must not be modified.
+    """
+    records = dict(doc.get("attendance_records") or {})
+    for roll in rolls:
+        if roll in records:
+            records[roll] = copy.deepcopy(records[roll])
+    out = dict(doc)
+    out["attendance_records"] = records
+    if isinstance(doc.get("metadata"), dict):
+        out["metadata"] = dict(doc["metadata"])
+    return out
+
+
+def touch_metadata(doc):
+    meta = doc.setdefault("metadata", {})
+    meta["last_updated"] = today()
+    meta["total_students"] = len(doc.get("attendance_records", {}))
+
+
+class JsonAttendanceStore:
+    """The original layout: one attendance_master.json rewritten per change."""
+
+    name = "json"
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+
+    def load(self):
+        return datastore.load(self.path, empty_document())
+
+    def get_record(self, roll):
+        return self.load().get("attendance_records", {}).get(roll)
+
+    def revision(self):
+        """Changes whenever the document returned by load() may have changed."""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def save(self, data):
+        datastore.save(self.path, data)
+        notify(self, None, None)
+
+    def apply(self, events):
+        with datastore.locked(self.path):
+            doc = writable(datastore.load_fresh(self.path, empty_document()), {e["roll"] for e in events})
+            previous, updated = [], []
+            for e in events:
+                previous.append(counts_of(doc, e["roll"], e["subject"]))
+                updated.append(apply_event(doc, e))
+            touch_metadata(doc)
+            datastore.save(self.path, doc)
+        notify(self, events, updated, previous)
+        return updated
+
+    def ensure_student(self, roll, name, section, subjects, metadata_defaults=None):
+        """Create roll with zeroed subjects if missing, else update its section.
+
+        subjects maps subject key -> subject name. Returns True if created.
+        """
+        return bool(self.ensure_students([(roll, name, section, subjects)], metadata_defaults))
+
+    def ensure_students(self, students, metadata_defaults=None, fill_subjects=False):
+        """ensure_student() for many students in one write. Returns the created rolls.
+
+        See ensure_records() for fill_subjects.
+        """
+        students = list(students)
+        with datastore.locked(self.path):
+            doc = writable(datastore.load_fresh(self.path, empty_document()), {s[0] for s in students})
+            created = ensure_records(doc, students, metadata_defaults, fill_subjects)
+            touch_metadata(doc)
+            self.save(doc)
+        return created
+
+    def rekey_subjects(self, changes):
+        """rekey_records() in one write. Returns the number of merged entries."""
+        with datastore.locked(self.path):
+            doc = writable(datastore.load_fresh(self.path, empty_document()), changes)
+            merged = rekey_records(doc, changes)
+            self.save(doc)
+        return merged
+
+
+class SQLiteAttendanceStore:
+    """Attendance counters in SQLite: one row per (roll, subject).
+
+    Marking a student is a single-row UPSERT in its own transaction instead of
+    a rewrite of the whole master file. Each row keeps its own subject_name,
+    as the JSON records do; the subjects table only lists the codes seen.
+    """
+
+    name = "sqlite"
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS students (
+            roll TEXT PRIMARY KEY,
+            name TEXT NOT NULL,
+            section TEXT NOT NULL DEFAULT ''
+        );
+        CREATE TABLE IF NOT EXISTS subjects (
+            code TEXT PRIMARY KEY,
+            name TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS counters (
+            roll TEXT NOT NULL REFERENCES students(roll),
+            subject TEXT NOT NULL REFERENCES subjects(code),
+            name TEXT NOT NULL DEFAULT '',
+            working INTEGER NOT NULL DEFAULT 0,
+            present INTEGER NOT NULL DEFAULT 0,
+            percentage REAL NOT NULL DEFAULT 0.0,
+            last_updated TEXT NOT NULL DEFAULT '',
+            PRIMARY KEY (roll, subject)
+        );
+        CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT NOT NULL
+        );
+    """
+
+    def __init__(self, db_path, json_path=None):
+        self.db_path = os.path.abspath(db_path)
+        self.json_path = json_path
+        fresh = not os.path.exists(self.db_path)
+        conn = self._connect()
+        try:
+            conn.executescript(self.SCHEMA)
+            if "name" not in [row[1] for row in conn.execute("PRAGMA table_info(counters)")]:
+                # stores from before per-row names: start from the code's name
+                conn.execute("ALTER TABLE counters ADD COLUMN name TEXT NOT NULL DEFAULT ''")
+                conn.execute("UPDATE counters SET name = COALESCE("
+                             "(SELECT name FROM subjects WHERE code = counters.subject), subject)")
+        finally:
+            conn.close()
+        if fresh and json_path and os.path.exists(json_path):
+            self.import_json(datastore.load(json_path, empty_document()))
+            print(f"Imported {json_path} into {self.db_path}")
+
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _write(self):
+        datastore.note_write(self.db_path)
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        return conn
+
+    # -- reads -------------------------------------------------------
+
+    def load(self):
+        return self.export_json()
+
+    def get_record(self, roll):
+        conn = self._connect()
+        try:
+            row = conn.execute("SELECT name, section FROM students WHERE roll = ?", (roll,)).fetchone()
+            if row is None:
+                return None
+            rec = {"name": row[0], "section": row[1], "subjects": {}}
+            for r in conn.execute(
+                    "SELECT subject, name, working, present, percentage, last_updated "
+                    "FROM counters WHERE roll = ? ORDER BY rowid", (roll,)):
+                rec["subjects"][r[0]] = self._entry(r[1:])
+            return rec
+        finally:
+            conn.close()
+
+    def revision(self):
+        sig = []
+        for p in (self.db_path, self.db_path + "-wal"):
+            try:
+                st = os.stat(p)
+                sig.append((st.st_mtime_ns, st.st_size))
+            except OSError:
+                sig.append(None)
+        return tuple(sig)
+
+    @staticmethod
+    def _entry(row):
+        name, working, present, pct, updated = row
+        return {
+            "subject_name": name,
+            "total_working_days": working,
+            "total_present_days": present,
+            "attendance_percentage": pct,
+            "last_updated": updated,
+        }
+
+    def export_json(self):
+        """Return the whole store in the attendance_master.json schema."""
+        conn = self._connect()
+        try:
+            doc = empty_document()
+            records = doc["attendance_records"]
+            for roll, name, section in conn.execute("SELECT roll, name, section FROM students ORDER BY rowid"):
+                records[roll] = {"name": name, "section": section, "subjects": {}}
+            for r in conn.execute(
+                    "SELECT roll, subject, name, working, present, percentage, last_updated "
+                    "FROM counters ORDER BY rowid"):
+                rec = records.get(r[0])
+                if rec is not None:
+                    rec["subjects"][r[1]] = self._entry(r[2:])
+            for key, value in conn.execute("SELECT key, value FROM metadata ORDER BY rowid"):
+                doc["metadata"][key] = json.loads(value)
+            return doc
+        finally:
+            conn.close()
+
+    # -- writes ------------------------------------------------------
+
+    def import_json(self, data):
+        """Make the store match an attendance_master.json document.
+
+        Rows are upserted and only the ones that differ are rewritten; rows
+        missing from data are deleted.
+        """
+        records = data.get("attendance_records", {})
+        metadata = data.get("metadata") or {}
+        conn = self._write()
+        try:
+            keep = set()
+            for roll, rec in records.items():
+                conn.execute("INSERT INTO students (roll, name, section) VALUES (?, ?, ?) "
+                             "ON CONFLICT(roll) DO UPDATE SET name = excluded.name, section = excluded.section "
+                             "WHERE name IS NOT excluded.name OR section IS NOT excluded.section",
+                             (roll, rec.get("name", roll), rec.get("section", "")))
+                for key, det in (rec.get("subjects") or {}).items():
+                    keep.add((roll, key))
+                    self._upsert_subject(conn, key, det.get("subject_name") or key)
+                    conn.execute(
+                        "INSERT INTO counters (roll, subject, name, working, present, percentage, last_updated) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(roll, subject) DO UPDATE SET "
+                        "name = excluded.name, working = excluded.working, present = excluded.present, "
+                        "percentage = excluded.percentage, last_updated = excluded.last_updated "
+                        "WHERE name IS NOT excluded.name OR working IS NOT excluded.working "
+                        "OR present IS NOT excluded.present OR percentage IS NOT excluded.percentage "
+                        "OR last_updated IS NOT excluded.last_updated",
+                        (roll, key, det.get("subject_name") or key, int(det.get("total_working_days", 0)),
+                         int(det.get("total_present_days", 0)), float(det.get("attendance_percentage", 0.0)),
+                         det.get("last_updated", "")))
+            stale = [row for row in conn.execute("SELECT roll, subject FROM counters") if row not in keep]
+            conn.executemany("DELETE FROM counters WHERE roll = ? AND subject = ?", stale)
+            conn.executemany("DELETE FROM students WHERE roll = ?",
+                             [row for row in conn.execute("SELECT roll FROM students") if row[0] not in records])
+            for key, value in metadata.items():
+                conn.execute("INSERT INTO metadata (key, value) VALUES (?, ?) "
+                             "ON CONFLICT(key) DO UPDATE SET value = excluded.value WHERE value IS NOT excluded.value",
+                             (key, json.dumps(value)))
+            conn.executemany("DELETE FROM metadata WHERE key = ?",
+                             [row for row in conn.execute("SELECT key FROM metadata") if row[0] not in metadata])
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        notify(self, None, None)
+
+    save = import_json
+
+    @staticmethod
+    def _upsert_subject(conn, code, name):
+        conn.execute("INSERT INTO subjects (code, name) VALUES (?, ?) ON CONFLICT(code) DO NOTHING", (code, name))
+
+    @staticmethod
+    def _touch_metadata(conn):
+        conn.execute("INSERT INTO metadata (key, value) VALUES ('last_updated', ?) "
+                     "ON CONFLICT(key) DO UPDATE SET value = excluded.value", (json.dumps(today()),))
+        conn.execute("INSERT INTO metadata (key, value) VALUES ('total_students', (SELECT COUNT(*) FROM students)) "
+                     "ON CONFLICT(key) DO UPDATE SET value = excluded.value")
+
+    def apply(self, events):
+        conn = self._write()
+        try:
+            previous, updated = [], []
+            for e in events:
+                conn.execute("INSERT INTO students (roll, name, section) VALUES (?, ?, ?) ON CONFLICT(roll) DO NOTHING",
+                             (e["roll"], e["roll"], e.get("section") or ""))
+                self._upsert_subject(conn, e["subject"], e.get("subject_name") or e["subject"])
+                row = conn.execute("SELECT working, present FROM counters WHERE roll = ? AND subject = ?",
+                                   (e["roll"], e["subject"])).fetchone()
+                previous.append(tuple(row or (0, 0)))
+                tw, tp = new_counts(*previous[-1], e)
+                pct = percentage(tw, tp)
+                conn.execute(
+                    "INSERT INTO counters (roll, subject, name, working, present, percentage, last_updated) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT(roll, subject) DO UPDATE SET "
+                    "working = excluded.working, present = excluded.present, "
+                    "percentage = excluded.percentage, last_updated = excluded.last_updated",
+                    (e["roll"], e["subject"], e.get("subject_name") or e["subject"], tw, tp, pct, e["ts"][:10]))
+                name = conn.execute("SELECT name FROM counters WHERE roll = ? AND subject = ?",
+                                    (e["roll"], e["subject"])).fetchone()[0]
+                updated.append(self._entry((name, tw, tp, pct, e["ts"][:10])))
+            self._touch_metadata(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        notify(self, events, updated, previous)
+        return updated
+
+    def ensure_student(self, roll, name, section, subjects, metadata_defaults=None):
+        return bool(self.ensure_students([(roll, name, section, subjects)], metadata_defaults))
+
+    def ensure_students(self, students, metadata_defaults=None, fill_subjects=False):
+        """Create or re-section many students in one transaction. Returns the created rolls."""
+        conn = self._write()
+        try:
+            created = []
+            for roll, name, section, subjects in students:
+                if conn.execute("SELECT 1 FROM students WHERE roll = ?", (roll,)).fetchone() is not None:
+                    conn.execute("UPDATE students SET section = ? WHERE roll = ?", (section, roll))
+                    if not fill_subjects:
+                        continue
+                else:
+                    created.append(roll)
+                    conn.execute("INSERT INTO students (roll, name, section) VALUES (?, ?, ?)", (roll, name or roll, section))
+                for key, nm in subjects.items():
+                    self._upsert_subject(conn, key, nm)
+                    conn.execute("INSERT INTO counters (roll, subject, name, last_updated) VALUES (?, ?, ?, ?) "
+                                 "ON CONFLICT(roll, subject) DO NOTHING", (roll, key, nm, today()))
+            if metadata_defaults and conn.execute("SELECT COUNT(*) FROM metadata").fetchone()[0] == 0:
+                for key, value in metadata_defaults.items():
+                    conn.execute("INSERT INTO metadata (key, value) VALUES (?, ?)", (key, json.dumps(value)))
+            self._touch_metadata(conn)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        notify(self, None, None)
+        return created
+
+    def rekey_subjects(self, changes):
+        """Rename subject keys ({roll: {old: new}}) in one transaction.
+
+        Returns the number of entries merged into an existing key.
+        """
+        conn = self._write()
+        try:
+            merged = 0
+            for roll, mapping in changes.items():
+                for old, new in mapping.items():
+                    row = conn.execute("SELECT working, present, last_updated, name FROM counters "
+                                       "WHERE roll = ? AND subject = ?", (roll, old)).fetchone()
+                    if row is None or old == new:
+                        continue
+                    self._upsert_subject(conn, new, row[3])
+                    into = conn.execute("SELECT working, present, last_updated FROM counters "
+                                        "WHERE roll = ? AND subject = ?", (roll, new)).fetchone()
+                    if into is None:
+                        conn.execute("UPDATE counters SET subject = ? WHERE roll = ? AND subject = ?", (new, roll, old))
+                        continue
+                    tw, tp = into[0] + row[0], into[1] + row[1]
+                    conn.execute("UPDATE counters SET working = ?, present = ?, percentage = ?, last_updated = ? "
+                                 "WHERE roll = ? AND subject = ?",
+                                 (tw, tp, percentage(tw, tp), max(into[2], row[2]), roll, new))
+                    conn.execute("DELETE FROM counters WHERE roll = ? AND subject = ?", (roll, old))
+                    merged += 1
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        notify(self, None, None)
+        return merged
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def sqlite_path_for(json_path):
+    return os.path.splitext(os.path.abspath(json_path))[0] + ".db"
+
+
+def get_store(json_path, backend=None):
+    """Return the attendance store for the master file at json_path."""
+    backend = (backend or BACKEND).strip().lower()
+    key = (backend, os.path.abspath(json_path))
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            if backend == "json":
+                store = JsonAttendanceStore(json_path)
+            elif backend == "sqlite":
+                store = SQLiteAttendanceStore(sqlite_path_for(json_path), json_path=json_path)
+            elif backend == "journal":
+                import attendance_journal
+                store = attendance_journal.JournalAttendanceStore(json_path)
+            elif backend == "sharded":
+                import attendance_shards
+                store = attendance_shards.ShardedAttendanceStore(json_path)
+            else:
+                raise ValueError(f"Unknown attendance backend: {backend}")
+            _stores[key] = store
+        return store
+
+
+def load_sections(store, sections):
+    """Return a document with at least the records of the given sections.
+
+    Stores that keep sections apart read only those; the others load everything.
+    """
+    fn = getattr(store, "load_sections", None)
+    return fn(sections) if fn is not None else store.load()
+
+
+def import_json_file(json_path, db_path=None):
+    """Load an attendance_master.json file into the SQLite store."""
+    store = SQLiteAttendanceStore(db_path or sqlite_path_for(json_path))
+    store.import_json(datastore.load(json_path, empty_document()))
+    return store
+
+
+def export_json_file(json_path, db_path=None):
+    """Write the SQLite store back out as attendance_master.json."""
+    store = SQLiteAttendanceStore(db_path or sqlite_path_for(json_path))
+    datastore.save(json_path, store.export_json())
+    return store
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("import", "export"):
+        print("Usage: python attendance_store.py import|export <attendance_master.json> [database.db]")
+        sys.exit(1)
+    action, path = sys.argv[1], sys.argv[2]
+    db = sys.argv[3] if len(sys.argv) > 3 else None
+    if action == "import":
+        s = import_json_file(path, db)
+        print(f"Imported {path} into {s.db_path}")
+    else:
+        s = export_json_file(path, db)
+        print(f"Exported {s.db_path} to {path}")
@@ -0,0 +1,385 @@
+import os
+import sys
+import copy
+import json
+import time
+from collections import namedtuple
+from contextlib import ExitStack
+
+import datastore
+import attendance_store
+import rollnumbers
+import subject_catalogue
+
+# -----------------------------------------------------------
+# Cross-file consistency checker
+# -----------------------------------------------------------
+#
+# The same facts live in several files:
+#
+#   roll -> section     sections.json, studentsubjects.json, attendance records
+#   section names       sectionlist.json, sections.json, teachersections.json,
+#                       sectionsubjects.json
+#   subjects            subjects.json (catalogue), sectionsubjects.json,
+#                       attendance subject keys (code, or name in older records)
+#
+# check() loads every file once, builds the roll/section/subject indexes and
+# walks each file in one linear pass, so the cost is O(students x subjects).
+# Every finding is an Issue with the file and a precise location such as
+# attendance_master.json:attendance_records[20250001].subjects["C Lang"].
+#
+# sections.json is taken as the source of truth for a roll's section. Issues
+# marked fixable have a deterministic repair:
+#
+#   section drift        studentsubjects.json / attendance record follow sections.json
+#   missing entries      studentsubjects.json entry or attendance record created
+#                        from sectionsubjects.json
+#   name-keyed subject   attendance key renamed to the subject code (unless the
+#                        code key already exists)
+#   stale percentage     attendance_percentage recomputed from the counters
+#   unlisted section     section appended to sectionlist.json
+#
+# repair() applies all of them in memory, then holds the lock of every file
+# involved, refuses to write if any file changed since the check, and writes
+# each changed file once with an atomic replace, one file after another. The
+# files are not replaced together: if a write fails part-way, PartialRepair
+# names the files already written, and running check and repair again
+# finishes the job. Anything else (unknown rolls, orphan records, impossible
+# counters, unknown subjects) is reported only.
+
+ERROR = "error"
+WARNING = "warning"
+
+# target identifies what a repair acts on: (roll,), (roll, subject key) or (section,)
+Issue = namedtuple("Issue", "kind severity file location message target fixable")
+
+FILES = {
+    "sections": "sections.json",
+    "sectionlist": "sectionlist.json",
+    "teachersections": "teachersections.json",
+    "sectionsubjects": "sectionsubjects.json",
+    "studentsubjects": "studentsubjects.json",
+    "rollnumbers": "rollnumbers.json",
+    "subjects": "subjects.json",
+    "attendance": "attendance_master.json",
+}
+
+
+def _norm(section):
+    return str(section or "").strip().upper()
+
+
+def _load(path, default):
+    try:
+        doc = datastore.load(path, default)
+    except (OSError, ValueError):
+        return default
+    return doc if isinstance(doc, type(default)) else default
+
+
+class Report:
+    """Issues found by check(), plus what repair() needs to act on them."""
+
+    def __init__(self, base_dir, store):
+        self.base_dir = base_dir
+        self.store = store
+        self.issues = []
+        self.docs = {}
+        self.signatures = {}
+        self.revision = None
+        self.timings = {}
+        self.students = 0
+
+    def add(self, kind, severity, name, location, message, target=(), fixable=False):
+        self.issues.append(Issue(kind, severity, FILES[name], location, message, target, fixable))
+
+    def counts(self):
+        out = {}
+        for issue in self.issues:
+            out[issue.kind] = out.get(issue.kind, 0) + 1
+        return out
+
+    def fixable(self):
+        return [i for i in self.issues if i.fixable]
+
+
+def _path(base_dir, name):
+    return os.path.join(base_dir, FILES[name])
+
+
+def check(base_dir, store=None):
+    """Validate every file under base_dir in one pass. Returns a Report."""
+    t = time.perf_counter()
+    base_dir = os.path.abspath(base_dir)
+    store = store or attendance_store.get_store(_path(base_dir, "attendance"))
+    report = Report(base_dir, store)
+    for name, default in (("sections", {}), ("sectionlist", []), ("teachersections", {}),
+                          ("sectionsubjects", {}), ("studentsubjects", {})):
+        path = _path(base_dir, name)
+        report.docs[name] = _load(path, default)
+        report.signatures[name] = datastore.signature(path)
+    report.revision = store.revision() if hasattr(store, "revision") else None
+    attendance = store.load()
+    report.docs["attendance"] = attendance
+    registry = rollnumbers.get_registry(_path(base_dir, "rollnumbers"))
+    catalogue = subject_catalogue.get_catalogue(_path(base_dir, "subjects"))
+    report.timings["load"] = time.perf_counter() - t
+
+    t = time.perf_counter()
+    _check(report, registry, catalogue)
+    report.timings["check"] = time.perf_counter() - t
+    return report
+
+
+def _check(report, registry, catalogue):
+    docs = report.docs
+    sections = docs["sections"]
+    section_subjects = {_norm(k): v for k, v in docs["sectionsubjects"].items()}
+    student_subjects = docs["studentsubjects"]
+    records = docs["attendance"].get("attendance_records", {})
+    listed = {_norm(s) for s in docs["sectionlist"] if _norm(s)}
+    students = registry.entries("student")
+    known_rolls = set(students.values())
+    report.students = len(sections)
+
+    resolved = {}
+
+    def resolve(text):
+        if text not in resolved:
+            resolved[text] = catalogue.resolve(text)
+        return resolved[text]
+
+    # -- section names ------------------------------------------------
+    unlisted = {}
+    for roll, sec in sections.items():
+        if _norm(sec) not in listed:
+            unlisted.setdefault(_norm(sec), f"sections.json[{roll}]")
+    for teacher, secs in docs["teachersections"].items():
+        for sec in secs if isinstance(secs, list) else [secs]:
+            if _norm(sec) not in listed:
+                unlisted.setdefault(_norm(sec), f"teachersections.json[{teacher!r}]")
+    for sec, names in section_subjects.items():
+        if sec not in listed:
+            unlisted.setdefault(sec, f"sectionsubjects.json[{sec}]")
+        for name in names if isinstance(names, list) else []:
+            if resolve(name) is None:
+                report.add("unknown-subject", WARNING, "sectionsubjects", f"[{sec}]",
+                           f"subject {name!r} is not in subjects.json")
+    for sec, where in sorted(unlisted.items()):
+        if sec:
+            report.add("unlisted-section", ERROR, "sectionlist", "[]",
+                       f"section {sec} is used in {where} but missing from sectionlist.json", (sec,), True)
+
+    # -- sections.json against the other student files ------------------
+    for roll, sec in sections.items():
+        sec = _norm(sec)
+        if roll not in known_rolls:
+            report.add("unknown-roll", ERROR, "sections", f"[{roll}]",
+                       "roll number is not a registered student")
+        has_subjects = isinstance(section_subjects.get(sec), list) and bool(section_subjects[sec])
+        entry = student_subjects.get(roll)
+        if not isinstance(entry, dict):
+            report.add("missing-student-subjects", ERROR, "studentsubjects", f"[{roll}]",
+                       f"no entry for a student in section {sec}", (roll,), has_subjects)
+        elif _norm(entry.get("section")) != sec:
+            report.add("section-drift", ERROR, "studentsubjects", f"[{roll}].section",
+                       f"{entry.get('section')!r} but sections.json says {sec}", (roll,), True)
+        elif has_subjects and list(entry.get("subjects") or []) != section_subjects[sec]:
+            report.add("subject-drift", WARNING, "studentsubjects", f"[{roll}].subjects",
+                       f"differs from sectionsubjects.json[{sec}]")
+        rec = records.get(roll)
+        if rec is None:
+            report.add("missing-attendance", ERROR, "attendance", f"attendance_records[{roll}]",
+                       f"no attendance record for a student in section {sec}", (roll,), has_subjects)
+        elif _norm(rec.get("section")) != sec:
+            report.add("section-drift", ERROR, "attendance", f"attendance_records[{roll}].section",
+                       f"{rec.get('section')!r} but sections.json says {sec}", (roll,), True)
+
+    for roll in student_subjects:
+        if roll not in sections:
+            report.add("orphan", WARNING, "studentsubjects", f"[{roll}]",
+                       "student has no section in sections.json")
+
+    # -- attendance records -------------------------------------------
+    for roll, rec in records.items():
+        where = f"attendance_records[{roll}]"
+        if roll not in sections:
+            report.add("orphan", WARNING, "attendance", where, "student has no section in sections.json")
+        if roll not in known_rolls:
+            report.add("unknown-roll", ERROR, "attendance", where, "roll number is not a registered student")
+        subjects = rec.get("subjects") if isinstance(rec, dict) else None
+        if not isinstance(subjects, dict):
+            report.add("malformed", ERROR, "attendance", where + ".subjects", "subjects is not an object")
+            continue
+        for key, det in subjects.items():
+            loc = f"{where}.subjects[{key!r}]"
+            if not isinstance(det, dict):
+                report.add("malformed", ERROR, "attendance", loc, "subject entry is not an object")
+                continue
+            code = resolve(key) or resolve(det.get("subject_name"))
+            if code is None:
+                report.add("unknown-subject", WARNING, "attendance", loc, "subject is not in subjects.json")
+            elif key != code:
+                report.add("name-keyed", WARNING, "attendance", loc,
+                           f"keyed by name; code is {code}" +
+                           (" (code key also present)" if code in subjects else ""),
+                           (roll, key, code), code not in subjects)
+            working = det.get("total_working_days", 0)
+            present = det.get("total_present_days", 0)
+            if not isinstance(working, int) or not isinstance(present, int) or \
+                    working < 0 or present < 0 or present > working:
+                report.add("bad-counters", ERROR, "attendance", loc,
+                           f"present {present} / working {working} is impossible")
+            elif det.get("attendance_percentage") != attendance_store.percentage(working, present):
+                report.add("stale-percentage", WARNING, "attendance", loc + ".attendance_percentage",
+                           f"{det.get('attendance_percentage')} but counters give "
+                           f"{attendance_store.percentage(working, present)}", (roll, key), True)
+
+
+class Changed(Exception):
+    """A file changed between check() and repair()."""
+
+
+class PartialRepair(Exception):
+    """A repair failed after some of its files were written."""
+
+    def __init__(self, done, failed, cause):
+        self.done, self.failed, self.cause = done, failed, cause
+        super().__init__(f"repair partially applied: {', '.join(done) or 'nothing'} written, "
+                         f"{failed} failed ({cause}); run the check and repair again to finish it")
+
+
+def repair(report, catalogue=None):
+    """Apply every fixable issue, writing each changed file once. Returns {file: changes}.
+
+    Raises Changed if any file was written since the report was made, before
+    writing anything, and PartialRepair if a write fails after others
+    succeeded.
+    """
+    base_dir, store = report.base_dir, report.store
+    catalogue = catalogue or subject_catalogue.get_catalogue(_path(base_dir, "subjects"))
+    fixes = report.fixable()
+    if not fixes:
+        return {}
+    docs = {name: copy.deepcopy(doc) for name, doc in report.docs.items()}
+    sections = docs["sections"]
+    section_subjects = {_norm(k): v for k, v in docs["sectionsubjects"].items()}
+    records = docs["attendance"].setdefault("attendance_records", {})
+    changed = {}
+
+    def bump(name):
+        changed[FILES[name]] = changed.get(FILES[name], 0) + 1
+
+    # rename keys last so percentage fixes still find the entries they name
+    for issue in sorted(fixes, key=lambda i: i.kind == "name-keyed"):
+        if issue.kind == "unlisted-section":
+            docs["sectionlist"].append(issue.target[0])
+            bump("sectionlist")
+            continue
+        roll = issue.target[0]
+        sec = _norm(sections.get(roll))
+        if issue.file == FILES["studentsubjects"]:
+            subjects = section_subjects.get(sec)
+            entry = docs["studentsubjects"].get(roll)
+            if isinstance(subjects, list) and subjects:
+                docs["studentsubjects"][roll] = {"section": sec, "subjects": list(subjects)}
+            else:
+                entry["section"] = sec
+            bump("studentsubjects")
+        elif issue.kind == "missing-attendance":
+            attendance_store.ensure_records(docs["attendance"], [(roll, roll, sec, {
+                catalogue.resolve(nm) or nm: nm for nm in section_subjects[sec]})])
+            bump("attendance")
+        elif issue.kind == "section-drift":
+            records[roll]["section"] = sec
+            bump("attendance")
+        elif issue.kind == "stale-percentage":
+            det = records[roll]["subjects"][issue.target[1]]
+            det["attendance_percentage"] = attendance_store.percentage(
+                det["total_working_days"], det["total_present_days"])
+            bump("attendance")
+        elif issue.kind == "name-keyed":
+            _, key, code = issue.target
+            subjects = records[roll]["subjects"]
+            if code not in subjects:
+                subjects[code] = subjects.pop(key)
+                bump("attendance")
+
+    names = [n for n in ("sectionlist", "studentsubjects") if FILES[n] in changed]
+    lock_paths = [_path(base_dir, n) for n in names]
+    if FILES["attendance"] in changed:
+        lock_paths += [p for p in (getattr(store, "path", None), getattr(store, "journal_path", None),
+                                   getattr(store, "manifest_path", None)) if p]
+    with ExitStack() as stack:
+        # the store's own order (snapshot before journal), as its writers use
+        for path in dict.fromkeys(lock_paths):
+            stack.enter_context(datastore.locked(path))
+        for name in names:
+            try:
+                datastore.load_fresh(_path(base_dir, name), None)
+            except (OSError, ValueError):
+                pass
+            if datastore.signature(_path(base_dir, name)) != report.signatures[name]:
+                raise Changed(f"{FILES[name]} changed since the check; run it again")
+        if FILES["attendance"] in changed and hasattr(store, "revision") and store.revision() != report.revision:
+            raise Changed("attendance records changed since the check; run it again")
+        writes = [(FILES[name], lambda name=name: datastore.save(_path(base_dir, name), docs[name]))
+                  for name in names]
+        if FILES["attendance"] in changed:
+            attendance_store.touch_metadata(docs["attendance"])
+            writes.append((FILES["attendance"], lambda: store.save(docs["attendance"])))
+        done = []
+        for file, write in writes:
+            try:
+                write()
+            except Exception as e:
+                if not done:
+                    raise
+                raise PartialRepair(done, file, e) from e
+            done.append(file)
+    return changed
+
+
+def print_report(report, limit=50, out=None):
+    out = out or sys.stdout
+    issues = report.issues
+    print(f"\n--- Consistency check: {report.students} students, {len(issues)} issue(s), "
+          f"{len(report.fixable())} repairable ---", file=out)
+    for kind, n in sorted(report.counts().items()):
+        print(f"  {kind}: {n}", file=out)
+    for issue in issues[:limit]:
+        mark = "*" if issue.fixable else " "
+        print(f" {mark}[{issue.severity}] {issue.file}:{issue.location} {issue.message}", file=out)
+    if len(issues) > limit:
+        print(f"  ... and {len(issues) - limit} more", file=out)
+    phases = ", ".join(f"{k} {v:.3f}s" for k, v in report.timings.items())
+    print(f"Time: {phases}", file=out)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Check EduTrack data files for cross-file inconsistencies.")
+    parser.add_argument("--data-dir", default=".", help="directory holding the JSON files")
+    parser.add_argument("--repair", action="store_true", help="apply the deterministic repairs")
+    parser.add_argument("--json", action="store_true", help="print the issues as JSON Lines")
+    parser.add_argument("--limit", type=int, default=50, help="issues to list in the text report")
+    args = parser.parse_args()
+    res = check(args.data_dir)
+    if args.json:
+        for issue in res.issues:
+            print(json.dumps(issue._asdict()))
+    else:
+        print_report(res, args.limit)
+    if args.repair and res.fixable():
+        try:
+            t = time.perf_counter()
+            done = repair(res)
+        except Changed as e:
+            print("Repair aborted:", e, file=sys.stderr)
+            sys.exit(3)
+        except PartialRepair as e:
+            print("Repair incomplete:", e, file=sys.stderr)
+            sys.exit(4)
+        print(f"Repaired {sum(done.values())} issue(s) in {time.perf_counter() - t:.3f}s: " +
+              ", ".join(f"{f} {n}" for f, n in sorted(done.items())), file=sys.stderr if args.json else sys.stdout)
+    sys.exit(0 if not res.issues else 1)
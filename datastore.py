@@ -0,0 +1,465 @@
+import os
+import sys
+import copy
+import json
+import time
+import atexit
+import threading
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: locks are per-process only
+    fcntl = None
+
+# -----------------------------------------------------------
+# Shared document cache for the JSON data files
+# -----------------------------------------------------------
+#
+# Every module resolves its own file paths, then calls load()/save() here.
+# Parsed documents are kept per absolute path together with the file's
+# (mtime, size) signature, so a file is only re-parsed when it changed on disk.
+#
+# The objects handed out by load() are shared. Treat them as read-only unless
+# you save them back with save(), which refreshes the cached entry.
+#
+# Writers in other processes (a second CLI, the GUI) are kept apart with an
+# advisory fcntl lock on <path>.lock. save() always takes it, and the lock
+# file also holds the document's version: a counter bumped by every save().
+# Documents keep their own schema; several are bare mappings with no room
+# for a stamp. A read-modify-write goes through update(), which re-runs the
+# change against fresh data if someone else saved in between instead of
+# overwriting their work. Locks are re-entrant within a thread.
+#
+# Files are never written in place: atomic_file() writes a temp file in the
+# same directory and renames it over the target, so a crash or a full disk
+# leaves the old document intact. How hard each write is pushed to disk is
+# set with EDUTRACK_DURABILITY:
+#
+#   strict   (default) fsync the file before the rename and the directory
+#            after it; a save that returned survives a power cut
+#   batched  no fsync on the write path; dirty files and directories are
+#            fsynced together at most every BATCH_INTERVAL seconds, when an
+#            access window closes and at exit. A power cut can lose the last
+#            batch, but never leaves a half-written file.
+#
+# Views run inside read_only(label). Any write started in that block (a save,
+# an atomic_file, an append pushed through sync(), a SQLite write transaction)
+# is counted in stats()["read_path_writes"] and listed by report(), so a view
+# that provisions data as a side effect shows up under --lock-stats.
+
+_lock = threading.RLock()
+_cache = {}          # abspath -> (signature, parsed document)
+_window = None       # abspath -> signature, while an access window is open
+_window_depth = 0
+
+_held = threading.local()   # abspath -> depth of locked() held by this thread
+_reading = threading.local()  # read_only() labels open in this thread
+_read_writes = {}    # (label, abspath) -> writes made inside read_only()
+
+_stats = {
+    "hits": 0,
+    "misses": 0,
+    "stats": 0,
+    "writes": 0,
+    "locks": 0,
+    "lock_contended": 0,
+    "lock_wait": 0.0,
+    "lock_wait_max": 0.0,
+    "conflicts": 0,
+    "retries": 0,
+    "read_path_writes": 0,
+}
+
+UPDATE_RETRIES = 5
+
+DURABILITY = os.environ.get("EDUTRACK_DURABILITY", "strict").strip().lower() or "strict"
+if DURABILITY not in ("strict", "batched"):
+    print(f"Unknown EDUTRACK_DURABILITY {DURABILITY!r}; using 'strict'.", file=sys.stderr)
+    DURABILITY = "strict"
+BATCH_INTERVAL = 1.0
+
+_dirty = set()       # paths waiting for a batched fsync
+_last_flush = time.monotonic()
+
+
+class Conflict(Exception):
+    """The document was saved by someone else since it was read."""
+
+
+def _key(path):
+    return os.path.abspath(path)
+
+
+def _signature(path):
+    """Return (mtime_ns, size) for path, or None if it does not exist."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    _stats["stats"] += 1
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _current_signature(path):
+    # Inside an access window each file is stat'ed at most once.
+    if _window is not None and path in _window:
+        return _window[path]
+    sig = _signature(path)
+    if _window is not None:
+        _window[path] = sig
+    return sig
+
+
+@contextmanager
+def access_window():
+    """Group several loads (e.g. one user action) so each file is stat'ed once.
+
+    Windows nest; only the outermost one owns the stat memo.
+    """
+    global _window, _window_depth
+    with _lock:
+        if _window_depth == 0:
+            _window = {}
+        _window_depth += 1
+    try:
+        yield
+    finally:
+        with _lock:
+            _window_depth -= 1
+            closed = _window_depth == 0
+            if closed:
+                _window = None
+        if closed:
+            flush()
+
+
+def load(path, default):
+    """Return the parsed JSON document at path, re-parsing only if it changed.
+
+    Returns default if the file does not exist. Parse and I/O errors are raised
+    to the caller so each module can keep its own error handling.
+    """
+    path = _key(path)
+    with _lock:
+        sig = _current_signature(path)
+        if sig is None:
+            _cache.pop(path, None)
+            return default
+        entry = _cache.get(path)
+        if entry is not None and entry[0] == sig:
+            _stats["hits"] += 1
+            return entry[1]
+        _stats["misses"] += 1
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        _cache[path] = (sig, data)
+        return data
+
+
+def save(path, data, indent=2, expected=None):
+    """Write data as JSON to path under its lock and refresh the cached copy.
+
+    If expected is given it must still be the document's version(), else
+    Conflict is raised and nothing is written. Returns the new version.
+    """
+    path = _key(path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with locked(path):
+        current = version(path)
+        if expected is not None and expected != current:
+            with _lock:
+                _stats["conflicts"] += 1
+            raise Conflict(path)
+        with atomic_file(path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=indent)
+        with _lock:
+            _stats["writes"] += 1
+            sig = _signature(path)
+            if _window is not None:
+                _window[path] = sig
+            if sig is not None:
+                _cache[path] = (sig, data)
+        return bump_version(path, current)
+
+
+# -----------------------------------------------------------
+# Durable writes
+# -----------------------------------------------------------
+
+def _fsync_path(path, directory=False):
+    flags = os.O_RDONLY | (getattr(os, "O_DIRECTORY", 0) if directory else 0)
+    try:
+        fd = os.open(path, flags)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass  # e.g. directories on Windows
+    finally:
+        os.close(fd)
+
+
+def sync(f, path=None):
+    """Push an open file's writes to disk according to DURABILITY."""
+    note_write(path or f.name)
+    f.flush()
+    if DURABILITY == "strict":
+        os.fsync(f.fileno())
+    else:
+        _mark_dirty((_key(path or f.name), False))
+
+
+def _mark_dirty(*entries):
+    """Queue (path, is_directory) entries for the next batched fsync."""
+    with _lock:
+        _dirty.update(entries)
+        due = time.monotonic() - _last_flush >= BATCH_INTERVAL
+    if due:
+        flush()
+
+
+def flush():
+    """fsync everything written since the last flush (batched durability)."""
+    global _last_flush
+    with _lock:
+        pending = list(_dirty)
+        _dirty.clear()
+        _last_flush = time.monotonic()
+    # files before their directories
+    for path, directory in sorted(pending, key=lambda p: p[1]):
+        _fsync_path(path, directory)
+
+
+atexit.register(flush)
+
+
+@contextmanager
+def atomic_file(path, mode="w", encoding=None):
+    """Write path via a temp file in the same directory and an atomic rename.
+
+    Yields the open temp file. If the block raises, the target is untouched.
+    """
+    path = _key(path)
+    note_write(path)
+    directory = os.path.dirname(path)
+    tmp = os.path.join(directory, f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp")
+    f = open(tmp, mode, encoding=encoding)
+    try:
+        with f:
+            yield f
+            f.flush()
+            if DURABILITY == "strict":
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
+    if DURABILITY == "strict":
+        _fsync_path(directory, directory=True)
+    else:
+        # together, so a due flush never syncs the file without its rename
+        _mark_dirty((path, False), (directory, True))
+
+
+def version(path):
+    """Return the number of saves recorded for path (0 if never saved)."""
+    try:
+        with open(_key(path) + ".lock", "r", encoding="ascii") as lf:
+            return int(lf.read().strip() or 0)
+    except (OSError, ValueError):
+        return 0
+
+
+def bump_version(path, current=None):
+    """Record one more save of path. Call with locked(path) held."""
+    new = (version(path) if current is None else current) + 1
+    with open(_key(path) + ".lock", "r+", encoding="ascii") as lf:
+        lf.write(str(new))
+        lf.truncate()
+    return new
+
+
+@contextmanager
+def locked(path):
+    """Hold an exclusive advisory lock on path + '.lock' across processes.
+
+    Re-entrant within a thread. Lock waits are counted in stats().
+    """
+    path = _key(path)
+    held = getattr(_held, "paths", None)
+    if held is None:
+        held = _held.paths = {}
+    if held.get(path):
+        held[path] += 1
+        try:
+            yield
+        finally:
+            held[path] -= 1
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path + ".lock", "a") as lf:
+        waited = 0.0
+        if fcntl is not None:
+            try:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                t0 = time.perf_counter()
+                fcntl.flock(lf.fileno(), fcntl.LOCK_EX)
+                waited = time.perf_counter() - t0
+        with _lock:
+            _stats["locks"] += 1
+            if waited:
+                _stats["lock_contended"] += 1
+                _stats["lock_wait"] += waited
+                _stats["lock_wait_max"] = max(_stats["lock_wait_max"], waited)
+        held[path] = 1
+        try:
+            yield
+        finally:
+            held.pop(path, None)
+            if fcntl is not None:
+                fcntl.flock(lf.fileno(), fcntl.LOCK_UN)
+
+
+def update(path, default, change, indent=2):
+    """Run change(doc) on a private copy of the current document and save it.
+
+    If another writer saves in between, change runs again on their result
+    instead of overwriting it; the last attempt holds the lock throughout.
+    Returns whatever the successful change() returned.
+    """
+    path = _key(path)
+    for attempt in range(UPDATE_RETRIES + 1):
+        last = attempt == UPDATE_RETRIES
+        with (locked(path) if last else _nolock()):
+            expected = version(path)
+            try:
+                doc = copy.deepcopy(load_fresh(path, default))
+            except ValueError:
+                if last:
+                    raise
+                # a file written in place by some other tool; treat as a conflict
+                with _lock:
+                    _stats["retries"] += 1
+                continue
+            result = change(doc)
+            try:
+                save(path, doc, indent, expected=expected)
+                return result
+            except Conflict:
+                with _lock:
+                    _stats["retries"] += 1
+
+
+@contextmanager
+def _nolock():
+    yield
+
+
+def load_fresh(path, default):
+    """Like load(), but always re-stat the file (use under locked())."""
+    path = _key(path)
+    with _lock:
+        if _window is not None:
+            _window.pop(path, None)
+    return load(path, default)
+
+
+def signature(path):
+    """Return the (mtime_ns, size) the cached copy of path was read or written at."""
+    entry = _cache.get(_key(path))
+    return entry[0] if entry is not None else None
+
+
+def invalidate(path=None):
+    """Drop one cached document, or the whole cache when path is None."""
+    with _lock:
+        if path is None:
+            _cache.clear()
+            if _window is not None:
+                _window.clear()
+            return
+        path = _key(path)
+        _cache.pop(path, None)
+        if _window is not None:
+            _window.pop(path, None)
+
+
+def stats():
+    """Return a snapshot of the cache counters."""
+    with _lock:
+        out = dict(_stats)
+        out["cached_files"] = len(_cache)
+        return out
+
+
+def report(out=None):
+    """Print the lock and write counters (see --lock-stats)."""
+    out = out or sys.stderr
+    s = stats()
+    avg = s["lock_wait"] / s["lock_contended"] if s["lock_contended"] else 0.0
+    print(f"\n--- datastore: {s['writes']} writes, {s['locks']} locks, "
+          f"{s['lock_contended']} contended ---", file=out)
+    print(f"lock wait: total {s['lock_wait'] * 1000:.1f} ms, avg {avg * 1000:.1f} ms, "
+          f"max {s['lock_wait_max'] * 1000:.1f} ms", file=out)
+    print(f"version conflicts: {s['conflicts']}, retries: {s['retries']}", file=out)
+    print(f"writes from read paths: {s['read_path_writes']}", file=out)
+    for (label, path), n in sorted(read_path_writes().items()):
+        print(f"  {label}: {n} x {path}", file=out)
+
+
+def reset_stats():
+    with _lock:
+        for k in _stats:
+            _stats[k] = 0
+        _read_writes.clear()
+
+
+# -----------------------------------------------------------
+# Read-path write detection
+# -----------------------------------------------------------
+
+@contextmanager
+def read_only(label="read"):
+    """Mark the enclosed code as a read path (see note_write())."""
+    labels = getattr(_reading, "labels", None)
+    if labels is None:
+        labels = _reading.labels = []
+    labels.append(label)
+    try:
+        yield
+    finally:
+        labels.pop()
+
+
+@contextmanager
+def writes_allowed():
+    """Suspend read_only() for an intentional write (e.g. queueing a request)."""
+    saved = getattr(_reading, "labels", None)
+    _reading.labels = []
+    try:
+        yield
+    finally:
+        _reading.labels = saved
+
+
+def note_write(path):
+    """Called before every write; counts it if a read path is open."""
+    labels = getattr(_reading, "labels", None)
+    if not labels:
+        return
+    key = (labels[-1], _key(path))
+    with _lock:
+        _stats["read_path_writes"] += 1
+        _read_writes[key] = _read_writes.get(key, 0) + 1
+
+
+def read_path_writes():
+    """Return {(label, path): count} for writes made inside read_only()."""
+    with _lock:
+        return dict(_read_writes)
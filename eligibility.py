@@ -0,0 +1,205 @@
+import os
+import sys
+import threading
+
+import numpy as np
+
+import datastore
+import attendance_store
+import attendance_matrix
+
+# -----------------------------------------------------------
+# Exam eligibility (attendance cutoff) engine
+# -----------------------------------------------------------
+#
+# A student is debarred from a subject's exam when their attendance in it is
+# below the subject's cutoff, and at risk while it is less than MARGIN points
+# above it. The cutoff comes from an optional "attendance_cutoff" field on the
+# subject's exam_date.json entry and defaults to DEFAULT_CUTOFF. Subjects
+# without a working day are not judged.
+#
+# The full (roll, subject) set is computed in one vectorized pass over the
+# attendance matrix and cached as
+#
+#   (roll, code) -> (DEBARRED | AT_RISK, percentage)
+#
+# Only flagged pairs are kept; anything else is eligible. The engine listens
+# to its attendance store: a counter write re-judges just the entries it
+# touched, and a whole-document write drops the cache so the next read
+# rebuilds it. A changed exam_date.json, or a store revision the engine did
+# not see (another process wrote), also triggers a rebuild.
+
+DEFAULT_CUTOFF = 75.0
+MARGIN = 5.0
+
+DEBARRED = "debarred"
+AT_RISK = "at-risk"
+ELIGIBLE = "eligible"
+
+
+def load_cutoffs(exam_path):
+    """Return {code: cutoff} for exam_date.json entries that set one."""
+    try:
+        raw = datastore.load(exam_path, {})
+    except (OSError, ValueError):
+        raw = {}
+    items = raw.get("exam_schedule", []) if isinstance(raw, dict) else raw
+    cutoffs = {}
+    for it in items if isinstance(items, list) else []:
+        if not isinstance(it, dict) or it.get("attendance_cutoff") in (None, ""):
+            continue
+        code = str(it.get("subject_code") or it.get("code") or "").strip().upper()
+        try:
+            cutoffs[code] = float(it["attendance_cutoff"])
+        except (TypeError, ValueError):
+            continue
+    return cutoffs
+
+
+def judge(percentage, cutoff, margin=MARGIN):
+    if percentage < cutoff:
+        return DEBARRED
+    if percentage < cutoff + margin:
+        return AT_RISK
+    return ELIGIBLE
+
+
+class EligibilityEngine:
+    """Cached debarred/at-risk set for one attendance store."""
+
+    def __init__(self, store, catalogue, exam_path, margin=MARGIN):
+        self.store = store
+        self.catalogue = catalogue
+        self.exam_path = os.path.abspath(exam_path)
+        self.margin = margin
+        self._lock = threading.RLock()
+        self._flagged = {}
+        self._cutoffs = {}
+        self._valid = False
+        self._revision = None
+        self._exam_sig = None
+        self.stats = {"rebuilds": 0, "updates": 0}
+        attendance_store.add_listener(self._on_write)
+
+    def close(self):
+        attendance_store.remove_listener(self._on_write)
+
+    def cutoff(self, code):
+        with self._lock:
+            self._ensure()
+            return self._cutoffs.get(code, DEFAULT_CUTOFF)
+
+    # -- cache maintenance -------------------------------------------
+
+    def _stale(self):
+        if not self._valid:
+            return True
+        if datastore.signature(self.exam_path) != self._exam_sig:
+            return True
+        return hasattr(self.store, "revision") and self.store.revision() != self._revision
+
+    def _ensure(self):
+        if self._stale():
+            self._rebuild()
+
+    def _rebuild(self):
+        cutoffs = load_cutoffs(self.exam_path)
+        exam_sig = datastore.signature(self.exam_path)
+        matrix = attendance_matrix.get_matrix(self.store, self.catalogue)
+        cut = np.array([cutoffs.get(code, DEFAULT_CUTOFF) for code in matrix.codes], dtype=np.float64)
+        counted = matrix.counted()
+        pct = matrix.percentage
+        debarred = counted & (pct < cut)
+        at_risk = counted & ~debarred & (pct < cut + self.margin)
+        flagged = {}
+        for mask, status in ((debarred, DEBARRED), (at_risk, AT_RISK)):
+            i, j = np.nonzero(mask)
+            for r, c, p in zip(i.tolist(), j.tolist(), pct[i, j].tolist()):
+                flagged[(matrix.rolls[r], matrix.codes[c])] = (status, p)
+        self._flagged, self._cutoffs = flagged, cutoffs
+        self._exam_sig = exam_sig
+        self._revision = self.store.revision() if hasattr(self.store, "revision") else None
+        self._valid = True
+        self.stats["rebuilds"] += 1
+
+    def _code(self, key, det):
+        cat = self.catalogue
+        return (cat.resolve(key) if cat else None) or \
+            (cat.resolve(det.get("subject_name")) if cat else None) or key
+
+    def _on_write(self, store, events, updated, previous=None):
+        if store is not self.store:
+            return
+        with self._lock:
+            if events is None or not self._valid:
+                self._valid = False
+                return
+            if datastore.signature(self.exam_path) != self._exam_sig:
+                self._valid = False
+                return
+            for event, det in zip(events, updated):
+                key = (event["roll"], self._code(event["subject"], det))
+                working = det.get("total_working_days", 0)
+                if working <= 0:
+                    self._flagged.pop(key, None)
+                    continue
+                pct = attendance_store.percentage(working, det.get("total_present_days", 0))
+                status = judge(pct, self._cutoffs.get(key[1], DEFAULT_CUTOFF), self.margin)
+                if status == ELIGIBLE:
+                    self._flagged.pop(key, None)
+                else:
+                    self._flagged[key] = (status, pct)
+            self._revision = store.revision() if hasattr(store, "revision") else None
+            self.stats["updates"] += 1
+
+    # -- queries -----------------------------------------------------
+
+    def results(self):
+        """Return {(roll, code): (status, percentage)} for every flagged pair."""
+        with self._lock:
+            self._ensure()
+            return dict(self._flagged)
+
+    def status(self, roll, code):
+        """Return (status, percentage); percentage is None when eligible."""
+        with self._lock:
+            self._ensure()
+            return self._flagged.get((roll, code), (ELIGIBLE, None))
+
+    def for_student(self, roll):
+        """Return {code: (status, percentage)} for the flagged subjects of roll."""
+        with self._lock:
+            self._ensure()
+            return {code: v for (r, code), v in self._flagged.items() if r == roll}
+
+    def listing(self, status):
+        """Return [(roll, code, percentage)] with the given status, lowest first."""
+        rows = [(r, c, p) for (r, c), (s, p) in self.results().items() if s == status]
+        return sorted(rows, key=lambda row: (row[2], row[0], row[1]))
+
+
+_engines = {}
+_engines_lock = threading.Lock()
+
+
+def get_engine(store, catalogue, exam_path):
+    """Return the shared engine for a store and exam_date.json."""
+    key = (id(store), os.path.abspath(exam_path))
+    with _engines_lock:
+        engine = _engines.get(key)
+        if engine is None or engine.store is not store:
+            if engine is not None:
+                engine.close()
+            engine = _engines[key] = EligibilityEngine(store, catalogue, exam_path)
+        return engine
+
+
+def print_report(engine, out=None):
+    out = out or sys.stdout
+    debarred = engine.listing(DEBARRED)
+    at_risk = engine.listing(AT_RISK)
+    print(f"\n--- Exam eligibility (default cutoff {DEFAULT_CUTOFF:g}%, at-risk margin {engine.margin:g}) ---", file=out)
+    for label, rows in (("Debarred", debarred), ("At risk", at_risk)):
+        print(f"\n{label}: {len(rows)}", file=out)
+        for roll, code, pct in rows:
+            print(f"  {roll} {code}: {pct}% (cutoff {engine.cutoff(code):g}%)", file=out)
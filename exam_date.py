@@ -1,35 +1,17 @@
-import json
 from datetime import datetime
 import os
 
+import datastore
+import subject_catalogue
+
 SUBJECTSFILE = "subjects.json"
 EXAMFILE = "exam_date.json"
 ALLOCATIONFILE = "sectionsubjects.json"
 STUDENTSUBJECTSFILE = "studentsubjects.json"
 
-# Subject name to code mapping based on your exam_date.json
-SUBJECT_NAME_TO_CODE = {
-    "Basic Maths": "TMA101",
-    "English-I": "TEA101",
-    "C Lang": "TCA101",
-    "Electronics": "TEC101",
-    "English-III": "TEA301",
-    "Maths-III": "TMA301",
-    "Computer Networking": "TCN101",
-    "DSA": "TCS101",
-    "Artificial Intelligence": "TAI101",
-    "Operating System": "TOS01",
-    "English-V": "TEA501",
-    "Machine Learning": "TML101",
-    "Algorithm": "TAL101",
-    "OOP": "TOP101",
-    "Database": "TDB101"
-}
-
 def loadSubjects():
     try:
-        with open(SUBJECTSFILE, "r") as f:
-            data = json.load(f)
+        data = datastore.load(SUBJECTSFILE, [])
     except:
         return []
     
@@ -42,24 +24,20 @@ def loadSubjects():
 def loadSubjectAllocation():
     """Load section-subject allocation data"""
     try:
-        with open(ALLOCATIONFILE, "r") as f:
-            return json.load(f)
+        return datastore.load(ALLOCATIONFILE, {})
     except:
         return {}
 
 def loadStudentSubjects():
     """Load student subjects data"""
     try:
-        with open(STUDENTSUBJECTSFILE, "r") as f:
-            data = json.load(f)
-        return data
+        return datastore.load(STUDENTSUBJECTSFILE, {})
     except:
         return {}
 
 def loadExamMap():
     try:
-        with open(EXAMFILE, "r") as f:
-            raw = json.load(f)
+        raw = datastore.load(EXAMFILE, {})
     except:
         raw = {}
     
@@ -80,19 +58,41 @@ def loadExamMap():
                 "subjectName": it.get("subject_name") or it.get("name") or "",
                 "examDate": it.get("exam_date") or ""
             }
+            if it.get("attendance_cutoff") not in (None, ""):
+                examMap[code]["attendanceCutoff"] = it["attendance_cutoff"]
     return examMap
 
 def saveExamMap(examMap):
     payload = {"exam_schedule": []}
     for code in sorted(examMap.keys()):
         entry = examMap[code]
-        payload["exam_schedule"].append({
+        item = {
             "subject_code": code,
             "subject_name": entry.get("subjectName", ""),
             "exam_date": entry.get("examDate", "")
-        })
-    with open(EXAMFILE, "w") as f:
-        json.dump(payload, f, indent=2)
+        }
+        if entry.get("attendanceCutoff") not in (None, ""):
+            item["attendance_cutoff"] = entry["attendanceCutoff"]
+        payload["exam_schedule"].append(item)
+    datastore.save(EXAMFILE, payload)
+
+def updateExamDates(changes):
+    """Set {code: (subjectName, examDate)} in exam_date.json, keeping other entries and fields."""
+    def apply(raw):
+        items = raw.setdefault("exam_schedule", []) if isinstance(raw, dict) else raw
+        pending = dict(changes)
+        for it in items:
+            if not isinstance(it, dict):
+                continue
+            code = (it.get("subject_code") or it.get("code") or "").upper()
+            if code in pending:
+                it["subject_code"] = code
+                it["subject_name"], it["exam_date"] = pending.pop(code)
+        for code in sorted(pending):
+            name, dateStr = pending[code]
+            items.append({"subject_code": code, "subject_name": name, "exam_date": dateStr})
+    if changes:
+        datastore.update(EXAMFILE, {"exam_schedule": []}, apply)
 
 def setExamDatesAdmin():
     subjects = loadSubjects()
@@ -114,7 +114,7 @@ def setExamDatesAdmin():
         print("Invalid input.")
         return
     
-    examMap = loadExamMap()
+    changes = {}
     for idx in indexes:
         if 0 <= idx < len(subjects):
             s = subjects[idx]
@@ -126,9 +126,9 @@ def setExamDatesAdmin():
             except:
                 print(f"Skipped {code}: invalid date format.")
                 continue
-            examMap[code] = {"subjectName": name, "examDate": dateStr}
+            changes[code] = (name, dateStr)
     
-    saveExamMap(examMap)
+    updateExamDates(changes)
     print("Exam dates saved.")
 
 def getExamDate(subjectCode):
@@ -139,7 +139,8 @@ def getExamDate(subjectCode):
 
 def getSubjectCode(subject_name):
     """Get the proper subject code from subject name"""
-    return SUBJECT_NAME_TO_CODE.get(subject_name, subject_name.upper().replace(" ", "_"))
+    code = subject_catalogue.get_catalogue(SUBJECTSFILE).resolve(subject_name)
+    return code or subject_name.upper().replace(" ", "_")
 
 def loadSectionSubjects(sectionName):
     """Load subjects for a section from subject allocation data"""
@@ -221,7 +222,10 @@ def viewSectionExamDates(sectionName):
 def viewStudentExamSchedule(username):
     import subject
     import section
-    roll = subject.getRollNumber(username, "student")
+    roll = subject.lookupOrQueueRollNumber(username, "student")
+    if roll is None:
+        print("Pending provisioning: your roll number has not been allocated yet (queued for the admin).")
+        return
     sec = section.getSectionForRoll(roll)
     if sec == "Not assigned":
         print("Section not assigned.")
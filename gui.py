@@ -1,15 +1,21 @@
 from __future__ import annotations
 import os
 import sys
-import json
 import hmac
 import shutil
-from datetime import datetime
+import functools
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
 from typing import Literal
 
 import login
+import datastore
+import attendance_store
+import rollnumbers
+import subject_catalogue
+import roster
+import alerts
+import provision_queue
 
 PRIMARY_DEEP = "#2C3E50"
 ACCENT_PINK = "#FF2F92"
@@ -41,39 +47,37 @@ PATH_ASSIGNMENTS = os.path.join(ROOT, "assignments")
 
 def load_json(path, default):
     try:
-        if not os.path.exists(path):
-            return default
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        return datastore.load(path, default)
     except Exception:
         return default
 
 def save_json(path, payload):
     try:
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(payload, f, indent=2)
+        datastore.save(path, payload)
         return True
     except Exception as e:
         messagebox.showerror("File Error", f"Unable to save {os.path.basename(path)}: {e}")
         return False
 
-def ensure_files():
-    defaults = [
-        (PATH_ATTENDANCE, {"attendance_records": {}, "metadata": {}}),
-        (PATH_SUBJECTS, {"subjects": []}),
-        (PATH_SECTIONS, {}),
-        (PATH_SECTIONLIST, []),
-        (PATH_TEACHERSECTIONS, {}),
-        (PATH_SECTIONSUBJECTS, {}),
-        (PATH_STUDENTSUBJECTS, {}),
-        (PATH_TOPICS, {}),
-        (PATH_ROLLNUMBERS, {"map": {"student": {}, "teacher": {}, "admin": {}}, "counters": {"student": 0, "teacher": 0, "admin": 0}}),
-        (PATH_EXAMS, {"exam_schedule": []}),
-    ]
-    for p, d in defaults:
-        if not os.path.exists(p):
-            save_json(p, d)
-    os.makedirs(PATH_ASSIGNMENTS, exist_ok=True)
+def update_json(path, default, change):
+    """Read-modify-write path; change(doc) edits doc and returns True, or False to skip.
+
+    Returns change's result, or None if the file could not be saved.
+    """
+    try:
+        return datastore.update(path, default, change)
+    except Exception as e:
+        messagebox.showerror("File Error", f"Unable to save {os.path.basename(path)}: {e}")
+        return None
+
+def set_student_subjects(roll, sec, subjects):
+    def apply(doc):
+        doc[roll] = {"section": sec, "subjects": subjects}
+        return True
+    return update_json(PATH_STUDENTSUBJECTS, {}, apply)
+
+def provisioning_queue():
+    return provision_queue.get_queue(provision_queue.queue_path_for(ROOT))
 
 def subject_list():
     data = load_json(PATH_SUBJECTS, {"subjects": []})
@@ -83,21 +87,21 @@ def subject_list():
         return data
     return []
 
+def subject_catalogue_index():
+    return subject_catalogue.get_catalogue(PATH_SUBJECTS)
+
 def code_by_name(name):
-    for s in subject_list():
-        if s.get("name") == name:
-            return s.get("code", name)
-    return name
+    return subject_catalogue_index().resolve(name) or name
 
 def name_by_code(code):
-    for s in subject_list():
-        if s.get("code") == code:
-            return s.get("name", code)
-    return code
+    return subject_catalogue_index().name_for(code) or code
 
 def teacher_sections_map():
     return load_json(PATH_TEACHERSECTIONS, {})
 
+def section_roster():
+    return roster.get_roster(PATH_SECTIONS, PATH_TEACHERSECTIONS)
+
 def sections_map():
     return load_json(PATH_SECTIONS, {})
 
@@ -111,8 +115,53 @@ def section_subjects_map():
 def topics_map():
     return load_json(PATH_TOPICS, {})
 
+def attendance_backend():
+    store = attendance_store.get_store(PATH_ATTENDANCE)
+    alerts.watch(store, PATH_ATTENDANCE, subject_catalogue_index())
+    return store
+
+def attendance_alerts():
+    return alerts.watch(attendance_store.get_store(PATH_ATTENDANCE), PATH_ATTENDANCE, subject_catalogue_index())
+
+def attendance_ledger():
+    import attendance_ledger as ledger_mod
+    catalogue = subject_catalogue_index()
+    return ledger_mod.get_ledger(PATH_ATTENDANCE, load=attendance_backend().load,
+                                 subject_key=lambda key: catalogue.resolve(key) or key)
+
 def attendance_master():
-    return load_json(PATH_ATTENDANCE, {"attendance_records": {}, "metadata": {}})
+    try:
+        return attendance_backend().load()
+    except Exception:
+        return {"attendance_records": {}, "metadata": {}}
+
+def attendance_for_sections(sections):
+    try:
+        return attendance_store.load_sections(attendance_backend(), sections)
+    except Exception:
+        return {"attendance_records": {}, "metadata": {}}
+
+def attendance_analytics():
+    """Cached NumPy view of the attendance records, or None without numpy."""
+    try:
+        import attendance_matrix
+    except ImportError:
+        return None
+    return attendance_matrix.get_matrix(attendance_backend(), subject_catalogue_index())
+
+def exam_eligibility():
+    """Shared eligibility engine for the attendance records, or None without numpy."""
+    try:
+        import eligibility
+    except ImportError:
+        return None
+    return eligibility.get_engine(attendance_backend(), subject_catalogue_index(), PATH_EXAMS)
+
+def attendance_record(roll):
+    try:
+        return attendance_backend().get_record(roll) or {}
+    except Exception:
+        return {}
 
 def rollnumbers_map():
     return load_json(PATH_ROLLNUMBERS, {"map": {"student": {}, "teacher": {}, "admin": {}}, "counters": {}})
@@ -127,7 +176,7 @@ def student_subjects(roll):
         names = entry.get("subjects", [])
         if isinstance(names, list):
             return names
-    am = attendance_master().get("attendance_records", {}).get(roll, {})
+    am = attendance_record(roll)
     subs = am.get("subjects", {})
     names = []
     for k, v in subs.items():
@@ -143,25 +192,22 @@ def student_section(roll):
     sdata = load_json(PATH_STUDENTSUBJECTS, {}).get(roll, {})
     return str(sdata.get("section", "Not assigned")).strip().upper()
 
+def read_path(view):
+    """Run a view under datastore.read_only so --lock-stats counts any write it makes."""
+    @functools.wraps(view)
+    def wrapper(self, *args, **kwargs):
+        with datastore.read_only(view.__name__):
+            return view(self, *args, **kwargs)
+    return wrapper
+
 def ensure_student_attendance(roll, sec, names):
-    att = attendance_master()
-    records = att.get("attendance_records", {})
-    if roll not in records:
-        subjects_dict = {}
-        for nm in names:
-            code = code_by_name(nm)
-            subjects_dict[code] = {
-                "subject_name": nm,
-                "total_working_days": 0,
-                "total_present_days": 0,
-                "attendance_percentage": 0.0,
-                "last_updated": datetime.now().strftime("%Y-%m-%d")
-            }
-        records[roll] = {"name": roll, "section": sec, "subjects": subjects_dict}
-        att["attendance_records"] = records
-        att.setdefault("metadata", {})["last_updated"] = datetime.now().strftime("%Y-%m-%d")
-        att["metadata"]["total_students"] = len(records)
-        save_json(PATH_ATTENDANCE, att)
+    if attendance_record(roll):
+        return
+    subjects = {code_by_name(nm): nm for nm in names}
+    try:
+        attendance_backend().ensure_student(roll, roll, sec, subjects)
+    except Exception as e:
+        messagebox.showerror("File Error", f"Unable to save attendance: {e}")
 
 class View:
     def frame(self, parent, bg, border=False):
@@ -187,7 +233,6 @@ class View:
 
 class App:
     def __init__(self, root):
-        ensure_files()
         self.root = root
         self.root.title("EDUTRACK")
         self.root.geometry("1280x820")
@@ -283,9 +328,16 @@ class App:
                 messagebox.showerror("Duplicate User", "This username already exists."); return
             salt = login.make_salt(); pwd_hash = login.make_hash(secret, salt)
             ans_salt = login.make_salt(); ans_hash = login.make_hash(answer, ans_salt)
-            self.users.add(name, role, salt, pwd_hash, question, ans_salt, ans_hash)
-            login.save_users(self.users)
-            messagebox.showinfo("Account", "Account created successfully."); d.destroy()
+            new_user = self.users.add(name, role, salt, pwd_hash, question, ans_salt, ans_hash)
+            if not login.save_user(self.users, new_user):
+                messagebox.showerror("File Error", "Unable to save the new account."); return
+            try:
+                rno = rollnumbers.get_registry(PATH_ROLLNUMBERS).get_or_allocate(name, role)
+            except Exception as e:
+                # the account exists; the admin's provisioning queue retries the roll
+                provisioning_queue().request_roll(name, role)
+                messagebox.showwarning("Account", f"Account created, but no roll number could be allocated yet: {e}"); d.destroy(); return
+            messagebox.showinfo("Account", f"Account created successfully. Your roll no is {rno}."); d.destroy()
         self.v.button(d, "Save Account", save, SIDEBAR_BLUE).pack(pady=(0, 18))
 
     def open_forgot_password(self):
@@ -317,7 +369,8 @@ class App:
                     messagebox.showerror("Incorrect Answer", "Security answer does not match."); return
                 new_salt = login.make_salt(); new_hash = login.make_hash(new_secret, new_salt)
                 u.salt = new_salt; u.pwd_hash = new_hash
-                login.save_users(self.users)
+                if not login.save_user(self.users, u):
+                    messagebox.showerror("File Error", "Unable to save the new password."); return
                 messagebox.showinfo("Updated", "Password has been reset."); reset.destroy(); d.destroy()
             self.v.button(reset, "Save New Password", save_new, SIDEBAR_BLUE).pack(pady=(0, 18))
         self.v.button(d, "Continue", go, SIDEBAR_BLUE).pack(pady=(0, 18))
@@ -340,7 +393,8 @@ class App:
 
     def safe_call(self, func):
         try:
-            func()
+            with datastore.access_window():
+                func()
         except Exception as e:
             messagebox.showerror("Error", str(e))
 
@@ -395,21 +449,29 @@ class App:
         self.student_view_dashboard()
 
     def student_roll_and_section(self):
-        try:
-            import subject, section
-            roll = subject.getRollNumber(self.active_user, "student")
-            sec = section.getSectionForRoll(roll)
-        except Exception:
-            rmap = rollnumbers_map()
-            roll = rmap.get("map", {}).get("student", {}).get(self.active_user, self.active_user)
-            sec = sections_map().get(roll, "Not assigned")
-        sec = str(sec or "Not assigned").strip().upper()
+        # Read-only: a student without a roll number (an account from before
+        # rolls were allocated at sign-up) is queued for one; roll is None
+        roll = rollnumbers.get_registry(PATH_ROLLNUMBERS).lookup(self.active_user)
+        if roll is None:
+            provisioning_queue().request_roll(self.active_user, "student")
+            return None, "NOT ASSIGNED"
+        sec = str(sections_map().get(roll) or "Not assigned").strip().upper()
         return roll, sec
 
+    def roll_pending(self, title):
+        c = self.container(title)
+        self.v.label(c, "Pending provisioning: your roll number has not been allocated yet.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=4)
+        self.v.label(c, "The request is queued; it is allocated when an admin processes the provisioning queue.", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x", pady=4)
+
+    @read_path
     def student_view_dashboard(self):
         roll, sec = self.student_roll_and_section()
+        if roll is None:
+            return self.roll_pending("Student Dashboard")
         names = student_subjects(roll)
-        ensure_student_attendance(roll, sec, names)
+        pending = bool(names) and sec != "NOT ASSIGNED" and not attendance_record(roll)
+        if pending:
+            provisioning_queue().request_attendance(roll)
         c = self.container("Student Dashboard")
         self.v.label(c, f"Roll: {roll}", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=4)
         self.v.label(c, f"Section: {sec}", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=4)
@@ -419,9 +481,20 @@ class App:
                 self.v.label(c, f"• {nm}", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x", pady=2)
         else:
             self.v.label(c, "No subjects mapped.", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x", pady=2)
-
+        if pending:
+            self.v.label(c, "Attendance record pending; it will appear once the admin processes the provisioning queue.", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x", pady=(12, 2))
+        engine = exam_eligibility()
+        flagged = engine.for_student(roll) if engine is not None else {}
+        if flagged:
+            self.v.label(c, "Exam eligibility:", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=(12, 6))
+            for code, (status, pct) in sorted(flagged.items()):
+                self.v.label(c, f"• {name_by_code(code)} ({code}): {pct}% - {status}", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x", pady=2)
+
+    @read_path
     def student_exam_schedule(self):
         roll, sec = self.student_roll_and_section()
+        if roll is None:
+            return self.roll_pending("My Exam Schedule")
         names = student_subjects(roll)
         codes = [code_by_name(nm) for nm in names]
         schedule = exams_payload().get("exam_schedule", [])
@@ -459,9 +532,12 @@ class App:
         canvas.bind("<Configure>", lambda e: canvas.itemconfigure(inner_id, width=e.width))
         return inner
 
+    @read_path
     def student_view_attendance(self):
         roll, _ = self.student_roll_and_section()
-        data = attendance_master().get("attendance_records", {}).get(roll, {})
+        if roll is None:
+            return self.roll_pending("My Attendance")
+        data = attendance_record(roll)
         subjects = data.get("subjects", {})
         c = self.container("My Attendance")
         cols = ("Subject", "Name", "Sessions", "Present", "Percent", "Updated")
@@ -493,9 +569,12 @@ class App:
             except Exception:
                 self.v.label(c, "Graph unavailable. Install matplotlib.", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x", pady=8)
 
+    @read_path
     def student_attendance_summary(self):
         roll, _ = self.student_roll_and_section()
-        data = attendance_master().get("attendance_records", {}).get(roll, {})
+        if roll is None:
+            return self.roll_pending("Attendance Summary")
+        data = attendance_record(roll)
         c = self.container("Attendance Summary")
         if not data:
             self.v.label(c, "No attendance data found.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); return
@@ -506,8 +585,11 @@ class App:
             self.v.label(c, f"{det.get('subject_name','')} ({code})", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x")
             self.v.label(c, f"Working: {det.get('total_working_days',0)}  Present: {det.get('total_present_days',0)}  Attendance: {det.get('attendance_percentage',0.0)}%", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x", pady=(0, 6))
 
+    @read_path
     def student_view_topics(self):
         roll, sec = self.student_roll_and_section()
+        if roll is None:
+            return self.roll_pending("Topics Covered")
         items = topics_map().get(sec, [])
         c = self.container("Topics Covered")
         if not items:
@@ -520,8 +602,11 @@ class App:
         for item in items:
             tree.insert("", "end", values=(item.get("date",""), item.get("teacher",""), item.get("topic","")))
 
+    @read_path
     def student_submit_assignment(self):
         roll, sec = self.student_roll_and_section()
+        if roll is None:
+            return self.roll_pending("Submit Assignment")
         c = self.container("Submit Assignment")
         self.v.label(c, "Select a PDF to submit.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x")
         def choose():
@@ -543,6 +628,9 @@ class App:
     def dashboard_admin(self):
         items = [
             ("Admin Home", self.admin_home),
+            ("Attendance analytics", self.admin_attendance_analytics),
+            ("Exam eligibility", self.admin_exam_eligibility),
+            ("Attendance alerts", self.view_alerts),
             ("Add subject", self.admin_add_subject),
             ("List subjects", self.admin_list_subjects),
             ("Create section", self.admin_create_section),
@@ -554,6 +642,7 @@ class App:
             ("View section assignments", self.admin_view_section_assignments),
             ("View student info", self.admin_view_student_info),
             ("View any student's dashboard", self.admin_open_student_dashboard),
+            ("Provisioning queue", self.admin_provisioning_queue),
         ]
         self.set_sidebar(items)
         self.admin_home()
@@ -563,8 +652,15 @@ class App:
         subjects = subject_list()
         sections = section_list()
         teachers = teacher_sections_map()
-        att = attendance_master()
-        students_count = len(att.get("attendance_records", {}))
+        matrix = attendance_analytics()
+        if matrix is not None:
+            students_count = matrix.n_students
+        else:
+            # numpy is optional; count the records directly
+            try:
+                students_count = len(attendance_backend().load().get("attendance_records", {}))
+            except Exception:
+                students_count = 0
         stats_frame = self.v.frame(c, "#FFFFFF", border=True)
         stats_frame.pack(fill="x", padx=0, pady=8)
         metrics = [
@@ -573,6 +669,8 @@ class App:
             ("Sections", len(sections), "Active homerooms"),
             ("Teachers", len(teachers), "Faculty mapped"),
         ]
+        if matrix:
+            metrics.append(("Attendance", f"{matrix.summary()['average']}%", "Campus average"))
         for title, value, desc in metrics:
             card = self.v.frame(stats_frame, "#FFFFFF", border=True)
             card.pack(side="left", expand=True, fill="both", padx=8, pady=8)
@@ -598,6 +696,71 @@ class App:
             b = self.v.button(row, text, lambda h=handler: self.safe_call(h), bg="#E6ECF8")
             b.pack(side="left", expand=True, fill="x", padx=6)
 
+    def admin_attendance_analytics(self):
+        c = self.container("Attendance Analytics")
+        matrix = attendance_analytics()
+        if matrix is None:
+            self.v.label(c, "numpy not installed; analytics unavailable.", BODY, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x"); return
+        if not matrix.n_students:
+            self.v.label(c, "No attendance records yet.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); return
+        summary = matrix.summary()
+        pcts = matrix.percentiles()
+        self.v.label(c, f"{summary['students']} students, {summary['subjects']} subjects. Campus average {summary['average']}%",
+                     BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x")
+        self.v.label(c, "Percentiles: " + ", ".join(f"p{k} {v}%" for k, v in pcts.items()),
+                     SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x", pady=(2, 10))
+
+        cols = ("Section", "Average %")
+        tree = ttk.Treeview(c, columns=cols, show="headings", height=6)
+        for col in cols: tree.heading(col, text=col); tree.column(col, anchor="center", width=200)
+        tree.pack(fill="x", pady=(0, 10))
+        for sec, mean in sorted(matrix.section_means().items()):
+            tree.insert("", "end", values=(sec or "-", mean))
+
+        import attendance_matrix
+        edges = attendance_matrix.DEFAULT_BINS
+        bands = tuple(f"{edges[k]}-{edges[k + 1]}%" for k in range(len(edges) - 1))
+        cols = ("Code", "Subject") + bands
+        tree = ttk.Treeview(c, columns=cols, show="headings", height=8)
+        for col in cols: tree.heading(col, text=col); tree.column(col, anchor="center", width=110)
+        tree.pack(fill="both", expand=True)
+        for code, counts in sorted(matrix.subject_distribution().items()):
+            tree.insert("", "end", values=(code, matrix.subject_names.get(code, code), *counts))
+
+    def admin_exam_eligibility(self):
+        c = self.container("Exam Eligibility")
+        engine = exam_eligibility()
+        if engine is None:
+            self.v.label(c, "numpy not installed; eligibility unavailable.", BODY, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x"); return
+        import eligibility
+        debarred = engine.listing(eligibility.DEBARRED)
+        at_risk = engine.listing(eligibility.AT_RISK)
+        self.v.label(c, f"Debarred: {len(debarred)}   At risk: {len(at_risk)}   (default cutoff {eligibility.DEFAULT_CUTOFF:g}%)",
+                     BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=(0, 10))
+        cols = ("Roll", "Code", "Subject", "Percent", "Cutoff", "Status")
+        tree = ttk.Treeview(c, columns=cols, show="headings", height=16)
+        for col in cols: tree.heading(col, text=col); tree.column(col, anchor="center", width=130)
+        tree.pack(fill="both", expand=True)
+        for status, rows in ((eligibility.DEBARRED, debarred), (eligibility.AT_RISK, at_risk)):
+            for roll, code, pct in rows:
+                tree.insert("", "end", values=(roll, code, name_by_code(code), f"{pct}%", f"{engine.cutoff(code):g}%", status))
+
+    def view_alerts(self):
+        c = self.container("Attendance Alerts")
+        sections = section_roster().sections_of(self.active_user) if (self.active_role or "").strip().lower() == "teacher" else None
+        new = attendance_alerts().unread(self.active_user, sections)
+        if not new:
+            self.v.label(c, "No new attendance alerts.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); return
+        self.v.label(c, f"{len(new)} new alert(s) since your last visit", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=(0, 10))
+        cols = ("Date", "Roll", "Section", "Code", "Alert", "Percent")
+        tree = ttk.Treeview(c, columns=cols, show="headings", height=16)
+        for col in cols: tree.heading(col, text=col); tree.column(col, anchor="center", width=130)
+        tree.pack(fill="both", expand=True)
+        for a in new:
+            kind = f"below {a['threshold']:g}%" if a["kind"] == alerts.BELOW else f"back to {a['threshold']:g}%"
+            pct = "-" if a["percentage"] is None else f"{a['percentage']}%"
+            tree.insert("", "end", values=(a["ts"][:10], a["roll"], a["section"] or "-", a["subject"], kind, pct))
+
     def admin_add_subject(self):
         c = self.container("Add Subject")
         self.v.label(c, "Subject Code", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); code_ent = self.v.entry(c); code_ent.pack(fill="x", pady=6)
@@ -606,11 +769,16 @@ class App:
             code = code_ent.get().strip().upper(); name = name_ent.get().strip()
             if not code or not name:
                 messagebox.showerror("Input", "Code and name required."); return
-            subs = subject_list()
-            if any(s.get("code") == code for s in subs):
+            def add(doc):
+                subs = doc.setdefault("subjects", []) if isinstance(doc, dict) else doc
+                if any(s.get("code") == code for s in subs):
+                    return False
+                subs.append({"code": code, "name": name}); return True
+            added = update_json(PATH_SUBJECTS, {"subjects": []}, add)
+            if added is False:
                 messagebox.showerror("Duplicate", "Subject code already exists."); return
-            subs.append({"code": code, "name": name}); save_json(PATH_SUBJECTS, {"subjects": subs})
-            messagebox.showinfo("Subject", "Subject added."); self.admin_list_subjects()
+            if added:
+                messagebox.showinfo("Subject", "Subject added."); self.admin_list_subjects()
         self.v.button(c, "Save", save, SIDEBAR_BLUE).pack(pady=8)
 
     def admin_list_subjects(self):
@@ -633,17 +801,24 @@ class App:
         def save():
             s = sec_ent.get().strip().upper()
             if not s: messagebox.showerror("Input", "Invalid section."); return
-            lst = section_list()
-            if s in lst: messagebox.showerror("Duplicate", "Section already exists."); return
-            lst.append(s); save_json(PATH_SECTIONLIST, sorted(lst))
-            section_subjects = section_subjects_map()
+            def add(lst):
+                if s in lst: return False
+                lst.append(s); lst.sort(); return True
+            added = update_json(PATH_SECTIONLIST, [], add)
+            if added is False: messagebox.showerror("Duplicate", "Section already exists."); return
+            if added is None: return
             if s in ["AI", "BI", "CI", "DI"]:
-                section_subjects[s] = ["Basic Maths", "English-I", "C Lang", "Electronics", "Computer Networking"]
+                subjects = ["Basic Maths", "English-I", "C Lang", "Electronics", "Computer Networking"]
             elif s in ["AIII", "BIII", "CIII", "DIII"]:
-                section_subjects[s] = ["DSA", "English-III", "Maths-III", "Artificial Intelligence", "Operating System"]
+                subjects = ["DSA", "English-III", "Maths-III", "Artificial Intelligence", "Operating System"]
             elif s in ["AV", "BV", "CV", "DV"]:
-                section_subjects[s] = ["English-V", "Machine Learning", "Algorithm", "OOP", "Database"]
-            save_json(PATH_SECTIONSUBJECTS, section_subjects)
+                subjects = ["English-V", "Machine Learning", "Algorithm", "OOP", "Database"]
+            else:
+                subjects = None
+            if subjects is not None:
+                def set_subjects(doc):
+                    doc[s] = subjects; return True
+                update_json(PATH_SECTIONSUBJECTS, {}, set_subjects)
             messagebox.showinfo("Section", f"Section {s} created."); self.admin_list_sections()
         self.v.button(c, "Create", save, SIDEBAR_BLUE).pack(pady=8)
 
@@ -663,15 +838,17 @@ class App:
     def admin_assign_section_to_student(self):
         c = self.container("Assign Section to Student")
         rmap = rollnumbers_map().get("map", {}).get("student", {})
-        secmap = sections_map(); lst = section_list()
+        lst = section_list()
 
         nb = ttk.Notebook(c)
         nb.pack(fill="both", expand=True)
 
         tab_select = self.v.frame(nb, BG_PANEL)
         tab_manual = self.v.frame(nb, BG_PANEL)
+        tab_bulk = self.v.frame(nb, BG_PANEL)
         nb.add(tab_select, text="Select from lists")
         nb.add(tab_manual, text="Manual entry")
+        nb.add(tab_bulk, text="Bulk (file or roll range)")
 
         if not lst:
             self.v.label(tab_select, "No sections available. Create a section first.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", padx=12, pady=12)
@@ -696,10 +873,9 @@ class App:
                 sec = section_var.get().strip()
                 if not roll or not sec:
                     messagebox.showerror("Input", "Choose student and section."); return
-                secmap[roll] = sec; save_json(PATH_SECTIONS, secmap)
+                section_roster().assign_student(roll, sec)
                 sec_subjects = section_subjects_map().get(sec, [])
-                studentsubj = load_json(PATH_STUDENTSUBJECTS, {}); studentsubj[roll] = {"section": sec, "subjects": sec_subjects}
-                save_json(PATH_STUDENTSUBJECTS, studentsubj)
+                set_student_subjects(roll, sec, sec_subjects)
                 ensure_student_attendance(roll, sec, sec_subjects)
                 messagebox.showinfo("Assigned", f"Assigned {roll} to section {sec}.")
                 self.admin_view_section_assignments()
@@ -716,15 +892,61 @@ class App:
                 messagebox.showerror("Input", "Enter roll and section."); return
             if sec not in lst:
                 messagebox.showerror("Input", "Section not found. Create section first."); return
-            secmap[roll] = sec; save_json(PATH_SECTIONS, secmap)
+            section_roster().assign_student(roll, sec)
             sec_subjects = section_subjects_map().get(sec, [])
-            studentsubj = load_json(PATH_STUDENTSUBJECTS, {}); studentsubj[roll] = {"section": sec, "subjects": sec_subjects}
-            save_json(PATH_STUDENTSUBJECTS, studentsubj)
+            set_student_subjects(roll, sec, sec_subjects)
             ensure_student_attendance(roll, sec, sec_subjects)
             messagebox.showinfo("Assigned", f"Assigned {roll} to section {sec}.")
             self.admin_view_section_assignments()
         self.v.button(tab_manual, "Assign", assign_manual, SIDEBAR_BLUE).pack(pady=10)
 
+        import placement
+        self.v.label(tab_bulk, "CSV/JSONL file with roll,section columns", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", padx=12)
+        file_row = self.v.frame(tab_bulk, BG_PANEL); file_row.pack(fill="x", padx=12, pady=6)
+        file_ent = self.v.entry(file_row); file_ent.pack(side="left", fill="x", expand=True)
+        def browse():
+            path = filedialog.askopenfilename(title="Select placement file", filetypes=[("CSV/JSONL", "*.csv *.jsonl *.ndjson"), ("All files", "*.*")])
+            if path:
+                file_ent.delete(0, "end"); file_ent.insert(0, path)
+        self.v.button(file_row, "Browse", browse, "#E6ECF8", width=10).pack(side="left", padx=(6, 0))
+        self.v.label(tab_bulk, "Roll ranges, comma separated (e.g. 20250001-20250060=AI)", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", padx=12)
+        rules_ent = self.v.entry(tab_bulk); rules_ent.pack(fill="x", padx=12, pady=6)
+        status = self.v.label(tab_bulk, "", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w"); status.pack(fill="x", padx=12)
+        cols = ("Roll", "Name", "From", "To")
+        diff = ttk.Treeview(tab_bulk, columns=cols, show="headings", height=10)
+        for col in cols: diff.heading(col, text=col); diff.column(col, anchor="center", width=150)
+        diff.pack(fill="both", expand=True, padx=12, pady=6)
+
+        def run_bulk(dry_run):
+            path = file_ent.get().strip() or None
+            rules = [r for r in rules_ent.get().split(",") if r.strip()]
+            if not path and not rules:
+                messagebox.showerror("Input", "Choose a file or enter a roll range."); return
+            if path and not os.path.exists(path):
+                messagebox.showerror("Input", f"File '{path}' not found."); return
+            try:
+                result = placement.bulk_assign(ROOT, path, rules, dry_run=dry_run,
+                                               subject_key=code_by_name, store=attendance_backend())
+            except placement.PartialCommit as e:
+                messagebox.showwarning("Bulk assign incomplete", str(e)); return
+            except Exception as e:
+                messagebox.showerror("Bulk assign", str(e)); return
+            diff.delete(*diff.get_children())
+            for roll, name, old, new, _ in result["changes"]:
+                diff.insert("", "end", values=(roll, name, old or "-", new))
+            phases = ", ".join(f"{k} {v:.3f}s" for k, v in result["timings"].items())
+            verb = "Would move" if dry_run else "Moved"
+            status.configure(text=f"{verb} {len(result['changes'])} student(s), {result['unchanged']} already in place, "
+                                  f"{len(result['errors'])} error(s). {phases}")
+            if result["errors"]:
+                lines = [f"{line} ({who or '-'}): {msg}" for line, who, msg in result["errors"][:15]]
+                if len(result["errors"]) > 15:
+                    lines.append(f"... and {len(result['errors']) - 15} more")
+                messagebox.showwarning("Bulk assign", "\n".join(lines))
+        btns = self.v.frame(tab_bulk, BG_PANEL); btns.pack(pady=8)
+        self.v.button(btns, "Dry run", lambda: run_bulk(True), "#E6ECF8").pack(side="left", padx=6)
+        self.v.button(btns, "Apply", lambda: run_bulk(False), SIDEBAR_BLUE).pack(side="left", padx=6)
+
     def admin_assign_sections_to_teacher(self):
         c = self.container("Assign Sections to Teacher")
         tmap = teacher_sections_map(); teachers = sorted({*tmap.keys()}) if tmap else []
@@ -740,8 +962,8 @@ class App:
             missing = [s for s in lst if s not in sec_all]
             if missing:
                 messagebox.showerror("Input", f"Unknown sections: {', '.join(missing)}"); return
-            tmap[tname] = sorted(set(lst)); save_json(PATH_TEACHERSECTIONS, tmap)
-            messagebox.showinfo("Teacher", f"Assigned sections {', '.join(tmap[tname])} to {tname}.")
+            stored = section_roster().assign_teacher(tname, lst)
+            messagebox.showinfo("Teacher", f"Assigned sections {', '.join(stored)} to {tname}.")
         self.v.button(c, "Save", save, SIDEBAR_BLUE).pack(pady=8)
 
     def admin_set_exam_dates(self):
@@ -755,14 +977,14 @@ class App:
         def save_date():
             code = code_var.get().strip().upper(); date_str = date_ent.get().strip()
             if not code or not date_str: messagebox.showerror("Input", "Code and date required."); return
-            payload = exams_payload(); found = False
-            for item in payload.get("exam_schedule", []):
-                if (item.get("subject_code") or item.get("code")) == code:
-                    item["subject_code"] = code; item["exam_date"] = date_str; found = True; break
-            if not found:
+            def apply(payload):
+                for item in payload.setdefault("exam_schedule", []):
+                    if (item.get("subject_code") or item.get("code")) == code:
+                        item["subject_code"] = code; item["exam_date"] = date_str; return True
                 name = next((s["name"] for s in subs if s["code"] == code), "")
-                payload.setdefault("exam_schedule", []).append({"subject_code": code, "subject_name": name, "exam_date": date_str})
-            save_json(PATH_EXAMS, payload); messagebox.showinfo("Exams", "Exam date saved.")
+                payload["exam_schedule"].append({"subject_code": code, "subject_name": name, "exam_date": date_str})
+                return True
+            if update_json(PATH_EXAMS, {"exam_schedule": []}, apply): messagebox.showinfo("Exams", "Exam date saved.")
         self.v.button(c, "Save Date", save_date, SIDEBAR_BLUE).pack(pady=8)
 
     def admin_view_all_exam_dates(self):
@@ -779,18 +1001,15 @@ class App:
 
     def admin_view_section_assignments(self):
         c = self.container("Section Assignments")
-        mapping = sections_map()
-        if not mapping:
+        bysec = section_roster().by_section()
+        if not bysec:
             self.v.label(c, "No students assigned yet.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); return
-        bysec = {}
-        for roll, sec in mapping.items():
-            sec = str(sec).strip().upper(); bysec.setdefault(sec, []).append(roll)
         cols = ("Section", "Students")
         tree = ttk.Treeview(c, columns=cols, show="headings", height=12)
         for col in cols: tree.heading(col, text=col); tree.column(col, anchor="center", width=280)
         tree.pack(fill="both", expand=True)
         for sec, rolls in sorted(bysec.items()):
-            tree.insert("", "end", values=(sec, ", ".join(sorted(rolls))))
+            tree.insert("", "end", values=(sec, ", ".join(rolls)))
 
     def admin_view_student_info(self):
         c = self.container("View Student Info")
@@ -798,8 +1017,7 @@ class App:
         def go():
             studentname = name_ent.get().strip()
             if not studentname: messagebox.showerror("Input", "Enter username."); return
-            rmap = rollnumbers_map().get("map", {}).get("student", {})
-            roll = rmap.get(studentname, studentname)
+            roll = rollnumbers.get_registry(PATH_ROLLNUMBERS).lookup(studentname) or studentname
             sec = student_section(roll)
             self.v.label(c, f"Roll: {roll}", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=6)
             self.v.label(c, f"Section: {sec}", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=6)
@@ -812,12 +1030,40 @@ class App:
                 self.v.label(c, "No subjects mapped.", SMALL, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x")
         self.v.button(c, "Show", go, SIDEBAR_BLUE).pack(pady=8)
 
+    def admin_provisioning_queue(self):
+        c = self.container("Provisioning Queue")
+        queue = provisioning_queue()
+        items = queue.pending()
+        self.v.label(c, f"{len(items)} queued request(s)", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=(0, 8))
+        cols = ("Queued", "Request", "For")
+        tree = ttk.Treeview(c, columns=cols, show="headings", height=12)
+        for col in cols:
+            tree.heading(col, text=col); tree.column(col, anchor="center", width=240)
+        tree.pack(fill="both", expand=True)
+        for item in items:
+            if item.get("kind") == provision_queue.ROLL:
+                tree.insert("", "end", values=(str(item.get("ts", ""))[:19], f"{item.get('role')} roll number", item.get("name")))
+            else:
+                tree.insert("", "end", values=(str(item.get("ts", ""))[:19], "attendance record", item.get("roll")))
+        def process():
+            try:
+                result = queue.drain(attendance_backend(), subject_catalogue_index())
+            except Exception as e:
+                messagebox.showerror("Provisioning", str(e)); return
+            messagebox.showinfo("Provisioning", f"{result['rolls']} roll number(s) allocated, "
+                                f"{result['attendance']} attendance record(s) created, {result['skipped']} skipped.")
+            self.admin_provisioning_queue()
+        if items:
+            self.v.button(c, "Process queue", process, SIDEBAR_BLUE).pack(pady=10)
+
     def admin_open_student_dashboard(self):
         c = self.container("Open Student Dashboard")
         self.v.label(c, "Student username", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); name_ent = self.v.entry(c); name_ent.pack(fill="x", pady=6)
         def go():
             studentname = name_ent.get().strip()
             if not studentname: messagebox.showerror("Input", "Enter username."); return
+            if rollnumbers.get_registry(PATH_ROLLNUMBERS).lookup(studentname) is None:
+                messagebox.showerror("Dashboard", f"No roll number allocated for {studentname}."); return
             prev_user, prev_role = self.active_user, self.active_role
             self.active_user, self.active_role = studentname, "student"
             self.dashboard_student()
@@ -828,12 +1074,14 @@ class App:
     def dashboard_teacher(self):
         items = [
             ("View my sections", self.teacher_view_sections),
+            ("Take class attendance", self.teacher_take_session),
             ("Mark present", self.teacher_mark_present),
             ("Update attendance/ mark absent", self.teacher_update_attendance),
             ("View attendance chart", self.teacher_view_chart),
             ("Add topic covered", self.teacher_add_topic),
             ("View topics covered", self.teacher_view_topics),
             ("View submitted assignments", self.teacher_view_assignments),
+            ("Attendance alerts", self.view_alerts),
         ]
         self.set_sidebar(items)
         self.teacher_view_sections()
@@ -846,6 +1094,68 @@ class App:
         for s in secs:
             self.v.label(c, s, BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x", pady=2)
 
+    def teacher_take_session(self):
+        import attendance
+        c = self.container("Take Class Attendance")
+        secs = section_roster().sections_of(self.active_user)
+        if not secs:
+            self.v.label(c, "No sections assigned.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); return
+        top = self.v.frame(c, BG_PANEL); top.pack(fill="x", pady=(0, 8))
+        self.v.label(top, "Section", BODY, PRIMARY_DEEP, BG_PANEL).pack(side="left")
+        sec_var = tk.StringVar(value=secs[0])
+        sec_box = ttk.Combobox(top, textvariable=sec_var, values=secs, state="readonly", width=10); sec_box.pack(side="left", padx=(6, 16))
+        self.v.label(top, "Subject", BODY, PRIMARY_DEEP, BG_PANEL).pack(side="left")
+        code_var = tk.StringVar()
+        code_box = ttk.Combobox(top, textvariable=code_var, width=12); code_box.pack(side="left", padx=(6, 16))
+        self.v.label(top, "Date", BODY, PRIMARY_DEEP, BG_PANEL).pack(side="left")
+        date_ent = self.v.entry(top, width=12); date_ent.insert(0, attendance_store.today()); date_ent.pack(side="left", padx=6)
+        actions = self.v.frame(c, BG_PANEL); actions.pack(fill="x", pady=(0, 8))
+        grid_host = self.v.frame(c, BG_PANEL); grid_host.pack(fill="both", expand=True)
+        marks = {}
+        registry = rollnumbers.get_registry(PATH_ROLLNUMBERS)
+
+        def load_roster(*_):
+            sec = sec_var.get()
+            codes = [code_by_name(nm) for nm in section_subjects_map().get(sec, [])]
+            code_box.configure(values=codes)
+            if code_var.get() not in codes:
+                code_var.set(codes[0] if codes else "")
+            self.v.clear(grid_host); marks.clear()
+            rolls = section_roster().rolls_in(sec)
+            if not rolls:
+                self.v.label(grid_host, "No students in this section.", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); return
+            inner = self._add_scroll(grid_host)
+            for i, roll in enumerate(rolls):
+                owner = registry.owner(roll)
+                var = tk.IntVar(value=1); marks[roll] = var
+                tk.Checkbutton(inner, text=f"{roll}  {owner[1] if owner else ''}", variable=var, font=BODY, fg=PRIMARY_DEEP,
+                               bg=BG_PANEL, activebackground=BG_PANEL, selectcolor=BG_PANEL, anchor="w"
+                               ).grid(row=i // 3, column=i % 3, sticky="w", padx=8, pady=2)
+
+        def set_all(value):
+            for var in marks.values(): var.set(value)
+
+        def save():
+            if not marks: messagebox.showerror("Attendance", "No students to mark."); return
+            present = {roll for roll, var in marks.items() if var.get()}
+            try:
+                result = attendance.take_session(self.active_user, sec_var.get(), code_var.get().strip(), present,
+                                                 date_ent.get().strip() or None, store=attendance_backend(),
+                                                 section_roster=section_roster(), catalogue=subject_catalogue_index(),
+                                                 ledger=attendance_ledger())
+            except (PermissionError, ValueError) as e:
+                messagebox.showerror("Attendance", str(e)); return
+            except Exception as e:
+                messagebox.showerror("File Error", f"Unable to save attendance: {e}"); return
+            messagebox.showinfo("Attendance", f"Saved {result['subject_name']} on {result['date']}: "
+                                              f"{result['present']}/{result['students']} present.")
+
+        self.v.button(actions, "All present", lambda: set_all(1), SIDEBAR_BLUE, width=12).pack(side="left", padx=(0, 8))
+        self.v.button(actions, "All absent", lambda: set_all(0), SIDEBAR_BLUE, width=12).pack(side="left", padx=(0, 8))
+        self.v.button(actions, "Save session", save, ACCENT_PINK, width=14).pack(side="right")
+        sec_box.bind("<<ComboboxSelected>>", load_roster)
+        load_roster()
+
     def teacher_mark_present(self):
         c = self.container("Mark Present")
         self.v.label(c, "Student roll", BODY, PRIMARY_DEEP, BG_PANEL, anchor="w").pack(fill="x"); roll_ent = self.v.entry(c); roll_ent.pack(fill="x", pady=6)
@@ -853,26 +1163,20 @@ class App:
         def go():
             roll = roll_ent.get().strip(); code = code_ent.get().strip().upper()
             if not roll or not code: messagebox.showerror("Input", "Enter roll and subject code."); return
-            att = attendance_master(); recs = att.get("attendance_records", {})
-            if roll not in recs: messagebox.showerror("Attendance", "Student not found."); return
-            subs = recs[roll].get("subjects", {})
-            key = code if code in subs else None
-            if not key:
-                for k, v in subs.items():
-                    if str(v.get("subject_name","")).strip().upper() == code.strip().upper():
-                        key = k; break
+            rec = attendance_record(roll)
+            if not rec: messagebox.showerror("Attendance", "Student not found."); return
+            subs = rec.get("subjects", {})
+            key = subject_catalogue_index().record_key(subs, code)
             if not key: messagebox.showerror("Subject", "Subject not found for student."); return
-            det = subs[key]
-            det["total_working_days"] = int(det.get("total_working_days", 0)) + 1
-            det["total_present_days"] = int(det.get("total_present_days", 0)) + 1
-            tw = det["total_working_days"]; tp = det["total_present_days"]
-            det["attendance_percentage"] = round((tp / tw) * 100, 2) if tw else 0.0
-            det["last_updated"] = datetime.now().strftime("%Y-%m-%d")
-            recs[roll]["subjects"][key] = det
-            att["attendance_records"] = recs
-            att.setdefault("metadata", {})["last_updated"] = datetime.now().strftime("%Y-%m-%d")
-            save_json(PATH_ATTENDANCE, att)
-            messagebox.showinfo("Attendance", "Marked present.")
+            import attendance
+            try:
+                applied = attendance.commit_marks([(roll, key, subject_catalogue_index().resolve(key) or key,
+                                                    subs[key].get("subject_name", key), True)],
+                                                  self.active_user, rec.get("section"),
+                                                  store=attendance_backend(), ledger=attendance_ledger())
+            except Exception as e:
+                messagebox.showerror("File Error", f"Unable to save attendance: {e}"); return
+            messagebox.showinfo("Attendance", "Marked present." if applied else "Nothing changed.")
         self.v.button(c, "Mark", go, SIDEBAR_BLUE).pack(pady=8)
 
     def teacher_update_attendance(self):
@@ -886,24 +1190,18 @@ class App:
             try: tw = int(tw_ent.get().strip()); tp = int(tp_ent.get().strip())
             except Exception: messagebox.showerror("Input", "Enter numeric values."); return
             if tp > tw: messagebox.showerror("Input", "Present days cannot exceed working days."); return
-            att = attendance_master(); recs = att.get("attendance_records", {})
-            if roll not in recs: messagebox.showerror("Attendance", "Student not found."); return
-            subs = recs[roll].get("subjects", {})
-            key = code if code in subs else None
-            if not key:
-                for k, v in subs.items():
-                    if str(v.get("subject_name","")).strip().upper() == code.strip().upper():
-                        key = k; break
+            rec = attendance_record(roll)
+            if not rec: messagebox.showerror("Attendance", "Student not found."); return
+            subs = rec.get("subjects", {})
+            key = subject_catalogue_index().record_key(subs, code)
             if not key: messagebox.showerror("Subject", "Subject not found for student."); return
-            det = subs[key]
-            det["total_working_days"] = tw
-            det["total_present_days"] = tp
-            det["attendance_percentage"] = round((tp / tw) * 100, 2) if tw else 0.0
-            det["last_updated"] = datetime.now().strftime("%Y-%m-%d")
-            recs[roll]["subjects"][key] = det
-            att["attendance_records"] = recs
-            att.setdefault("metadata", {})["last_updated"] = datetime.now().strftime("%Y-%m-%d")
-            save_json(PATH_ATTENDANCE, att)
+            import attendance
+            try:
+                attendance.correct_counts(roll, key, subject_catalogue_index().resolve(key) or key,
+                                          subs[key].get("subject_name", key), tw, tp, self.active_user,
+                                          rec.get("section"), store=attendance_backend(), ledger=attendance_ledger())
+            except Exception as e:
+                messagebox.showerror("File Error", f"Unable to save attendance: {e}"); return
             messagebox.showinfo("Attendance", "Updated.")
         self.v.button(c, "Update", go, SIDEBAR_BLUE).pack(pady=8)
 
@@ -914,11 +1212,14 @@ class App:
             from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
         except Exception:
             self.v.label(c, "matplotlib not installed; chart unavailable.", BODY, NEUTRAL_GRAYBLUE, BG_PANEL, anchor="w").pack(fill="x"); return
-        mysecs = teacher_sections_map().get(self.active_user, [])
-        att = attendance_master().get("attendance_records", {})
+        by_section = section_roster().rolls_for_teacher(self.active_user)
+        att = attendance_for_sections(by_section).get("attendance_records", {})
         pairs = []
-        for roll, rec in att.items():
-            if rec.get("section") in mysecs:
+        for rolls in by_section.values():
+            for roll in rolls:
+                rec = att.get(roll)
+                if not rec:
+                    continue
                 for code, det in rec.get("subjects", {}).items():
                     pairs.append((f"{det.get('subject_name', code)} ({roll})", det.get("attendance_percentage", 0.0)))
         if not pairs:
@@ -945,8 +1246,9 @@ class App:
         def save():
             sec = sec_ent.get().strip().upper(); topic = topic_ent.get().strip(); date = date_ent.get().strip()
             if not sec or not topic or not date: messagebox.showerror("Input", "All fields required."); return
-            data = topics_map(); data.setdefault(sec, []).append({"teacher": self.active_user, "topic": topic, "date": date})
-            save_json(PATH_TOPICS, data); messagebox.showinfo("Topic", "Added.")
+            def add(data):
+                data.setdefault(sec, []).append({"teacher": self.active_user, "topic": topic, "date": date}); return True
+            if update_json(PATH_TOPICS, {}, add): messagebox.showinfo("Topic", "Added.")
         self.v.button(c, "Save", save, SIDEBAR_BLUE).pack(pady=8)
 
     def teacher_view_topics(self):
@@ -983,9 +1285,12 @@ class App:
                     roll = os.path.splitext(f)[0]
                     tree.insert("", "end", values=(sec, roll, f))
 
-def launch():
+def launch(ready=None):
     root = tk.Tk()
     app = App(root)
+    if ready is not None:
+        # runs once the event loop is up and the first frame is drawn
+        root.after_idle(ready)
     root.mainloop()
 
 if __name__ == "__main__":
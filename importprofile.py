@@ -0,0 +1,69 @@
+import sys
+import time
+import builtins
+
+# -----------------------------------------------------------
+# Import-time profiler for --startup-profile
+# -----------------------------------------------------------
+#
+# install() wraps builtins.__import__ and times the first import of every
+# module. Times are inclusive (the module and everything it imported) and
+# self (inclusive minus the modules it imported itself). report() prints the
+# most expensive ones. Only meant for diagnosing slow starts.
+
+_original_import = None
+_records = {}   # module name -> [inclusive seconds, self seconds]
+_order = []
+_stack = []     # children time accumulated per open import
+_started = None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _original_import(name, globals, locals, fromlist, level)
+    _stack.append(0.0)
+    t0 = time.perf_counter()
+    try:
+        return _original_import(name, globals, locals, fromlist, level)
+    finally:
+        elapsed = time.perf_counter() - t0
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        if name not in _records:
+            _order.append(name)
+            _records[name] = [elapsed, elapsed - children]
+
+
+def install():
+    """Start timing imports. Safe to call more than once."""
+    global _original_import, _started
+    if _original_import is not None:
+        return
+    _started = time.perf_counter()
+    _original_import = builtins.__import__
+    builtins.__import__ = _timed_import
+
+
+def uninstall():
+    global _original_import
+    if _original_import is not None:
+        builtins.__import__ = _original_import
+        _original_import = None
+
+
+def elapsed():
+    """Seconds since install(), or None if the profiler never ran."""
+    return None if _started is None else time.perf_counter() - _started
+
+
+def report(label="startup", limit=20, out=None):
+    out = out or sys.stderr
+    total = elapsed()
+    rows = sorted(_records.items(), key=lambda kv: kv[1][0], reverse=True)[:limit]
+    print(f"\n--- Import profile ({len(_records)} modules) ---", file=out)
+    print(f"{'module':<40} {'self ms':>9} {'total ms':>9}", file=out)
+    for name, (incl, own) in rows:
+        print(f"{name:<40} {own * 1000:>9.1f} {incl * 1000:>9.1f}", file=out)
+    if total is not None:
+        print(f"{label} reached after {total * 1000:.1f} ms", file=out)
@@ -1,15 +1,29 @@
 import os
+import re
 import hashlib
 import secrets
 import hmac
 import getpass
 import pwinput
-import subject
-import menu
+
+import datastore
 BASE_DIR = os.path.dirname(__file__)
 DATAFILE = os.path.join(BASE_DIR, "userdata.bin")
 
+# userdata.bin is append-only: a changed user is written again as a new line
+# and the last line for a username wins; "-:<username>" is a tombstone.
+# save_users() compacts the file to one line per user.
+# Writers hold datastore.locked(DATAFILE); every write bumps the file's
+# datastore version, and a writer whose registry is older than that folds in
+# the other process's lines first.
+TOMBSTONE = "-"
+_HEX_DIGEST = re.compile(r"^[0-9a-f]{64}$")
+# compact once superseded lines outnumber live users (and at least this many)
+COMPACT_MIN_STALE = 64
+
 class User:
+    __slots__ = ("username", "role", "salt", "pwd_hash", "question", "ans_salt", "ans_hash")
+
     def __init__(self, username, role, salt, pwd_hash, question, ans_salt, ans_hash):
         self.username = username
         self.role = role
@@ -18,76 +32,227 @@ class User:
         self.question = question
         self.ans_salt = ans_salt
         self.ans_hash = ans_hash
-        self.next = None
 
-class UserList:
+    def record(self):
+        return (self.username, self.role, self.salt, self.pwd_hash, self.question, self.ans_salt, self.ans_hash)
+
+class UserRegistry:
+    """Users indexed by username (and by role), kept in insertion order.
+
+    Usernames are unique: add() refuses a name that already exists.
+    """
+
     def __init__(self):
-        self.head = None
+        self._by_name = {}
+        self._by_role = {}
+        self.lines = 0  # lines in userdata.bin, including superseded ones
+        self.version = 0  # datastore.version(DATAFILE) this registry reflects
+
+    @classmethod
+    def from_records(cls, records):
+        """Bulk-load from (username, role, salt, pwd_hash, question, ans_salt, ans_hash) tuples.
+
+        Later records for a username replace earlier ones (keeping the first
+        position); (TOMBSTONE, username) removes it.
+        """
+        users = cls()
+        lines = 0
+        for rec in records:
+            lines += 1
+            if rec[0] == TOMBSTONE:
+                users.remove(rec[1])
+            else:
+                users.put(rec)
+        users.lines = lines
+        return users
+
+    def put(self, rec):
+        old = self._by_name.get(rec[0])
+        if old is not None and old.role != rec[1]:
+            self._by_role[old.role].pop(old.username, None)
+        u = User(*rec)
+        self._by_name[u.username] = u
+        self._by_role.setdefault(u.role, {})[u.username] = u
+        return u
+
+    def remove(self, username):
+        u = self._by_name.pop(username, None)
+        if u is not None:
+            self._by_role[u.role].pop(username, None)
+        return u
 
     def add(self, username, role, salt, pwd_hash, question, ans_salt, ans_hash):
+        if username in self._by_name:
+            return self._by_name[username]
         u = User(username, role, salt, pwd_hash, question, ans_salt, ans_hash)
-        if not self.head:
-            self.head = u
-        else:
-            t = self.head
-            while t.next:
-                t = t.next
-            t.next = u # type: ignore
+        self._by_name[username] = u
+        self._by_role.setdefault(role, {})[username] = u
+        return u
+
+    def replace_with(self, other):
+        """Take over the contents of another registry (a fresh load)."""
+        self._by_name, self._by_role = other._by_name, other._by_role
+        self.lines, self.version = other.lines, other.version
 
     def find(self, username):
-        t = self.head
-        while t:
-            if t.username == username:
-                return t
-            t = t.next
-        return None
+        return self._by_name.get(username)
+
+    @property
+    def stale(self):
+        """Lines in userdata.bin that a compaction would drop."""
+        return max(0, self.lines - len(self))
+
+    def by_role(self, role):
+        return list(self._by_role.get(role, {}).values())
 
     def all(self):
-        out = []
-        t = self.head
-        while t:
-            out.append((t.username, t.role, t.salt, t.pwd_hash, t.question, t.ans_salt, t.ans_hash))
-            t = t.next
-        return out
+        return [u.record() for u in self._by_name.values()]
 
-def load_users():
-    users = UserList()
-    if not os.path.exists(DATAFILE):
-        return users
-    roles = ("admin", "teacher", "student")
+    def __iter__(self):
+        return iter(self._by_name.values())
+
+    def __len__(self):
+        return len(self._by_name)
+
+    def __contains__(self, username):
+        return username in self._by_name
+
+# Older name, kept for callers that still import it
+UserList = UserRegistry
+
+def _parse_user_line(line, roles=("admin", "teacher", "student")):
+    # a line without its newline is a torn append; ignore it
+    if not line.endswith(b"\n"):
+        return None
     try:
-        with open(DATAFILE, "rb") as f:
-            for line in f:
-                try:
-                    s = line.decode("utf-8").strip()
-                    if not s:
-                        continue
-                    p = s.split(":")
-                    if len(p) != 7:
-                        continue
-                    if p[1] in roles:
-                        username, role, salt, pwd_hash, question, ans_salt, ans_hash = p
-                    elif p[3] in roles:
-                        username, salt, pwd_hash, role, question, ans_salt, ans_hash = p
-                    else:
-                        continue
-                    users.add(username, role, salt, pwd_hash, question, ans_salt, ans_hash)
-                except:
-                    pass
-    except:
-        pass
+        s = line.decode("utf-8").strip()
+    except UnicodeDecodeError:
+        return None
+    if not s:
+        return None
+    p = s.split(":")
+    if len(p) == 2 and p[0] == TOMBSTONE:
+        return (TOMBSTONE, p[1])
+    if len(p) != 7:
+        return None
+    if p[1] in roles:
+        rec = tuple(p)
+    elif p[3] in roles:
+        username, salt, pwd_hash, role, question, ans_salt, ans_hash = p
+        rec = (username, role, salt, pwd_hash, question, ans_salt, ans_hash)
+    else:
+        return None
+    # both hashes are full sha256 hex digests; anything shorter is damage
+    if not (_HEX_DIGEST.match(rec[3]) and _HEX_DIGEST.match(rec[6])):
+        return None
+    return rec
+
+def load_users():
+    version = datastore.version(DATAFILE)
+    users = UserRegistry()
+    if os.path.exists(DATAFILE):
+        try:
+            with open(DATAFILE, "rb") as f:
+                users = UserRegistry.from_records(r for r in map(_parse_user_line, f) if r)
+        except OSError:
+            pass
+    users.version = version
     return users
 
+def _catch_up(users, changed=()):
+    """Fold in lines other processes wrote since users was loaded (hold the lock)."""
+    if users.version == datastore.version(DATAFILE):
+        return
+    fresh = load_users()
+    for u in changed:
+        fresh.put(u.record())
+    users.replace_with(fresh)
+
+def _write_atomic(lines):
+    """Replace userdata.bin with lines (temp file + rename, see datastore.atomic_file)."""
+    with datastore.atomic_file(DATAFILE, "wb") as f:
+        for s in lines:
+            f.write((s + "\n").encode("utf-8"))
+
+def _complete_length(f, end):
+    # offset just past the last newline in f (0 if there is none)
+    pos = end
+    while pos > 0:
+        step = min(4096, pos)
+        f.seek(pos - step)
+        chunk = f.read(step)
+        nl = chunk.rfind(b"\n")
+        if nl >= 0:
+            return pos - step + nl + 1
+        pos -= step
+    return 0
+
+def _append_lines(lines):
+    payload = "".join(s + "\n" for s in lines).encode("utf-8")
+    with open(DATAFILE, "a+b") as f:
+        # drop a torn last line: completing it with a newline would make a
+        # truncated record look whole
+        end = f.seek(0, os.SEEK_END)
+        if end > 0:
+            keep = _complete_length(f, end)
+            if keep != end:
+                f.truncate(keep)
+        f.write(payload)
+        datastore.sync(f, DATAFILE)
+
 def save_users(users):
+    """Rewrite userdata.bin with one line per user (compaction). Returns True on success."""
     try:
-        with open(DATAFILE, "wb") as f:
-            for u in users.all():
-                try:
-                    f.write((":".join(u) + "\n").encode("utf-8"))
-                except:
-                    pass
-    except:
-        pass
+        with datastore.locked(DATAFILE):
+            _catch_up(users)
+            _write_atomic(":".join(u) for u in users.all())
+            users.lines = len(users)
+            users.version = datastore.bump_version(DATAFILE)
+        return True
+    except OSError as e:
+        print("Error saving user data:", e)
+        return False
+
+def save_user(users, user):
+    """Persist one new or changed user by appending its record. Returns True on success."""
+    return save_many(users, [user])
+
+def save_many(users, changed):
+    """Append the records of several new or changed users in one write."""
+    lines = [":".join(u.record()) for u in changed]
+    if not lines:
+        return True
+    try:
+        with datastore.locked(DATAFILE):
+            _catch_up(users, changed)
+            _append_lines(lines)
+            users.version = datastore.bump_version(DATAFILE)
+    except OSError as e:
+        print("Error saving user data:", e)
+        return False
+    users.lines += len(lines)
+    return _maybe_compact(users)
+
+def delete_user(users, username):
+    """Remove a user and append a tombstone. Returns True on success."""
+    if users.remove(username) is None:
+        return False
+    try:
+        with datastore.locked(DATAFILE):
+            _catch_up(users)
+            users.remove(username)
+            _append_lines([f"{TOMBSTONE}:{username}"])
+            users.version = datastore.bump_version(DATAFILE)
+    except OSError as e:
+        print("Error saving user data:", e)
+        return False
+    users.lines += 1
+    return _maybe_compact(users)
+
+def _maybe_compact(users):
+    if users.stale >= max(COMPACT_MIN_STALE, len(users)):
+        return save_users(users)
+    return True
 
 def make_salt():
     return secrets.token_hex(16)
@@ -154,8 +319,10 @@ def create_account(users):
     salt = make_salt()
     pwd_hash = make_hash(password, salt)
 
-    users.add(username, role, salt, pwd_hash, sec_q, sec_a_salt, sec_a_hash)
-    save_users(users)
+    new_user = users.add(username, role, salt, pwd_hash, sec_q, sec_a_salt, sec_a_hash)
+    if not save_user(users, new_user):
+        return
+    import subject
     rno = subject.getRollNumber(username, role)
     print(f"Your roll no is {rno}")
     print("✅ Account created successfully!\n")
@@ -172,6 +339,8 @@ def login(users):
         print("Wrong password.")
         return
     print(f"Login successful as {user.role}!")
+    # menu pulls in every feature module; only pay for it once someone logs in
+    import menu
     if user.role == "admin":
         while True:
             print("\n1. Change own password")
@@ -190,7 +359,7 @@ def login(users):
                 newhash = make_hash(newpass, newsalt)
                 user.salt = newsalt
                 user.pwd_hash = newhash
-                save_users(users)
+                save_user(users, user)
                 print("Password changed!")
             elif choice == "2":
                 target = input("Enter username to change password: ").strip()
@@ -205,7 +374,7 @@ def login(users):
                     newhash = make_hash(newpass, newsalt)
                     target_user.salt = newsalt
                     target_user.pwd_hash = newhash
-                    save_users(users)
+                    save_user(users, target_user)
                     print("Password changed for user.")
             elif choice == "3":
                 menu.openMenu(user.role, user.username)
@@ -226,7 +395,7 @@ def login(users):
                 newhash = make_hash(newpass, newsalt)
                 user.salt = newsalt
                 user.pwd_hash = newhash
-                save_users(users)
+                save_user(users, user)
                 print("Password changed!")
             elif choice == "2":
                 menu.openMenu(user.role, user.username)
@@ -247,7 +416,7 @@ def login(users):
                 newhash = make_hash(newpass, newsalt)
                 user.salt = newsalt
                 user.pwd_hash = newhash
-                save_users(users)
+                save_user(users, user)
                 print("Password changed!")
             elif choice == "2":
                 menu.openMenu(user.role, user.username)
@@ -271,12 +440,13 @@ def forgot_password(users):
     newhash = make_hash(newpass, newsalt)
     user.salt = newsalt
     user.pwd_hash = newhash
-    save_users(users)
+    save_user(users, user)
 def migrate_userdata_interactive():
     roles = ("admin", "teacher", "student")
     if not os.path.exists(DATAFILE):
         print("No userdata.bin found")
         return
+    version = datastore.version(DATAFILE)
     lines = []
     with open(DATAFILE, "rb") as f:
         for line in f:
@@ -304,7 +474,11 @@ def migrate_userdata_interactive():
                     if role in roles:
                         break
             lines.append(":".join([username, role, salt, pwd_hash, question, ans_salt, ans_hash]))
-    with open(DATAFILE, "wb") as f:
-        for s in lines:
-            f.write((s + "\n").encode("utf-8"))
+    with datastore.locked(DATAFILE):
+        # the prompts can take a while; do not overwrite accounts saved meanwhile
+        if datastore.version(DATAFILE) != version:
+            print("User data changed while migrating. Nothing was written; run the migration again.")
+            return
+        _write_atomic(lines)
+        datastore.bump_version(DATAFILE)
     print("Migration complete.")
@@ -1,7 +1,25 @@
 import os
 import sys
+import atexit
+
+# --startup-profile: time every import until the main menu is shown
+STARTUP_PROFILE = "--startup-profile" in sys.argv[1:]
+if STARTUP_PROFILE:
+    import importprofile
+    importprofile.install()
+
 import login
 
+# --lock-stats: print file lock contention and write conflicts on exit
+if "--lock-stats" in sys.argv[1:]:
+    import datastore
+    atexit.register(datastore.report)
+
+# --key-stats: print how often subject lookups fell back to name-keyed scans
+if "--key-stats" in sys.argv[1:]:
+    import subject_catalogue
+    atexit.register(subject_catalogue.report)
+
 APP_TITLE = "EduTrack"
 
 def clear_screen():
@@ -20,6 +38,10 @@ def prompt(msg: str) -> str:
 def main():
     users = login.load_users()
 
+    if STARTUP_PROFILE:
+        importprofile.report("Main menu")
+        importprofile.uninstall()
+
     while True:
         print(f"\n===== {APP_TITLE} Main Menu =====")
         print("1. Create account")
@@ -40,6 +62,8 @@ def main():
 
         elif choice == "2":
             login.login(users)
+            # accounts may have been added from the admin menu
+            users = login.load_users()
 
         elif choice == "3":
             login.forgot_password(users)
@@ -1,40 +1,61 @@
-import exam_date
-import attendance
-import subject
-import section
-import topics
-import assignments  # ← add this at top with other imports
+import datastore
+
+# Each option imports the modules it uses, so opening a menu does not load
+# (or run the file checks of) modules the user never reaches.
 
 
 def viewAttendance():
+    import attendance
     attendance.view_attendance()
 
 def markAttendance(name, sec, subjectcode):
+    import attendance
     attendance.mark_attendance(name, sec, subjectcode)
 
 def updateAttendance(name, sec, subjectcode):
+    import attendance
     attendance.update_attendance(name, sec, subjectcode)
 
 def viewStudentInfo():
+    import subject
+    import section
+    import exam_date
     studentname = input("Enter student username: ").strip()
-    roll = subject.getRollNumber(studentname, "student")
-    secmap = section.loadJson(section.sectionsFile, {})
-    sec = secmap.get(roll, "Not assigned")
-    print(f"\n--- Info for {studentname} ---")
-    print(f"University Roll Number: {roll}")
-    print(f"Section: {sec}")
-    if sec != "Not assigned":
-        exam_date.viewSectionExamDates(sec)
+    with datastore.read_only("viewStudentInfo"):
+        roll = subject.lookupRollNumber(studentname, "student")
+        if roll is None:
+            print(f"No roll number allocated for {studentname}.")
+            return
+        secmap = section.loadJson(section.sectionsFile, {})
+        sec = secmap.get(roll, "Not assigned")
+        print(f"\n--- Info for {studentname} ---")
+        print(f"University Roll Number: {roll}")
+        print(f"Section: {sec}")
+        if sec != "Not assigned":
+            exam_date.viewSectionExamDates(sec)
 
 def studentDashboard(studentname):
+    import subject
+    import section
+    import exam_date
+    import attendance
     print(f"\n--- Dashboard for {studentname} ---")
-    roll = subject.getRollNumber(studentname, "student")
-    print(f"University Roll Number: {roll}")
-    secmap = section.loadJson(section.sectionsFile, {})
-    sec = secmap.get(roll, "Not assigned")
-    print(f"Section: {sec}")
-    if sec != "Not assigned":
-        exam_date.viewSectionExamDates(sec)
+    with datastore.read_only("studentDashboard"):
+        roll = subject.lookupRollNumber(studentname, "student")
+        if roll is None:
+            print("No roll number allocated yet.")
+            return
+        print(f"University Roll Number: {roll}")
+        secmap = section.loadJson(section.sectionsFile, {})
+        sec = secmap.get(roll, "Not assigned")
+        print(f"Section: {sec}")
+        if sec != "Not assigned":
+            exam_date.viewSectionExamDates(sec)
+        flagged = attendance.student_eligibility(roll)
+        if flagged:
+            print("\nExam eligibility warnings:")
+            for code, (status, pct) in sorted(flagged.items()):
+                print(f"  {code}: {pct}% ({status})")
 
 def adminMenu():
     while True:
@@ -50,25 +71,40 @@ def adminMenu():
         print("9. View section assignments")
         print("10. View student info")
         print("11. View any student's dashboard")
-        print("12. Back")
+        print("12. Bulk create accounts from CSV/JSONL")
+        print("13. Attendance analytics report")
+        print("14. Exam eligibility report")
+        print("15. View attendance alerts")
+        print("16. Bulk assign sections from CSV/JSONL or roll range")
+        print("17. Process provisioning queue")
+        print("18. Back")
         choice = input("Enter choice: ").strip()
         if choice == "1":
+            import subject
             subject.addSubject()
         elif choice == "2":
+            import subject
             subject.listSubjects()
         elif choice == "3":
+            import section
             section.createSection()
         elif choice == "4":
+            import section
             section.listSections()
         elif choice == "5":
+            import section
             section.assignSectionFromList()
         elif choice == "6":
+            import section
             section.assignSectionToTeacher()
         elif choice == "7":
+            import exam_date
             exam_date.setExamDatesAdmin()
         elif choice == "8":
+            import exam_date
             exam_date.viewAllExamDates()
         elif choice == "9":
+            import section
             section.viewSectionAssignments()
         elif choice == "10":
             viewStudentInfo()
@@ -76,11 +112,46 @@ def adminMenu():
             name = input("Enter student username: ").strip()
             studentDashboard(name)
         elif choice == "12":
+            import provision
+            provision.bulk_import_interactive()
+        elif choice == "13":
+            import attendance
+            attendance.attendance_analytics_report()
+        elif choice == "14":
+            import attendance
+            attendance.exam_eligibility_report()
+        elif choice == "15":
+            import attendance
+            attendance.view_alerts("admin")
+        elif choice == "16":
+            import section
+            section.bulkAssignSections()
+        elif choice == "17":
+            processProvisioningQueue()
+        elif choice == "18":
             break
         else:
             print("Invalid choice.")
 
+def processProvisioningQueue():
+    import provision_queue
+    import subject
+    import attendance
+    queue = subject.provisioningQueue()
+    pending = queue.pending()
+    print(f"\n{len(pending)} queued provisioning request(s).")
+    if not pending:
+        return
+    result = queue.drain(attendance.get_attendance_store(), attendance.get_subject_catalogue())
+    provision_queue.print_drain(result)
+
 def studentMenu(studentname):
+    import subject
+    roll = subject.lookupOrQueueRollNumber(studentname, "student")
+    if roll is None:
+        print("Pending provisioning: your roll number has not been allocated yet.")
+        print("The request is queued for the admin; please log in again once it has been processed.")
+        return
     while True:
         print("\n--- Student Menu ---")
         print("1. View dashboard")
@@ -96,28 +167,33 @@ def studentMenu(studentname):
             studentDashboard(studentname)
 
         elif choice == "2":
-            roll = subject.getRollNumber(studentname, "student")
-            secmap = section.loadJson(section.sectionsFile, {})
-            sec = secmap.get(roll, "Not assigned")
-            if sec == "Not assigned":
-                print("Section not assigned.")
-            else:
-                exam_date.viewStudentExamSchedule(studentname)
+            import section
+            import exam_date
+            with datastore.read_only("viewStudentExamSchedule"):
+                secmap = section.loadJson(section.sectionsFile, {})
+                sec = secmap.get(roll, "Not assigned")
+                if sec == "Not assigned":
+                    print("Section not assigned.")
+                else:
+                    exam_date.viewStudentExamSchedule(studentname)
 
         elif choice == "3":
-            roll = subject.getRollNumber(studentname, "student")
-            attendance.view_attendance(student_roll=roll)
+            import attendance
+            with datastore.read_only("view_attendance"):
+                attendance.view_attendance(student_roll=roll)
 
         elif choice == "4":
-            roll = subject.getRollNumber(studentname, "student")
-            attendance.get_student_attendance_summary(roll)
+            import attendance
+            with datastore.read_only("attendance_summary"):
+                attendance.get_student_attendance_summary(roll)
 
         elif choice == "5":
-            roll = subject.getRollNumber(studentname, "student")
-            topics.view_topics_for_student(roll)
+            import topics
+            with datastore.read_only("view_topics"):
+                topics.view_topics_for_student(roll)
 
         elif choice == "6":
-            roll = subject.getRollNumber(studentname, "student")
+            import assignments
             pdf_path = input("Enter path to your assignment PDF: ").strip()
             assignments.submit_assignment(roll, pdf_path) # type: ignore
 
@@ -138,29 +214,41 @@ def teacherMenu(teachername):
         print("5. Add topic covered")
         print("6. View topics covered")
         print("7. View submitted assignments")
-        print("8. Exit")
+        print("8. Take attendance for a class session")
+        print("9. View class attendance for a date range")
+        print("10. View attendance alerts")
+        print("11. Rapid roll call (one key per student)")
+        print("12. Exit")
         choice = input("Enter choice: ").strip()
 
         if choice == "1":
+            import section
             section.viewMySections(teachername)
 
         elif choice == "2":
             roll = input("Enter student roll number: ").strip()
             code = input("Enter subject code: ").strip().upper()
-            attendance.mark_attendance(teachername, roll, code)
+            import attendance
+            with datastore.access_window():
+                attendance.mark_attendance(teachername, roll, code)
 
         elif choice == "3":
             roll = input("Enter student roll number: ").strip()
             code = input("Enter subject code: ").strip().upper()
-            attendance.update_attendance(teachername, roll, code)
+            import attendance
+            with datastore.access_window():
+                attendance.update_attendance(teachername, roll, code)
 
         elif choice == "4":
+            import attendance
             attendance.view_attendance(teachername=teachername)
 
         elif choice == "5":
+            import topics
             topics.add_topic(teachername)
 
         elif choice == "6":
+            import topics
             # teacher can see topics of their assigned section(s)
             teacher_sections = topics.load_teacher_sections()
             teacher_name_lower = teachername.lower()
@@ -187,9 +275,27 @@ def teacherMenu(teachername):
                 print("No topics recorded yet for your sections.")
 
         elif choice == "7":
+            import assignments
             assignments.view_assignments(teachername) # type: ignore
 
         elif choice == "8":
+            import attendance
+            with datastore.access_window():
+                attendance.take_session_interactive(teachername)
+
+        elif choice == "9":
+            import attendance
+            attendance.view_attendance_range(teachername)
+
+        elif choice == "10":
+            import attendance
+            attendance.view_alerts(teachername, teachername=teachername)
+
+        elif choice == "11":
+            import attendance
+            attendance.roll_call_interactive(teachername)
+
+        elif choice == "12":
             break
 
         else:
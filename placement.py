@@ -0,0 +1,289 @@
+import os
+import re
+import sys
+import csv
+import time
+
+import datastore
+import attendance_store
+import rollnumbers
+import roster
+import provision
+import subject_catalogue
+
+# -----------------------------------------------------------
+# Bulk section assignment (intake placement)
+# -----------------------------------------------------------
+#
+# Students are placed into sections from a CSV (header row) or JSON Lines file
+# with the fields
+#
+#   roll, section          ("username" may be given instead of "roll")
+#
+# or from rules such as "20250001-20250060=AI", which place every registered
+# student whose roll falls in the range. Rows are validated against
+# rollnumbers.json, sectionlist.json and sectionsubjects.json and diffed
+# against sections.json; students already in the requested section are left
+# alone.
+#
+# All changes are applied in memory and each file is committed once, in this
+# order:
+#
+#   attendance             one ensure_students() call on the attendance store
+#   sections.json          one roster save
+#   studentsubjects.json   one locked read-modify-write
+#
+# The attendance store goes first because it is the write most likely to fail
+# (lock timeouts, a busy journal); if it does, nothing has been written. A
+# failure after it raises PartialCommit naming the steps already committed.
+# Every step is idempotent and the plan diffs against sections.json, so
+# running the same placement again finishes the job.
+#
+# A dry run stops after the diff and writes nothing.
+
+ALIASES = {
+    "roll_number": "roll",
+    "university_roll_number": "roll",
+    "student": "username",
+    "name": "username",
+}
+RULE = re.compile(r"^\s*(\d+)\s*(?:-|–|\.\.)\s*(\d+)\s*(?:=|->|→|:)\s*(\S+)\s*$")
+
+
+class PartialCommit(Exception):
+    """A placement failed after some of its files were written."""
+
+    def __init__(self, done, failed, cause, timings):
+        self.done, self.failed, self.cause, self.timings = done, failed, cause, timings
+        super().__init__(f"placement partially applied: {', '.join(done)} committed, "
+                         f"{failed} failed ({cause}); run the same placement again to finish it")
+
+
+def parse_rule(text):
+    """Parse "FIRST-LAST=SECTION" into (first, last, SECTION), or raise ValueError."""
+    m = RULE.match(text or "")
+    if not m:
+        raise ValueError(f"invalid rule {text!r}; expected FIRST-LAST=SECTION")
+    first, last = int(m.group(1)), int(m.group(2))
+    if first > last:
+        first, last = last, first
+    return first, last, m.group(3).upper()
+
+
+def rule_rows(rules, registry):
+    """Yield (label, row) for every registered student matched by the rules."""
+    students = sorted(registry.entries("student").values())
+    for text in rules:
+        try:
+            first, last, section = parse_rule(text)
+        except ValueError as e:
+            yield text, {"_error": str(e)}
+            continue
+        for roll in students:
+            if roll.isdigit() and first <= int(roll) <= last:
+                yield text, {"roll": roll, "section": section}
+
+
+def file_rows(path):
+    for n, row in provision.read_rows(path):
+        yield n, {ALIASES.get(k, k): v for k, v in row.items()}
+
+
+def _load(path, default):
+    try:
+        doc = datastore.load(path, default)
+    except (OSError, ValueError):
+        return default
+    return doc if isinstance(doc, type(default)) else default
+
+
+def plan(rows, base_dir, registry=None):
+    """Validate rows and diff them against sections.json.
+
+    Returns (changes, unchanged, errors): changes is a list of
+    (roll, name, old section or None, new section, subjects), errors a list of
+    (line, roll or username, message). A roll listed twice keeps its last row.
+    """
+    registry = registry or rollnumbers.get_registry(os.path.join(base_dir, "rollnumbers.json"))
+    sections = _load(os.path.join(base_dir, "sections.json"), {})
+    known = {str(s).strip().upper() for s in _load(os.path.join(base_dir, "sectionlist.json"), []) if str(s).strip()}
+    subjects_of = {str(k).upper(): v for k, v in _load(os.path.join(base_dir, "sectionsubjects.json"), {}).items()}
+
+    wanted, errors = {}, []
+    for line, row in rows:
+        if "_error" in row:
+            errors.append((line, "", row["_error"]))
+            continue
+        roll = row.get("roll") or (registry.lookup(row["username"]) if row.get("username") else None)
+        who = row.get("roll") or row.get("username") or ""
+        section = str(row.get("section") or "").strip().upper()
+        owner = registry.owner(roll) if roll else None
+        if owner is None or owner[0] != "student":
+            errors.append((line, who, "unknown student roll number"))
+        elif not section:
+            errors.append((line, who, "missing section"))
+        elif section not in known:
+            errors.append((line, who, f"section {section} does not exist"))
+        elif not isinstance(subjects_of.get(section), list) or not subjects_of[section]:
+            errors.append((line, who, f"section {section} has no subjects in sectionsubjects.json"))
+        else:
+            wanted[roll] = (owner[1], section)
+
+    changes, unchanged = [], 0
+    for roll, (name, section) in wanted.items():
+        old = sections.get(roll)
+        if old is not None and str(old).strip().upper() == section:
+            unchanged += 1
+            continue
+        changes.append((roll, name, old, section, list(subjects_of[section])))
+    changes.sort(key=lambda c: c[0])
+    return changes, unchanged, errors
+
+
+def commit(changes, base_dir, subject_key=None, store=None):
+    """Write changes to the attendance store, sections.json and
+    studentsubjects.json, one write each and in that order. Returns
+    {phase: seconds}.
+
+    subject_key maps a subject name to its attendance key (default: its code
+    in subjects.json, or the name for a subject missing from the catalogue).
+    Raises PartialCommit if a step fails after the attendance write.
+    """
+    timings = {}
+    if not changes:
+        return timings
+    if subject_key is None:
+        catalogue = subject_catalogue.get_catalogue(os.path.join(base_dir, "subjects.json"))
+        subject_key = lambda nm: catalogue.resolve(nm) or nm
+
+    t = time.perf_counter()
+    store = store or attendance_store.get_store(os.path.join(base_dir, "attendance_master.json"))
+    store.ensure_students([(roll, name, section, {subject_key(nm): nm for nm in subjects})
+                           for roll, name, _, section, subjects in changes])
+    timings["attendance"] = time.perf_counter() - t
+
+    def assign_sections():
+        section_roster = roster.get_roster(os.path.join(base_dir, "sections.json"),
+                                           os.path.join(base_dir, "teachersections.json"))
+        section_roster.assign_students({roll: section for roll, _, _, section, _ in changes})
+
+    def set_subjects(doc):
+        for roll, _, _, section, subjects in changes:
+            doc[roll] = {"section": section, "subjects": subjects}
+
+    steps = [
+        ("sections", assign_sections),
+        ("studentsubjects", lambda: datastore.update(os.path.join(base_dir, "studentsubjects.json"), {}, set_subjects)),
+    ]
+    for phase, step in steps:
+        t = time.perf_counter()
+        try:
+            step()
+        except Exception as e:
+            raise PartialCommit(list(timings), phase, e, timings) from e
+        timings[phase] = time.perf_counter() - t
+    return timings
+
+
+def bulk_assign(base_dir, path=None, rules=(), dry_run=False, subject_key=None, store=None):
+    """Place the students from path and/or rules. Returns a stats dict."""
+    t0 = time.perf_counter()
+    registry = rollnumbers.get_registry(os.path.join(base_dir, "rollnumbers.json"))
+    rows = []
+    if path:
+        rows.extend(file_rows(path))
+    rows.extend(rule_rows(rules, registry))
+    changes, unchanged, errors = plan(rows, base_dir, registry)
+    timings = {"plan": time.perf_counter() - t0}
+    if not dry_run:
+        timings.update(commit(changes, base_dir, subject_key, store))
+    elapsed = time.perf_counter() - t0
+    return {
+        "rows": len(rows),
+        "changes": changes,
+        "unchanged": unchanged,
+        "errors": errors,
+        "dry_run": dry_run,
+        "timings": timings,
+        "elapsed": elapsed,
+    }
+
+
+def format_diff(changes, limit=None):
+    shown = changes if limit is None else changes[:limit]
+    lines = [f"  {roll} {name}: {old or '(none)'} -> {new}" for roll, name, old, new, _ in shown]
+    if limit is not None and len(changes) > limit:
+        lines.append(f"  ... and {len(changes) - limit} more")
+    return lines
+
+
+def print_summary(result, limit=50):
+    verb = "Would move" if result["dry_run"] else "Moved"
+    print(f"\nRows read: {result['rows']}")
+    print(f"{verb} {len(result['changes'])} student(s); {result['unchanged']} already in place")
+    for line in format_diff(result["changes"], limit):
+        print(line)
+    print(f"Rows with errors: {len(result['errors'])}")
+    for line, who, msg in result["errors"][:20]:
+        print(f"  {line} ({who or '-'}): {msg}")
+    if len(result["errors"]) > 20:
+        print(f"  ... and {len(result['errors']) - 20} more")
+    phases = ", ".join(f"{k} {v:.3f}s" for k, v in result["timings"].items())
+    print(f"Time: {result['elapsed']:.3f}s ({phases})")
+
+
+def bulk_assign_interactive(base_dir):
+    print("\n--- Bulk assign sections ---")
+    print("Enter a CSV/JSONL file with roll,section columns, or rules like 20250001-20250060=AI")
+    source = input("File path or rules (comma separated): ").strip()
+    if not source:
+        print("Nothing to assign.")
+        return
+    path, rules = None, ()
+    if os.path.exists(source):
+        path = source
+    else:
+        rules = [r for r in source.split(",") if r.strip()]
+    try:
+        result = bulk_assign(base_dir, path, rules, dry_run=True)
+    except (OSError, csv.Error) as e:
+        print("Bulk assignment failed:", e)
+        return
+    print_summary(result)
+    if not result["changes"]:
+        return
+    if input("Apply these changes? (y/n): ").strip().lower() != "y":
+        print("Nothing written.")
+        return
+    try:
+        timings = commit(result["changes"], base_dir)
+    except PartialCommit as e:
+        print("Bulk assignment incomplete:", e)
+        return
+    except Exception as e:
+        print("Bulk assignment failed; nothing was written:", e)
+        return
+    phases = ", ".join(f"{k} {v:.3f}s" for k, v in timings.items())
+    print(f"Assigned {len(result['changes'])} student(s) ({phases})")
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Assign EduTrack students to sections in bulk.")
+    parser.add_argument("file", nargs="?", help="CSV/JSONL file with roll,section columns")
+    parser.add_argument("--rule", action="append", default=[], help="FIRST-LAST=SECTION (repeatable)")
+    parser.add_argument("--data-dir", default=".", help="directory holding the JSON files")
+    parser.add_argument("--dry-run", action="store_true", help="print the diff, write nothing")
+    args = parser.parse_args()
+    if not args.file and not args.rule:
+        parser.error("give a file or at least one --rule")
+    try:
+        res = bulk_assign(os.path.abspath(args.data_dir), args.file, args.rule, dry_run=args.dry_run)
+    except PartialCommit as e:
+        print("Bulk assignment incomplete:", e)
+        sys.exit(3)
+    except (OSError, csv.Error) as e:
+        print("Bulk assignment failed:", e)
+        sys.exit(1)
+    print_summary(res)
+    sys.exit(0 if not res["errors"] else 2)
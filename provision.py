@@ -0,0 +1,204 @@
+import os
+import sys
+import csv
+import json
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import login
+import subject
+
+# -----------------------------------------------------------
+# Bulk account provisioning (student onboarding)
+# -----------------------------------------------------------
+#
+# Input is a CSV with a header row, or JSON Lines, with these fields:
+#
+#   username, role, password, question, answer
+#
+# ("initial_password", "security_question" and "security_answer" are accepted
+# as aliases). Rows are validated while streaming, hashed in a process pool,
+# roll numbers are allocated per role in one batch, and userdata.bin and
+# rollnumbers.json are each written once at the end.
+#
+# Admin accounts are rejected here; they still need the interactive flow and
+# the admin creation password.
+
+ROLES = ("student", "teacher")
+ALIASES = {
+    "initial_password": "password",
+    "security_question": "question",
+    "security_answer": "answer",
+}
+POOL_THRESHOLD = 64  # below this many rows hashing stays in-process
+
+
+def _normalize(raw):
+    row = {}
+    for k, v in raw.items():
+        if k is None:
+            continue
+        key = str(k).strip().lower()
+        row[ALIASES.get(key, key)] = "" if v is None else str(v).strip()
+    return row
+
+
+def read_rows(path):
+    """Yield (line_number, row dict) from a CSV or JSONL file."""
+    if path.lower().endswith((".jsonl", ".ndjson")):
+        with open(path, "r", encoding="utf-8") as f:
+            for n, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    raw = json.loads(line)
+                except ValueError as e:
+                    yield n, {"_error": f"invalid JSON: {e}"}
+                    continue
+                yield n, _normalize(raw) if isinstance(raw, dict) else {"_error": "expected a JSON object"}
+    else:
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            reader = csv.DictReader(f)
+            for raw in reader:
+                yield reader.line_num, _normalize(raw)
+
+
+def validate(row, users, seen):
+    """Return an error message for row, or None if it can be created."""
+    if "_error" in row:
+        return row["_error"]
+    for field in ("username", "role", "password", "question", "answer"):
+        if not row.get(field):
+            return f"missing {field}"
+    username = row["username"]
+    if ":" in username or ":" in row["question"]:
+        return "':' is not allowed in usernames or questions"
+    if row["role"].lower() not in ROLES:
+        return f"role must be one of {', '.join(ROLES)}"
+    if len(row["password"]) <= 4:
+        return "password must be more than 4 characters"
+    if username in users or username in seen:
+        return "username already exists"
+    return None
+
+
+def _hash_row(row):
+    salt = login.make_salt()
+    ans_salt = login.make_salt()
+    return (row["username"], row["role"].lower(), salt, login.make_hash(row["password"], salt),
+            row["question"], ans_salt, login.make_hash(row["answer"], ans_salt))
+
+
+def _hash_all(rows, workers):
+    if len(rows) < POOL_THRESHOLD or workers == 1:
+        return [_hash_row(r) for r in rows]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(_hash_row, rows, chunksize=max(1, len(rows) // ((workers or os.cpu_count() or 1) * 4))))
+
+
+def write_report(path, errors):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["line", "username", "error"])
+        w.writerows(errors)
+
+
+def bulk_import(path, users=None, report_path=None, workers=None, dry_run=False):
+    """Create every valid account in path. Returns a stats dict.
+
+    errors in the result is a list of (line, username, message).
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    users = users if users is not None else login.load_users()
+
+    rows, errors, seen = [], [], set()
+    total = 0
+    for n, row in read_rows(path):
+        total += 1
+        err = validate(row, users, seen)
+        if err:
+            errors.append((n, row.get("username", ""), err))
+            continue
+        seen.add(row["username"])
+        rows.append(row)
+    timings["read"] = time.perf_counter() - t0
+
+    created = {}
+    if rows and not dry_run:
+        t = time.perf_counter()
+        records = _hash_all(rows, workers)
+        timings["hash"] = time.perf_counter() - t
+
+        t = time.perf_counter()
+        new_users = [users.add(*rec) for rec in records]
+        if not login.save_many(users, new_users):
+            for u in new_users:
+                users.remove(u.username)
+            raise OSError("could not write userdata.bin; no accounts were created")
+        for role in ROLES:
+            names = [u.username for u in new_users if u.role == role]
+            if names:
+                created.update(subject.allocateRollNumbers(names, role))
+        timings["commit"] = time.perf_counter() - t
+
+    if report_path:
+        write_report(report_path, errors)
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "rows": total,
+        "valid": len(rows),
+        "created": len(created),
+        "failed": len(errors),
+        "errors": errors,
+        "rolls": created,
+        "timings": timings,
+        "elapsed": elapsed,
+        "rows_per_sec": total / elapsed if elapsed > 0 else 0.0,
+    }
+
+
+def print_summary(result, report_path=None):
+    print(f"\nRows read: {result['rows']}")
+    print(f"Accounts created: {result['created']}")
+    print(f"Rows with errors: {result['failed']}")
+    for line, username, msg in result["errors"][:20]:
+        print(f"  line {line} ({username or '-'}): {msg}")
+    if result["failed"] > 20:
+        print(f"  ... and {result['failed'] - 20} more")
+    if report_path:
+        print(f"Error report written to {report_path}")
+    phases = ", ".join(f"{k} {v:.2f}s" for k, v in result["timings"].items())
+    print(f"Time: {result['elapsed']:.2f}s ({phases}), {result['rows_per_sec']:.0f} rows/s")
+
+
+def bulk_import_interactive(users=None):
+    path = input("Enter path to accounts CSV/JSONL file: ").strip()
+    if not os.path.exists(path):
+        print(f"File '{path}' not found!")
+        return
+    report = input("Error report CSV path (press Enter to skip): ").strip() or None
+    try:
+        result = bulk_import(path, users=users, report_path=report)
+    except (OSError, csv.Error) as e:
+        print("Bulk import failed:", e)
+        return
+    print_summary(result, report)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Create EduTrack accounts from a CSV/JSONL file.")
+    parser.add_argument("file")
+    parser.add_argument("--report", help="write per-row errors to this CSV file")
+    parser.add_argument("--workers", type=int, default=None, help="hashing processes (default: CPU count)")
+    parser.add_argument("--dry-run", action="store_true", help="validate only, write nothing")
+    args = parser.parse_args()
+    try:
+        res = bulk_import(args.file, report_path=args.report, workers=args.workers, dry_run=args.dry_run)
+    except (OSError, csv.Error) as e:
+        print("Bulk import failed:", e)
+        sys.exit(1)
+    print_summary(res, args.report)
+    sys.exit(0 if res["failed"] == 0 else 2)
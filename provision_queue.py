@@ -0,0 +1,233 @@
+import os
+import sys
+import json
+import time
+import threading
+
+import datastore
+import attendance_store
+import rollnumbers
+import subject_catalogue
+
+# -----------------------------------------------------------
+# Deferred provisioning queue
+# -----------------------------------------------------------
+#
+# Views never create data. Sign-up allocates the roll number; when a view
+# finds an older account without one, or a student without an attendance
+# record, it queues a repair request instead and shows what it has. Requests
+# are appended to provisioning.jsonl next to the data files, one JSON object
+# per line:
+#
+#   {"kind": "roll", "name": name, "role": role}
+#   {"kind": "attendance", "roll": roll}
+#
+# A request already in the queue is not appended again, so a dashboard that
+# refreshes every few seconds reads the queue but does not write to it.
+#
+# drain() is the explicit write step (admin menu, GUI sidebar). It allocates
+# every queued roll number with one rollnumbers.json save per role, seeds the
+# missing attendance records with one ensure_students() call, then empties
+# the queue. A student whose section has no subjects yet is dropped and
+# counted; assigning the section seeds the record anyway.
+
+ROLL = "roll"
+ATTENDANCE = "attendance"
+QUEUE_FILE = "provisioning.jsonl"
+
+
+def queue_path_for(base_dir):
+    return os.path.join(os.path.abspath(base_dir), QUEUE_FILE)
+
+
+def _key(item):
+    if item.get("kind") == ROLL:
+        return (ROLL, item.get("role") or "student", item.get("name"))
+    return (ATTENDANCE, item.get("roll"))
+
+
+def _load(path, default):
+    try:
+        doc = datastore.load(path, default)
+    except (OSError, ValueError):
+        return default
+    return doc if isinstance(doc, type(default)) else default
+
+
+class ProvisionQueue:
+    """JSONL queue of provisioning requests made by read paths."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.base_dir = os.path.dirname(self.path)
+        self._lock = threading.Lock()
+        self._keys = set()
+        self._offset = 0
+
+    def _catch_up(self):
+        """Fold lines appended since the last look; restart if the file shrank."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            size = 0
+        if size < self._offset:
+            self._keys.clear()
+            self._offset = 0
+        if size == self._offset:
+            return
+        items, self._offset = _read_lines(self.path, self._offset)
+        self._keys.update(_key(item) for item in items)
+
+    # -- requests ----------------------------------------------------
+
+    def request(self, item):
+        """Queue item unless an equal request is pending. Returns True if added."""
+        with self._lock:
+            self._catch_up()
+            if _key(item) in self._keys:
+                return False
+            # the one write a read path is allowed: a line in the queue
+            with datastore.writes_allowed(), datastore.locked(self.path):
+                self._catch_up()
+                if _key(item) in self._keys:
+                    return False
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(item) + "\n")
+                    datastore.sync(f, self.path)
+                self._offset = os.path.getsize(self.path)
+                self._keys.add(_key(item))
+            return True
+
+    def request_roll(self, name, role="student"):
+        return self.request({"kind": ROLL, "name": name, "role": role, "ts": attendance_store.now()})
+
+    def request_attendance(self, roll):
+        return self.request({"kind": ATTENDANCE, "roll": roll, "ts": attendance_store.now()})
+
+    def pending(self):
+        """Return the queued requests, oldest first."""
+        return _read_lines(self.path)[0]
+
+    # -- drain -------------------------------------------------------
+
+    def drain(self, store=None, catalogue=None):
+        """Carry out every queued request and empty the queue. Returns a stats dict."""
+        t0 = time.perf_counter()
+        base = self.base_dir
+        with self._lock, datastore.locked(self.path):
+            items = _read_lines(self.path)[0]
+            names_by_role, rolls = {}, []
+            for item in items:
+                if item.get("kind") == ROLL and item.get("name"):
+                    names = names_by_role.setdefault(item.get("role") or "student", [])
+                    if item["name"] not in names:
+                        names.append(item["name"])
+                elif item.get("kind") == ATTENDANCE and item.get("roll"):
+                    if item["roll"] not in rolls:
+                        rolls.append(item["roll"])
+
+            registry = rollnumbers.get_registry(os.path.join(base, "rollnumbers.json"))
+            allocated = 0
+            for role, names in names_by_role.items():
+                known = registry.entries(role)
+                allocated += sum(1 for n in names if n not in known)
+                registry.allocate(names, role)
+
+            store = store or attendance_store.get_store(os.path.join(base, "attendance_master.json"))
+            catalogue = catalogue or subject_catalogue.get_catalogue(os.path.join(base, "subjects.json"))
+            batch, skipped = self._attendance_batch(rolls, store, catalogue)
+            created = store.ensure_students(batch) if batch else []
+
+            if items:
+                with datastore.atomic_file(self.path, "w", encoding="utf-8"):
+                    pass
+            self._keys.clear()
+            self._offset = 0
+        return {
+            "requests": len(items),
+            "rolls": allocated,
+            "attendance": len(created),
+            "skipped": skipped,
+            "elapsed": time.perf_counter() - t0,
+        }
+
+    def _attendance_batch(self, rolls, store, catalogue):
+        base = self.base_dir
+        sections = _load(os.path.join(base, "sections.json"), {})
+        chosen = _load(os.path.join(base, "studentsubjects.json"), {})
+        by_section = {str(k).upper(): v for k, v in _load(os.path.join(base, "sectionsubjects.json"), {}).items()}
+        batch, skipped = [], 0
+        for roll in rolls:
+            if store.get_record(roll) is not None:
+                continue
+            section = str(sections.get(roll) or "").strip().upper()
+            entry = chosen.get(roll)
+            names = entry.get("subjects") if isinstance(entry, dict) else None
+            if not isinstance(names, list) or not names:
+                names = by_section.get(section)
+            if not section or not isinstance(names, list) or not names:
+                skipped += 1
+                continue
+            batch.append((roll, roll, section, {catalogue.resolve(nm) or nm: nm for nm in names}))
+        return batch, skipped
+
+
+def _read_lines(path, offset=0):
+    """Read complete JSONL lines from byte offset. Returns (items, new offset)."""
+    items = []
+    try:
+        f = open(path, "rb")
+    except FileNotFoundError:
+        return items, offset
+    with f:
+        f.seek(offset)
+        for raw in f:
+            if not raw.endswith(b"\n"):
+                break  # a writer is mid-line; pick it up next time
+            offset += len(raw)
+            try:
+                item = json.loads(raw)
+            except ValueError:
+                continue
+            if isinstance(item, dict):
+                items.append(item)
+    return items, offset
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue(path):
+    """Return the shared queue for the file at path."""
+    key = os.path.abspath(path)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = _queues[key] = ProvisionQueue(key)
+        return queue
+
+
+def print_drain(result, out=None):
+    out = out or sys.stdout
+    print(f"Processed {result['requests']} queued request(s): {result['rolls']} roll number(s) allocated, "
+          f"{result['attendance']} attendance record(s) created, {result['skipped']} skipped "
+          f"({result['elapsed']:.3f}s)", file=out)
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Show or process the EduTrack provisioning queue.")
+    parser.add_argument("--data-dir", default=".", help="directory holding the JSON files")
+    parser.add_argument("--drain", action="store_true", help="carry out the queued requests")
+    args = parser.parse_args()
+    queue = get_queue(queue_path_for(args.data_dir))
+    if args.drain:
+        print_drain(queue.drain())
+    else:
+        items = queue.pending()
+        print(f"{len(items)} queued request(s)")
+        for item in items:
+            what = f"roll number for {item.get('role')} {item.get('name')}" if item.get("kind") == ROLL \
+                else f"attendance record for {item.get('roll')}"
+            print(f"  [{str(item.get('ts', ''))[:19]}] {what}")
@@ -0,0 +1,143 @@
+import os
+import threading
+
+import datastore
+
+# -----------------------------------------------------------
+# Roll-number registry
+# -----------------------------------------------------------
+#
+# rollnumbers.json keeps one name -> roll map per role plus a counter per role:
+#
+#   {"map": {"student": {name: roll}, ...}, "counters": {"student": n, ...}}
+#
+# The registry indexes it both ways (name -> roll per role, roll -> (role,
+# name)). The indexes are rebuilt only when datastore hands back a different
+# document object, i.e. when the file changed on disk or was saved.
+#
+# lookup() and owner() never write. allocate() takes the file lock, re-reads
+# the file, reserves one contiguous counter range for all new names and saves
+# once, so concurrent creators never hand out the same number.
+
+ROLES = ("student", "teacher", "admin")
+
+
+def empty_document():
+    return {
+        "map": {role: {} for role in ROLES},
+        "counters": {role: 0 for role in ROLES},
+    }
+
+
+def format_roll(n, role):
+    if role == "teacher":
+        return f"T{str(n).zfill(4)}"
+    elif role == "admin":
+        return f"A{str(n).zfill(4)}"
+    return f"2025{str(n).zfill(4)}"
+
+
+def _valid(doc):
+    return isinstance(doc, dict) and isinstance(doc.get("map"), dict) and isinstance(doc.get("counters"), dict)
+
+
+class RollNumberRegistry:
+    """In-memory two-way index over rollnumbers.json."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self._lock = threading.RLock()
+        self._source = None  # object last returned by datastore.load
+        self._doc = None
+        self._by_roll = {}   # roll -> (role, name)
+
+    def _load(self, fresh=False):
+        try:
+            doc = (datastore.load_fresh if fresh else datastore.load)(self.path, None)
+        except (OSError, ValueError):
+            doc = None
+        with self._lock:
+            if self._doc is None or doc is not self._source:
+                self._source = doc
+                if not _valid(doc):
+                    doc = empty_document()
+                by_roll = {}
+                for role, names in doc["map"].items():
+                    if isinstance(names, dict):
+                        for name, roll in names.items():
+                            by_roll[roll] = (role, name)
+                self._doc, self._by_roll = doc, by_roll
+            return self._doc
+
+    # -- reads -------------------------------------------------------
+
+    def lookup(self, name, role="student"):
+        """Return the roll number for name, or None. Never writes."""
+        return self._load()["map"].get(role, {}).get(name)
+
+    def owner(self, roll):
+        """Return (role, name) for a roll number, or None."""
+        self._load()
+        return self._by_roll.get(roll)
+
+    def entries(self, role="student"):
+        """Return the name -> roll map for role (shared, do not modify)."""
+        return self._load()["map"].get(role, {})
+
+    # -- writes ------------------------------------------------------
+
+    def allocate(self, names, role="student"):
+        """Assign roll numbers to names of one role. Returns {name: roll}.
+
+        Names that already have a roll keep it; the file is written at most once.
+        """
+        out = {}
+        missing = []
+        current = self._load()["map"].get(role, {})
+        for name in names:
+            if name in current:
+                out[name] = current[name]
+            elif name not in out:
+                out[name] = None
+                missing.append(name)
+        if not missing:
+            return out
+
+        with self._lock, datastore.locked(self.path):
+            base = self._load(fresh=True)
+            doc = {
+                "map": {r: dict(m) for r, m in base["map"].items()},
+                "counters": dict(base["counters"]),
+            }
+            rolemap = doc["map"].setdefault(role, {})
+            new = [n for n in missing if n not in rolemap]
+            start = doc["counters"].get(role, 0)
+            doc["counters"][role] = start + len(new)
+            for i, name in enumerate(new, 1):
+                rolemap[name] = format_roll(start + i, role)
+            for name in missing:
+                out[name] = rolemap[name]
+            if new:
+                datastore.save(self.path, doc)
+                self._load()
+        return out
+
+    def get_or_allocate(self, name, role="student"):
+        roll = self.lookup(name, role)
+        if roll is None:
+            roll = self.allocate([name], role)[name]
+        return roll
+
+
+_registries = {}
+_registries_lock = threading.Lock()
+
+
+def get_registry(path):
+    """Return the shared registry for the rollnumbers.json file at path."""
+    key = os.path.abspath(path)
+    with _registries_lock:
+        reg = _registries.get(key)
+        if reg is None:
+            reg = _registries[key] = RollNumberRegistry(key)
+        return reg
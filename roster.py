@@ -0,0 +1,178 @@
+import os
+import threading
+
+import datastore
+
+# -----------------------------------------------------------
+# Section roster and teacher assignment indexes
+# -----------------------------------------------------------
+#
+# sections.json maps roll -> section and teachersections.json maps
+# teacher -> [sections]. The roster keeps the inverted indexes
+#
+#   section -> {rolls}, section -> {teachers}, teacher -> [sections]
+#
+# so roster-scoped views touch only the students of one section. Section
+# names are compared upper-cased, as everywhere else in the app.
+#
+# Writes made through assign_students()/assign_teacher() patch the indexes in
+# place. A change made any other way (another process, a hand edit) shows up
+# as a new datastore signature and the affected index is rebuilt.
+
+
+def _norm(section):
+    return str(section or "").strip().upper()
+
+
+class Roster:
+    """Inverted indexes over sections.json and teachersections.json."""
+
+    def __init__(self, sections_path, teachers_path):
+        self.sections_path = os.path.abspath(sections_path)
+        self.teachers_path = os.path.abspath(teachers_path)
+        self._lock = threading.RLock()
+        self._sections_sig = None
+        self._teachers_sig = None
+        self._sections_built = False
+        self._teachers_built = False
+        self._section_of = {}        # roll -> SECTION
+        self._rolls = {}             # SECTION -> {rolls}
+        self._teacher_sections = {}  # teacher -> [SECTION]
+        self._section_teachers = {}  # SECTION -> {teachers}
+
+    # -- index maintenance -------------------------------------------
+
+    @staticmethod
+    def _load(path, fresh=False):
+        try:
+            doc = (datastore.load_fresh if fresh else datastore.load)(path, {})
+        except (OSError, ValueError):
+            doc = {}
+        return doc if isinstance(doc, dict) else {}
+
+    def _sections(self, fresh=False):
+        doc = self._load(self.sections_path, fresh)
+        sig = datastore.signature(self.sections_path)
+        with self._lock:
+            if not self._sections_built or sig != self._sections_sig:
+                section_of, rolls = {}, {}
+                for roll, sec in doc.items():
+                    sec = _norm(sec)
+                    section_of[roll] = sec
+                    rolls.setdefault(sec, set()).add(roll)
+                self._section_of, self._rolls = section_of, rolls
+                self._sections_sig, self._sections_built = sig, True
+        return doc
+
+    def _teachers(self, fresh=False):
+        doc = self._load(self.teachers_path, fresh)
+        sig = datastore.signature(self.teachers_path)
+        with self._lock:
+            if not self._teachers_built or sig != self._teachers_sig:
+                teacher_sections, section_teachers = {}, {}
+                for teacher, secs in doc.items():
+                    secs = [_norm(s) for s in (secs if isinstance(secs, list) else [secs])]
+                    teacher_sections[teacher] = secs
+                    for s in secs:
+                        section_teachers.setdefault(s, set()).add(teacher)
+                self._teacher_sections, self._section_teachers = teacher_sections, section_teachers
+                self._teachers_sig, self._teachers_built = sig, True
+        return doc
+
+    # -- reads -------------------------------------------------------
+
+    def section_of(self, roll):
+        """Return the (upper-cased) section of roll, or None."""
+        with self._lock:
+            self._sections()
+            return self._section_of.get(roll)
+
+    def rolls_in(self, section):
+        """Return the sorted rolls assigned to section."""
+        with self._lock:
+            self._sections()
+            return sorted(self._rolls.get(_norm(section), ()))
+
+    def by_section(self):
+        """Return {SECTION: sorted rolls} for every section with students."""
+        with self._lock:
+            self._sections()
+            return {sec: sorted(rolls) for sec, rolls in self._rolls.items() if rolls}
+
+    def sections_of(self, teacher):
+        """Return the (upper-cased) sections assigned to teacher."""
+        with self._lock:
+            self._teachers()
+            return list(self._teacher_sections.get(teacher, ()))
+
+    def teachers_of(self, section):
+        with self._lock:
+            self._teachers()
+            return sorted(self._section_teachers.get(_norm(section), ()))
+
+    def teaches(self, teacher, section):
+        return _norm(section) in self.sections_of(teacher)
+
+    def rolls_for_teacher(self, teacher):
+        """Return {SECTION: sorted rolls} for each section the teacher has."""
+        return {sec: self.rolls_in(sec) for sec in self.sections_of(teacher)}
+
+    # -- writes ------------------------------------------------------
+
+    def assign_students(self, assignments):
+        """Write roll -> section pairs to sections.json in one save.
+
+        Returns {roll: previous section or None}.
+        """
+        assignments = dict(assignments)
+        if not assignments:
+            return {}
+        with self._lock, datastore.locked(self.sections_path):
+            doc = dict(self._sections(fresh=True))
+            previous = {}
+            for roll, sec in assignments.items():
+                previous[roll] = doc.get(roll)
+                doc[roll] = sec
+            datastore.save(self.sections_path, doc)
+            for roll, sec in assignments.items():
+                old = self._section_of.get(roll)
+                if old is not None:
+                    self._rolls.get(old, set()).discard(roll)
+                new = _norm(sec)
+                self._section_of[roll] = new
+                self._rolls.setdefault(new, set()).add(roll)
+            self._sections_sig = datastore.signature(self.sections_path)
+        return previous
+
+    def assign_student(self, roll, section):
+        return self.assign_students({roll: section})[roll]
+
+    def assign_teacher(self, teacher, sections):
+        """Replace the sections of one teacher. Returns the stored list."""
+        stored = sorted(set(sections))
+        with self._lock, datastore.locked(self.teachers_path):
+            doc = dict(self._teachers(fresh=True))
+            doc[teacher] = stored
+            datastore.save(self.teachers_path, doc)
+            for sec in self._teacher_sections.get(teacher, ()):
+                self._section_teachers.get(sec, set()).discard(teacher)
+            secs = [_norm(s) for s in stored]
+            self._teacher_sections[teacher] = secs
+            for sec in secs:
+                self._section_teachers.setdefault(sec, set()).add(teacher)
+            self._teachers_sig = datastore.signature(self.teachers_path)
+        return stored
+
+
+_rosters = {}
+_rosters_lock = threading.Lock()
+
+
+def get_roster(sections_path, teachers_path):
+    """Return the shared roster for a sections.json/teachersections.json pair."""
+    key = (os.path.abspath(sections_path), os.path.abspath(teachers_path))
+    with _rosters_lock:
+        r = _rosters.get(key)
+        if r is None:
+            r = _rosters[key] = Roster(*key)
+        return r
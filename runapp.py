@@ -1,48 +1,52 @@
 import os
 import sys
-import subprocess
+import time
+import importlib.util
 
 this_dir = os.path.dirname(os.path.abspath(__file__))
 os.chdir(this_dir)
+if this_dir not in sys.path:
+    sys.path.insert(0, this_dir)
+
+_start = time.perf_counter()
+
+def _report(what):
+    print("{} in {:.0f} ms".format(what, (time.perf_counter() - _start) * 1000), file=sys.stderr)
+
+def gui_available():
+    """Return (ok, reason): a display is present and tkinter is installed."""
+    if os.name != "nt" and sys.platform != "darwin":
+        if not (os.environ.get("DISPLAY") or os.environ.get("WAYLAND_DISPLAY")):
+            return False, "no display"
+    # find the modules without importing them; gui.py does the real import
+    for name in ("tkinter", "_tkinter"):
+        if importlib.util.find_spec(name) is None:
+            return False, "tkinter not available (no module named {})".format(name)
+    return True, ""
+
+def run_cli():
+    import main as cli
+    _report("CLI ready")
+    cli.main()
+    return 0
+
+def run_gui():
+    import gui
+    gui.launch(ready=lambda: _report("GUI ready"))
+    return 0
 
 def main():
-   
-    python_executable = sys.executable or "python3"
-    gui_path = os.path.join(this_dir, "gui.py")
-   
-    try:
-        rc = subprocess.call([python_executable, "-c", "import tkinter"],
-                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-    except OSError as e:
-        print("Failed to check for tkinter availability:", e)
-        return 1
-
-    if rc != 0:
-        # tkinter not importable — run CLI instead
-        cli_path = os.path.join(this_dir, "main.py")
-        print("Tkinter not available — launching CLI instead.")
-        try:
-            return subprocess.call([python_executable, cli_path])
-        except OSError as e:
-            print("Failed to launch CLI process:", e)
-            return 1
-
-    try:
-        gui_rc = subprocess.call([python_executable, gui_path])
-    except OSError as e:
-        print("Failed to launch GUI process:", e)
-        return 1
-
-    if gui_rc == 0:
-        return 0
+    ok, reason = gui_available()
+    if not ok:
+        # no GUI possible here — run CLI instead
+        print("GUI unavailable: {} — launching CLI instead.".format(reason))
+        return run_cli()
 
-    print("GUI exited unexpectedly (code {}). Launching CLI instead.".format(gui_rc))
-    cli_path = os.path.join(this_dir, "main.py")
     try:
-        return subprocess.call([python_executable, cli_path])
-    except OSError as e:
-        print("Failed to launch CLI process:", e)
-        return 1
+        return run_gui()
+    except Exception as e:
+        print("GUI exited unexpectedly ({}). Launching CLI instead.".format(e))
+        return run_cli()
 
 
 if __name__ == "__main__":
@@ -1,7 +1,11 @@
 import os
-import json
 from datetime import datetime
-from datetime import date
+
+import datastore
+import attendance_store
+import rollnumbers
+import roster
+import subject_catalogue
 
 sectionListFile = "sectionlist.json"
 sectionsFile = "sections.json"
@@ -14,11 +18,8 @@ def loadJson(filename, default):
     # so JSON files placed next to the EduTrack-main folder are used.
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     filepath = os.path.join(base_dir, filename)
-    if not os.path.exists(filepath):
-        return default
     try:
-        with open(filepath, "r") as f:
-            return json.load(f)
+        return datastore.load(filepath, default)
     except Exception:
         return default
 
@@ -26,9 +27,12 @@ def saveJson(filename, data):
     # Save JSON relative to project root (one level above this module)
     base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
     filepath = os.path.join(base_dir, filename)
-    os.makedirs(os.path.dirname(filepath), exist_ok=True)
-    with open(filepath, "w") as f:
-        json.dump(data, f, indent=2)
+    datastore.save(filepath, data)
+
+def updateJson(filename, default, change):
+    # Read-modify-write relative to project root; change(doc) edits doc in place
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    return datastore.update(os.path.join(base_dir, filename), default, change)
 
 def getSubjectsForSection(section):
     """Get the subjects assigned to a specific section from sectionsubjects.json"""
@@ -62,19 +66,31 @@ def createSection():
     if s in lst:
         print("Section already exists.")
         return
-    lst.append(s)
-    saveJson(sectionListFile, sorted(lst))
+
+    def add_section(doc):
+        names = {str(x).strip().upper() for x in doc if str(x).strip()}
+        if s in names:
+            return False
+        doc[:] = sorted(names | {s})
+        return True
+
+    if not updateJson(sectionListFile, [], add_section):
+        print("Section already exists.")
+        return
     
     # Initialize section subjects mapping for the new section if it matches patterns
-    section_subjects = loadJson(sectionSubjectsFile, {})
     if s in ["AI", "BI", "CI", "DI"]:
-        section_subjects[s] = ["Basic Maths", "English-I", "C Lang", "Electronics", "Computer Networking"]
+        subjects = ["Basic Maths", "English-I", "C Lang", "Electronics", "Computer Networking"]
     elif s in ["AIII", "BIII", "CIII", "DIII"]:
-        section_subjects[s] = ["DSA", "English-III", "Maths-III", "Artificial Intelligence", "Operating System"]
+        subjects = ["DSA", "English-III", "Maths-III", "Artificial Intelligence", "Operating System"]
     elif s in ["AV", "BV", "CV", "DV"]:
-        section_subjects[s] = ["English-V", "Machine Learning", "Algorithm", "OOP", "Database"]
-    
-    saveJson(sectionSubjectsFile, section_subjects)
+        subjects = ["English-V", "Machine Learning", "Algorithm", "OOP", "Database"]
+    else:
+        subjects = None
+    if subjects is not None:
+        def set_subjects(doc):
+            doc[s] = subjects
+        updateJson(sectionSubjectsFile, {}, set_subjects)
     print(f"Section {s} created.")
 
 def listSections(returnList=False):
@@ -88,34 +104,29 @@ def listSections(returnList=False):
         print(f" {i}. {s}")
     return lst if returnList else None
 
-
-import json, os
-from datetime import date
+def getRoster():
+    # Same project-root files as loadJson/saveJson (and attendance.get_roster)
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    return roster.get_roster(os.path.join(base_dir, sectionsFile), os.path.join(base_dir, teacherSectionsFile))
 
 def assignSectionFromList():
     try:
         base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 
         def load_json(fname, default):
-            path = os.path.join(base_dir, fname)
-            if os.path.exists(path):
-                with open(path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            return default
+            return datastore.load(os.path.join(base_dir, fname), default)
 
-        def save_json(fname, data):
-            path = os.path.join(base_dir, fname)
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(data, f, indent=2)
+        def update_json(fname, default, change):
+            return datastore.update(os.path.join(base_dir, fname), default, change)
 
         # Load required JSON files
-        rollnumbers = load_json("rollnumbers.json", {})
+        registry = rollnumbers.get_registry(os.path.join(base_dir, "rollnumbers.json"))
         sections = load_json("sections.json", {})
+        section_roster = roster.get_roster(os.path.join(base_dir, "sections.json"), os.path.join(base_dir, "teachersections.json"))
         sectionsubjects = load_json("sectionsubjects.json", {})
-        studentsubjects = load_json("studentsubjects.json", {})
-        attendance_master = load_json("attendance_master.json", {"attendance_records": {}, "metadata": {}})
+        attendance_backend = attendance_store.get_store(os.path.join(base_dir, "attendance_master.json"))
 
-        student_map = rollnumbers.get("map", {}).get("student", {})
+        student_map = registry.entries("student")
         if not student_map:
             print("No students found in rollnumbers.json")
             return
@@ -126,11 +137,12 @@ def assignSectionFromList():
             print(f"{rv} - {nm} (Section: {current_section})")
 
         roll = input("\nEnter student roll number to assign section: ").strip()
-        if roll not in student_map.values():
+        owner = registry.owner(roll)
+        if owner is None or owner[0] != "student":
             print("Invalid roll number.")
             return
 
-        student_name = next((n for n, r in student_map.items() if r == roll), roll)
+        student_name = owner[1]
         section_choice = input(f"Enter section name to assign for {student_name} ({roll}): ").strip()
 
         if not section_choice:
@@ -138,8 +150,7 @@ def assignSectionFromList():
             return
 
         # --- Update sections.json ---
-        sections[roll] = section_choice
-        save_json("sections.json", sections)
+        section_roster.assign_student(roll, section_choice)
         print(f"Assigned section '{section_choice}' to student with roll number {roll} successfully!")
 
         # --- Get subjects for this section ---
@@ -149,46 +160,33 @@ def assignSectionFromList():
             return
 
         # --- Update studentsubjects.json ---
-        studentsubjects[roll] = {
-            "section": section_choice,
-            "subjects": subjects
-        }
-        save_json("studentsubjects.json", studentsubjects)
-        print(f"Updated studentsubjects.json for {roll}")
-
-        # --- Update attendance_master.json ---
-        attendance_records = attendance_master.get("attendance_records", {})
-        if roll not in attendance_records:
-            subjects_dict = {
-                sub: {
-                    "subject_name": sub,
-                    "total_working_days": 0,
-                    "total_present_days": 0,
-                    "attendance_percentage": 0.0,
-                    "last_updated": str(date.today())
-                }
-                for sub in subjects
-            }
-            attendance_records[roll] = {
-                "name": student_name,
+        def set_student_subjects(doc):
+            doc[roll] = {
                 "section": section_choice,
-                "subjects": subjects_dict
+                "subjects": subjects
             }
+        update_json("studentsubjects.json", {}, set_student_subjects)
+        print(f"Updated studentsubjects.json for {roll}")
+
+        # --- Update attendance_master.json (subjects keyed by code) ---
+        catalogue = subject_catalogue.get_catalogue(os.path.join(base_dir, "subjects.json"))
+        subjects_dict = {catalogue.resolve(sub) or sub: sub for sub in subjects}
+        if attendance_backend.ensure_student(roll, student_name, section_choice, subjects_dict):
             print(f"Attendance record created for roll {roll}")
         else:
-            attendance_records[roll]["section"] = section_choice
             print(f"Updated existing attendance record for roll {roll}")
 
-        attendance_master["attendance_records"] = attendance_records
-        attendance_master.setdefault("metadata", {})
-        attendance_master["metadata"]["last_updated"] = str(date.today())
-        attendance_master["metadata"]["total_students"] = len(attendance_records)
-        save_json("attendance_master.json", attendance_master)
-
     except Exception as e:
         print("Error while assigning section:", e)
 
 
+def bulkAssignSections():
+    # Place many students at once from a CSV/JSONL file or roll-range rules
+    import placement
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    placement.bulk_assign_interactive(base_dir)
+
+
 def assignSectionToTeacher():
     lst = listSections(returnList=True)
     if not lst:
@@ -211,10 +209,8 @@ def assignSectionToTeacher():
     if not chosen:
         print("No valid sections selected.")
         return
-    tmap = loadJson(teacherSectionsFile, {})
-    tmap[teacher] = sorted(set(chosen))
-    saveJson(teacherSectionsFile, tmap)
-    print(f"Assigned sections {', '.join(tmap[teacher])} to {teacher}.")
+    stored = getRoster().assign_teacher(teacher, chosen)
+    print(f"Assigned sections {', '.join(stored)} to {teacher}.")
 
 def viewMySections(teachername):
     tmap = loadJson(teacherSectionsFile, {})
@@ -227,17 +223,13 @@ def viewMySections(teachername):
         print(f" {s}")
 
 def viewSectionAssignments():
-    mapping = loadJson(sectionsFile, {})
-    if not mapping:
+    bysec = getRoster().by_section()
+    if not bysec:
         print("No students assigned yet.")
         return
-    bysec = {}
-    for roll, sec in mapping.items():
-        sec = str(sec).strip().upper()
-        bysec.setdefault(sec, []).append(roll)
     print("\nCurrent section assignments:")
     for sec in sorted(bysec.keys()):
-        print(f" Section {sec}: {', '.join(sorted(bysec[sec]))}")
+        print(f" Section {sec}: {', '.join(bysec[sec])}")
 
 def getSectionForRoll(roll):
     mapping = loadJson(sectionsFile, {})
@@ -275,21 +267,21 @@ def initialize_all_attendance_records():
     try:
         import attendance
         
-        # Load all necessary data
+        # Load all necessary data once; the store is written at most once
         sections_data = loadJson(sectionsFile, {})
         
         if not sections_data:
             print("No students have been assigned to sections yet.")
             return
         
-        count = 0
-        for roll, section in sections_data.items():
-            subjects = getSubjectsForSection(section)  # Get from sectionsubjects.json
-            if subjects:
-                attendance.initialize_student_attendance(roll, section, subjects)
-                count += 1
+        result = attendance.initialize_all_attendance(sections_data, loadJson(sectionSubjectsFile, {}))
         
-        print(f"Attendance records initialized for {count} students.")
+        print(f"Attendance records initialized for {len(result['created'])} new students.")
+        print(f"Updated {len(result['updated'])} existing records ({result['subjects_added']} subjects added).")
+        if result["skipped"]:
+            print(f"Skipped {len(result['skipped'])} students whose section has no subjects in sectionsubjects.json.")
+        phases = ", ".join(f"{k} {v:.3f}s" for k, v in result["timings"].items())
+        print(f"Time: {phases}")
         
     except Exception as e:
         print(f"Error initializing attendance records: {e}")
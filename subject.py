@@ -1,36 +1,43 @@
 import os
-import json
+
+import datastore
+import rollnumbers
+import subject_catalogue
+import provision_queue
 
 subjectsFile = "subjects.json"
 rollnumbersFile = "rollnumbers.json"
 
 def loadJson(filename, default):
-    if not os.path.exists(filename):
-        return default
     try:
-        with open(filename, "r") as f:
-            return json.load(f)
+        return datastore.load(filename, default)
     except:
         return default
 
 def saveJson(filename, data):
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=2)
+    datastore.save(filename, data)
+
+def updateJson(filename, default, change):
+    return datastore.update(filename, default, change)
 
 def addSubject():
-    data = loadJson(subjectsFile, {"subjects": []})
-    subjects = data.get("subjects", []) if isinstance(data, dict) else (data if isinstance(data, list) else [])
-    
     name = input("Enter subject name: ").strip()
     code = input("Enter subject code [eg- TMA101]: ").strip().upper()
     
-    if any(s.get("code") == code for s in subjects):
+    if subject_catalogue.get_catalogue(subjectsFile).has_code(code):
         print("Subject code already exists.")
         return
     
-    subjects.append({"name": name, "code": code})
-    toSave = {"subjects": subjects}
-    saveJson(subjectsFile, toSave)
+    def add(doc):
+        subjects = doc.setdefault("subjects", []) if isinstance(doc, dict) else doc
+        if any(str(s.get("code", "")).upper() == code for s in subjects if isinstance(s, dict)):
+            return False
+        subjects.append({"name": name, "code": code})
+        return True
+
+    if not updateJson(subjectsFile, {"subjects": []}, add):
+        print("Subject code already exists.")
+        return
     print("Subject added.")
 
 def listSubjects():
@@ -46,39 +53,30 @@ def listSubjects():
         print(f" {i}. {s.get('name','')} ({s.get('code','')})")
     return subjects
 
+def rollNumberRegistry():
+    return rollnumbers.get_registry(rollnumbersFile)
+
+def lookupRollNumber(name, role="student"):
+    # Read-only: returns None instead of allocating a new number
+    return rollNumberRegistry().lookup(name, role)
+
 def getRollNumber(name, role="student"):
-    db = loadJson(rollnumbersFile, {})
-    
-    # Initialize proper structure if not present
-    if not isinstance(db, dict) or "map" not in db or "counters" not in db:
-        db = {
-            "map": {
-                "student": {},
-                "teacher": {}, 
-                "admin": {}
-            },
-            "counters": {
-                "student": 0,
-                "teacher": 0,
-                "admin": 0
-            }
-        }
-    
-    # Check if user already exists
-    if name in db["map"].get(role, {}):
-        return db["map"][role][name]
-    
-    # Generate new roll number
-    db["counters"][role] = db["counters"].get(role, 0) + 1
-    n = db["counters"][role]
-    
-    if role == "teacher":
-        roll = f"T{str(n).zfill(4)}"
-    elif role == "admin":
-        roll = f"A{str(n).zfill(4)}"
-    else:
-        roll = f"2025{str(n).zfill(4)}"
-    
-    db["map"][role][name] = roll
-    saveJson(rollnumbersFile, db)
-    return roll
\ No newline at end of file
+    # Allocates (and saves) a number for an unknown name; only for write paths
+    return rollNumberRegistry().get_or_allocate(name, role)
+
+def provisioningQueue():
+    return provision_queue.get_queue(provision_queue.queue_path_for(os.path.dirname(os.path.abspath(rollnumbersFile))))
+
+def lookupOrQueueRollNumber(name, role="student"):
+    # For views: an unknown name is queued for allocation and None returned
+    roll = lookupRollNumber(name, role)
+    if roll is None and name:
+        provisioningQueue().request_roll(name, role)
+    return roll
+
+def allocateRollNumbers(names, role="student"):
+    """Assign roll numbers to many users of one role with a single save.
+
+    Returns {name: roll}; names that already have a roll keep it.
+    """
+    return rollNumberRegistry().allocate(names, role)
\ No newline at end of file
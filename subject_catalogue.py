@@ -0,0 +1,189 @@
+import os
+import re
+import sys
+import threading
+
+import datastore
+
+# -----------------------------------------------------------
+# Subject catalogue
+# -----------------------------------------------------------
+#
+# One index over subjects.json:
+#
+#   code -> name, name -> code, and normalized alias -> code
+#
+# Aliases are the normalized code and name of every subject, plus anything
+# listed under an optional "aliases" key on a subject entry. Normalizing
+# lowercases and drops everything but letters and digits, so "English-I",
+# "english i" and "ENGLISH_I" all resolve to TEA101.
+#
+# The index is rebuilt only when datastore hands back a new subjects.json
+# document, so lookups are dict hits between edits.
+#
+# Attendance records are keyed by subject code (subject_keys.py migrates
+# records that older writers keyed by name), so record_key() is one resolve()
+# and one dict lookup. The old scan over a record's entries only runs until
+# the migration's checkpoint (attendance_master.rekey.json next to
+# subjects.json) says it completed. EDUTRACK_SUBJECT_KEY_COMPAT=1 keeps the
+# scan on regardless, "0" turns it off; stats counts how often it runs and
+# how often it finds a name-keyed entry.
+
+_NON_ALNUM = re.compile(r"[^0-9a-z]+")
+_COMPAT_ENV = os.environ.get("EDUTRACK_SUBJECT_KEY_COMPAT", "").strip().lower()
+# None: decided per catalogue from the migration checkpoint
+COMPAT = None if _COMPAT_ENV in ("", "auto") else _COMPAT_ENV not in ("0", "false", "no", "off")
+REKEY_CHECKPOINT = "attendance_master.rekey.json"
+stats = {"fallback_scans": 0, "fallback_hits": 0}
+
+
+def normalize(text):
+    return _NON_ALNUM.sub("", str(text or "").lower())
+
+
+def _subject_list(doc):
+    if isinstance(doc, dict):
+        doc = doc.get("subjects", [])
+    return [s for s in doc if isinstance(s, dict)] if isinstance(doc, list) else []
+
+
+class SubjectCatalogue:
+    """Constant-time code/name/alias lookups over subjects.json."""
+
+    def __init__(self, path):
+        self.path = os.path.abspath(path)
+        self.checkpoint_path = os.path.join(os.path.dirname(self.path), REKEY_CHECKPOINT)
+        self._lock = threading.Lock()
+        self._source = None
+        self._built = False
+        self._subjects = []
+        self._by_code = {}    # code -> name
+        self._by_name = {}    # name -> code
+        self._by_alias = {}   # normalized alias -> code
+
+    def _refresh(self):
+        try:
+            doc = datastore.load(self.path, None)
+        except (OSError, ValueError):
+            doc = None
+        with self._lock:
+            if self._built and doc is self._source:
+                return
+            subjects = _subject_list(doc)
+            by_code, by_name, by_alias = {}, {}, {}
+            for s in subjects:
+                code = str(s.get("code") or "").strip().upper()
+                name = str(s.get("name") or "").strip()
+                if not code:
+                    continue
+                by_code.setdefault(code, name or code)
+                if name:
+                    by_name.setdefault(name, code)
+                for alias in [code, name] + list(s.get("aliases") or []):
+                    key = normalize(alias)
+                    if key:
+                        by_alias.setdefault(key, code)
+            self._source, self._built = doc, True
+            self._subjects, self._by_code, self._by_name, self._by_alias = subjects, by_code, by_name, by_alias
+
+    # -- lookups -----------------------------------------------------
+
+    def subjects(self):
+        """Return the subject entries (shared, do not modify)."""
+        self._refresh()
+        return self._subjects
+
+    def name_for(self, code):
+        """Return the subject name for a code, or None."""
+        self._refresh()
+        return self._by_code.get(str(code or "").strip().upper())
+
+    def code_for(self, name):
+        """Return the code for an exact subject name, or None."""
+        self._refresh()
+        return self._by_name.get(str(name or "").strip())
+
+    def resolve(self, text):
+        """Return the code for a code, name or alias in any spelling, or None."""
+        self._refresh()
+        text = str(text or "").strip()
+        if text in self._by_code:
+            return text
+        return self._by_name.get(text) or self._by_alias.get(normalize(text))
+
+    def has_code(self, code):
+        self._refresh()
+        return str(code or "").strip().upper() in self._by_code
+
+    def record_key(self, subjects_dict, text):
+        """Find the key under which a student's attendance record holds a subject.
+
+        Records are keyed by code; a subject missing from the catalogue is
+        keyed as given. Returns None if the record has no such subject, after
+        trying the legacy name-keyed lookups while compat() is on.
+        """
+        code = self.resolve(text)
+        key = code if code is not None else text
+        if key in subjects_dict:
+            return key
+        if not self.compat():
+            return None
+        stats["fallback_scans"] += 1
+        key = self._scan(subjects_dict, text, code)
+        if key is not None:
+            stats["fallback_hits"] += 1
+        return key
+
+    def compat(self):
+        """True while record_key() still looks for name-keyed entries."""
+        if COMPAT is not None:
+            return COMPAT
+        try:
+            doc = datastore.load(self.checkpoint_path, None)
+        except (OSError, ValueError):
+            doc = None
+        return not (isinstance(doc, dict) and doc.get("complete"))
+
+    def _scan(self, subjects_dict, text, code):
+        # records written before the code-key migration may be keyed by name
+        if text in subjects_dict:
+            return text
+        if code is None:
+            # not in the catalogue: fall back to the stored subject_name
+            wanted = normalize(text)
+            for key, entry in subjects_dict.items():
+                if isinstance(entry, dict) and normalize(entry.get("subject_name")) == wanted:
+                    return key
+            return None
+        if code in subjects_dict:
+            return code
+        name = self._by_code.get(code)
+        if name in subjects_dict:
+            return name
+        for key, entry in subjects_dict.items():
+            label = entry.get("subject_name") if isinstance(entry, dict) else None
+            if self.resolve(key) == code or (label and self.resolve(label) == code):
+                return key
+        return None
+
+
+def report(out=None):
+    """Print how often record_key() fell back to scanning a record."""
+    out = out or sys.stdout
+    state = "until the key migration completes" if COMPAT is None else ("on" if COMPAT else "off")
+    print(f"Subject key fallback ({state}): {stats['fallback_scans']} scan(s), "
+          f"{stats['fallback_hits']} name-keyed hit(s)", file=out)
+
+
+_catalogues = {}
+_catalogues_lock = threading.Lock()
+
+
+def get_catalogue(path):
+    """Return the shared catalogue for the subjects.json file at path."""
+    key = os.path.abspath(path)
+    with _catalogues_lock:
+        cat = _catalogues.get(key)
+        if cat is None:
+            cat = _catalogues[key] = SubjectCatalogue(key)
+        return cat
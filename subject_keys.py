@@ -0,0 +1,125 @@
+import os
+import time
+
+import datastore
+import attendance_store
+import subject_catalogue
+
+# -----------------------------------------------------------
+# Subject key migration (names -> codes)
+# -----------------------------------------------------------
+#
+# Older writers keyed attendance subject entries by subject name ("C Lang")
+# where everything else uses the code ("TCA101"). migrate() rewrites every
+# such key to the code the catalogue resolves it to, via the store's
+# rekey_subjects(), in batches of rolls taken in sorted order. An entry whose
+# code key already exists is merged into it (counters summed).
+#
+# Progress is checkpointed after each batch in <master>.rekey.json:
+#
+#   {"last": roll, "rolls": n, "rekeyed": n, "merged": n, "complete": bool}
+#
+# so an interrupted run resumes after the last committed roll. Rekeying is
+# idempotent, so re-running a batch is harmless. Entries whose key and
+# subject_name both fail to resolve are left alone and counted as unknown.
+#
+# Once the checkpoint says complete, subject_catalogue.record_key() stops
+# falling back to the name-key scan (unless EDUTRACK_SUBJECT_KEY_COMPAT=1).
+
+BATCH = 5000
+
+
+def checkpoint_path_for(json_path):
+    return os.path.splitext(os.path.abspath(json_path))[0] + ".rekey.json"
+
+
+def _new_checkpoint():
+    return {"last": None, "rolls": 0, "rekeyed": 0, "merged": 0, "unknown": 0, "complete": False}
+
+
+def load_checkpoint(path):
+    try:
+        doc = datastore.load(path, None)
+    except (OSError, ValueError):
+        doc = None
+    return dict(doc) if isinstance(doc, dict) else _new_checkpoint()
+
+
+def plan(records, rolls, catalogue):
+    """Return ({roll: {old key: code}}, unknown entry count) for rolls."""
+    resolved = {}
+
+    def resolve(text):
+        if text not in resolved:
+            resolved[text] = catalogue.resolve(text)
+        return resolved[text]
+
+    changes, unknown = {}, 0
+    for roll in rolls:
+        subjects = (records.get(roll) or {}).get("subjects")
+        if not isinstance(subjects, dict):
+            continue
+        for key, det in subjects.items():
+            if resolve(key) == key:
+                continue
+            code = resolve(key) or (resolve(det.get("subject_name")) if isinstance(det, dict) else None)
+            if code is None:
+                unknown += 1
+            elif code != key:
+                changes.setdefault(roll, {})[key] = code
+    return changes, unknown
+
+
+def migrate(store, catalogue, checkpoint_path, batch=BATCH, dry_run=False, restart=False, progress=None):
+    """Rekey name-keyed subject entries to codes. Returns the checkpoint dict.
+
+    progress, if given, is called with the checkpoint after each batch.
+    """
+    state = _new_checkpoint() if restart else load_checkpoint(checkpoint_path)
+    if state.get("complete") and not dry_run:
+        return state
+    t0 = time.perf_counter()
+    records = store.load().get("attendance_records", {})
+    rolls = sorted(records)
+    if state.get("last") is not None:
+        rolls = [r for r in rolls if r > state["last"]]
+    batch = max(1, int(batch or len(rolls) or 1))
+    for start in range(0, len(rolls), batch):
+        chunk = rolls[start:start + batch]
+        changes, unknown = plan(records, chunk, catalogue)
+        if changes and not dry_run:
+            state["merged"] += store.rekey_subjects(changes)
+        state["rekeyed"] += sum(len(m) for m in changes.values())
+        state["unknown"] += unknown
+        state["rolls"] += len(chunk)
+        state["last"] = chunk[-1]
+        if not dry_run:
+            datastore.save(checkpoint_path, state)
+        if progress:
+            progress(state)
+    state["complete"] = True
+    state["elapsed"] = time.perf_counter() - t0
+    if not dry_run:
+        datastore.save(checkpoint_path, state)
+    return state
+
+
+if __name__ == "__main__":
+    import argparse
+    parser = argparse.ArgumentParser(description="Rekey attendance subject entries from names to codes.")
+    parser.add_argument("--data-dir", default=".", help="directory holding the JSON files")
+    parser.add_argument("--batch", type=int, default=BATCH, help="rolls per commit (default %(default)s)")
+    parser.add_argument("--dry-run", action="store_true", help="count what would change, write nothing")
+    parser.add_argument("--restart", action="store_true", help="ignore the checkpoint and scan every roll")
+    args = parser.parse_args()
+    base = os.path.abspath(args.data_dir)
+    master = os.path.join(base, "attendance_master.json")
+    result = migrate(attendance_store.get_store(master),
+                     subject_catalogue.get_catalogue(os.path.join(base, "subjects.json")),
+                     checkpoint_path_for(master), args.batch, args.dry_run, args.restart,
+                     progress=lambda s: print(f"  {s['rolls']} rolls, {s['rekeyed']} rekeyed (last {s['last']})"))
+    verb = "Would rekey" if args.dry_run else "Rekeyed"
+    print(f"{verb} {result['rekeyed']} subject entries across {result['rolls']} rolls "
+          f"({result['merged']} merged, {result['unknown']} unknown) in {result.get('elapsed', 0.0):.2f}s")
+    if result.get("complete") and not args.dry_run:
+        print("Migration complete; the name-key fallback is now off (EDUTRACK_SUBJECT_KEY_COMPAT=1 keeps it on).")
@@ -0,0 +1,74 @@
+import attendance_store
+import alerts
+
+
+def _setup(tmp_path):
+    store = attendance_store.JsonAttendanceStore(str(tmp_path / "attendance_master.json"))
+    store.ensure_students([("1", "a", "AI", {"TMA101": "Basic Maths"}), ("2", "b", "DS", {"TMA101": "Basic Maths"})])
+    box = alerts.AlertOutbox(alerts.outbox_path_for(store.path), store, thresholds=(75.0, 65.0))
+    return store, box
+
+
+def _mark(store, roll, present):
+    store.apply([attendance_store.make_event(roll, "TMA101", present=present, section="AI" if roll == "1" else "DS")])
+
+
+def test_crossings_are_written_once_until_recovery(tmp_path):
+    store, box = _setup(tmp_path)
+    try:
+        _mark(store, "1", True)     # 100%
+        _mark(store, "1", False)    # 50%: below 75 and 65
+        _mark(store, "1", False)    # 33%: still below, nothing new
+        for _ in range(6):
+            _mark(store, "1", True)  # 7/9 = 77.8%: recovered from both
+        kinds = [(a["kind"], a["threshold"]) for a in box.read()[0]]
+        assert kinds == [("below", 75.0), ("below", 65.0), ("recovered", 65.0), ("recovered", 75.0)]
+        assert [a["id"] for a in box.read()[0]] == [1, 2, 3, 4]
+    finally:
+        box.close()
+
+
+def test_cursor_reads_only_what_was_appended(tmp_path):
+    store, box = _setup(tmp_path)
+    try:
+        _mark(store, "1", False)
+        first, cursor = box.read()
+        assert len(first) == 2
+        assert box.read(cursor) == ([], cursor)
+        _mark(store, "2", False)
+        later, _ = box.read(cursor)
+        assert [a["roll"] for a in later] == ["2", "2"]
+    finally:
+        box.close()
+
+
+def test_unread_moves_the_users_cursor(tmp_path):
+    store, box = _setup(tmp_path)
+    try:
+        _mark(store, "1", False)
+        _mark(store, "2", False)
+        assert [a["roll"] for a in box.unread("t", sections=["ds"])] == ["2", "2"]
+        assert box.cursor("t") > 0
+        assert box.unread("t") == []                       # filtered-out lines were passed too
+        assert len(box.unread("admin", advance=False)) == 4
+        assert box.cursor("admin") == 0
+        # another outbox on the same file (another process) sees the cursors
+        other = alerts.AlertOutbox(box.path)
+        assert other.cursor("t") == box.cursor("t")
+    finally:
+        box.close()
+
+
+def test_a_new_writer_does_not_repeat_open_alerts(tmp_path):
+    store, box = _setup(tmp_path)
+    _mark(store, "1", False)
+    box.close()
+    box = alerts.AlertOutbox(box.path, store, thresholds=(75.0, 65.0))
+    try:
+        event = attendance_store.make_event("1", "TMA101", present=0, section="AI")
+        det = store.get_record("1")["subjects"]["TMA101"]
+        assert box.emit([(event, det, 80.0, 0.0, 75.0, alerts.BELOW)]) == []   # still open in the file
+        assert len(box.emit([(event, det, 0.0, 80.0, 75.0, alerts.RECOVERED)])) == 1
+        assert len(box.read()[0]) == 3
+    finally:
+        box.close()
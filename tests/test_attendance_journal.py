@@ -0,0 +1,80 @@
+import os
+import sys
+import time
+import subprocess
+
+import attendance_store
+from attendance_journal import JournalAttendanceStore
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MARK = """
+import sys
+import attendance_store
+from attendance_journal import JournalAttendanceStore
+JournalAttendanceStore(sys.argv[1]).apply([attendance_store.make_event("20250001", "TMA101")])
+"""
+
+
+def _mark_in_other_process(path):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    return subprocess.Popen([sys.executable, "-c", MARK, path], env=env)
+
+
+def _present(store, roll="20250001", subject="TMA101"):
+    return attendance_store.counts_of(store.load(), roll, subject)[1]
+
+
+def test_mark_during_ensure_students_is_kept(tmp_path, monkeypatch):
+    path = str(tmp_path / "attendance_master.json")
+    store = JournalAttendanceStore(path)
+    store.ensure_students([("20250001", "a", "AI", {"TMA101": "Basic Maths"})])
+    store.apply([attendance_store.make_event("20250001", "TMA101")])
+
+    real = attendance_store.ensure_records
+    other = []
+
+    def slow_ensure(*args, **kwargs):
+        # another process marks while this one holds the loaded document
+        other.append(_mark_in_other_process(path))
+        time.sleep(0.5)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(attendance_store, "ensure_records", slow_ensure)
+    store.ensure_students([("20250002", "b", "AI", {"TMA101": "Basic Maths"})])
+    monkeypatch.setattr(attendance_store, "ensure_records", real)
+    assert other[0].wait(30) == 0
+
+    assert _present(JournalAttendanceStore(path)) == 2
+
+
+def test_mark_during_rekey_is_kept(tmp_path, monkeypatch):
+    path = str(tmp_path / "attendance_master.json")
+    store = JournalAttendanceStore(path)
+    store.ensure_students([("20250001", "a", "AI", {"TMA101": "Basic Maths", "Basic Maths": "Basic Maths"})])
+    store.apply([attendance_store.make_event("20250001", "Basic Maths")])
+
+    real = attendance_store.rekey_records
+    other = []
+
+    def slow_rekey(*args, **kwargs):
+        other.append(_mark_in_other_process(path))
+        time.sleep(0.5)
+        return real(*args, **kwargs)
+
+    monkeypatch.setattr(attendance_store, "rekey_records", slow_rekey)
+    assert store.rekey_subjects({"20250001": {"Basic Maths": "TMA101"}}) == 1
+    monkeypatch.setattr(attendance_store, "rekey_records", real)
+    assert other[0].wait(30) == 0
+
+    assert _present(JournalAttendanceStore(path)) == 2
+
+
+def test_compaction_keeps_counts(tmp_path):
+    path = str(tmp_path / "attendance_master.json")
+    store = JournalAttendanceStore(path)
+    store.ensure_students([("20250001", "a", "AI", {"TMA101": "Basic Maths"})])
+    store.apply([attendance_store.make_event("20250001", "TMA101") for _ in range(3)])
+    assert store.compact() == 3
+    assert not os.path.exists(store.journal_path) or os.path.getsize(store.journal_path) == 0
+    assert _present(JournalAttendanceStore(path)) == 3
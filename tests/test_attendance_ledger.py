@@ -0,0 +1,137 @@
+import sqlite3
+
+import attendance
+import attendance_store
+from attendance_ledger import AttendanceLedger
+
+
+def _setup(tmp_path):
+    store = attendance_store.JsonAttendanceStore(str(tmp_path / "attendance_master.json"))
+    store.ensure_students([("1", "a", "AI", {"TMA101": "Basic Maths"}), ("2", "b", "AI", {"TMA101": "Basic Maths"})])
+    return store, AttendanceLedger(str(tmp_path / "attendance_master.ledger.db"))
+
+
+def _mark(store, ledger, roll, present, date, period=None):
+    return attendance.commit_marks([(roll, "TMA101", "TMA101", "Basic Maths", present)], "t", "AI",
+                                   date=date, store=store, ledger=ledger, period=period)
+
+
+def _counters(store, roll):
+    return attendance_store.counts_of(store.load(), roll, "TMA101")
+
+
+def test_every_mark_counts_as_a_class(tmp_path):
+    store, ledger = _setup(tmp_path)
+    assert _mark(store, ledger, "1", True, "2025-11-03")
+    assert _mark(store, ledger, "1", True, "2025-11-03")      # second class that day
+    assert _mark(store, ledger, "1", False, "2025-11-04")
+    assert _counters(store, "1") == ledger.counts("1", "TMA101") == (3, 2)
+    assert ledger.status("1", "TMA101", "2025-11-03", 2) == 1
+
+
+def test_a_given_period_corrects_that_class(tmp_path):
+    store, ledger = _setup(tmp_path)
+    _mark(store, ledger, "1", True, "2025-11-03")
+    _mark(store, ledger, "1", True, "2025-11-03")
+    assert not _mark(store, ledger, "1", True, "2025-11-03", period=2)   # unchanged
+    assert _mark(store, ledger, "1", False, "2025-11-03", period=2)      # flipped: present count only
+    assert _counters(store, "1") == ledger.counts("1", "TMA101") == (2, 1)
+
+
+def test_take_session_twice_records_two_periods(tmp_path):
+    store, ledger = _setup(tmp_path)
+
+    class Roster:
+        def teaches(self, teacher, section):
+            return True
+
+        def rolls_in(self, section):
+            return ["1", "2"]
+
+    class Catalogue:
+        def resolve(self, code):
+            return code
+
+        def name_for(self, code):
+            return "Basic Maths"
+
+        def record_key(self, subjects, code):
+            return code if code in subjects else None
+
+    for present in ({"1", "2"}, {"1"}):
+        attendance.take_session("t", "AI", "TMA101", present, "2025-11-03", store=store,
+                                section_roster=Roster(), catalogue=Catalogue(), ledger=ledger)
+    assert [row[:2] for row in ledger.daily("AI", "TMA101")] == [("2025-11-03", 1), ("2025-11-03", 2)]
+    assert _counters(store, "2") == ledger.counts("2", "TMA101") == (2, 1)
+
+
+def test_ledger_without_periods_is_migrated(tmp_path):
+    path = str(tmp_path / "old.ledger.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE sessions (roll TEXT NOT NULL, subject TEXT NOT NULL, section TEXT NOT NULL DEFAULT '',
+            day TEXT NOT NULL, status INTEGER NOT NULL, teacher TEXT NOT NULL DEFAULT '',
+            recorded TEXT NOT NULL DEFAULT '', PRIMARY KEY (roll, subject, day)) WITHOUT ROWID;
+        CREATE INDEX sessions_by_class ON sessions (section, subject, day);
+        INSERT INTO sessions VALUES ('1', 'TMA101', 'AI', '2025-11-03', 1, 't', '');
+    """)
+    conn.commit()
+    conn.close()
+
+    ledger = AttendanceLedger(path)
+    assert ledger.status("1", "TMA101", "2025-11-03", 1) == 1
+    ledger.record([("1", "TMA101", "AI", "2025-11-03", 0, "t")])
+    assert ledger.counts("1", "TMA101") == (2, 1)
+
+
+def test_corrections_keep_ledger_and_counters_in_step(tmp_path):
+    store, ledger = _setup(tmp_path)
+    _mark(store, ledger, "1", True, "2025-11-03")
+    _mark(store, ledger, "1", True, "2025-11-04")
+
+    det = attendance.correct_counts("1", "TMA101", "TMA101", "Basic Maths", 5, 3, "t", "AI",
+                                    store=store, ledger=ledger)
+    assert (det["total_working_days"], det["total_present_days"]) == (5, 3)
+    assert ledger.counts("1", "TMA101") == _counters(store, "1") == (5, 3)
+
+    # marking after a correction moves both by the same amount
+    _mark(store, ledger, "1", False, "2025-11-05")
+    assert ledger.counts("1", "TMA101") == _counters(store, "1") == (6, 3)
+
+    # dated queries only see sessions
+    assert ledger.counts("1", "TMA101", start="2025-11-01", end="2025-11-30") == (3, 2)
+    assert ledger.summary(section="AI", subject="TMA101") == {("1", "TMA101"): (6, 3)}
+
+
+def test_failed_projection_rolls_the_ledger_back(tmp_path):
+    store, ledger = _setup(tmp_path)
+
+    def broken(*args):
+        raise OSError("disk full")
+
+    store.apply = broken
+    for write in (lambda: _mark(store, ledger, "2", True, "2025-11-03"),
+                  lambda: attendance.correct_counts("2", "TMA101", "TMA101", "Basic Maths", 4, 4, "t", "AI",
+                                                    store=store, ledger=ledger)):
+        try:
+            write()
+        except OSError:
+            pass
+    assert ledger.counts("2", "TMA101") == (0, 0)
+
+
+def test_seed_folds_pre_ledger_counters_in_once(tmp_path):
+    store, ledger = _setup(tmp_path)
+    store.apply([attendance_store.make_event("1", "TMA101", "set", 10, 8),
+                 attendance_store.make_event("2", "Basic Maths", "set", 4, 1)])   # legacy name key
+    codes = {"Basic Maths": "TMA101"}
+
+    assert ledger.seed(store.load, lambda key: codes.get(key, key)) == 2
+    assert ledger.counts("1", "TMA101") == _counters(store, "1") == (10, 8)
+    assert ledger.counts("2", "TMA101") == (4, 1)
+    assert ledger.seed(store.load) is None
+    assert AttendanceLedger(ledger.db_path).seed(store.load) is None   # recorded in the file
+
+    _mark(store, ledger, "1", False, "2025-11-03")
+    assert ledger.counts("1", "TMA101") == _counters(store, "1") == (11, 8)
+    assert ledger.counts("1", "TMA101", start="2025-11-01") == (1, 0)
@@ -0,0 +1,97 @@
+import json
+
+import pytest
+
+import datastore
+import attendance_store
+from attendance_shards import ShardedAttendanceStore, export_json
+
+SUBJECTS = {"TMA101": "Basic Maths"}
+
+
+def _store(tmp_path):
+    store = ShardedAttendanceStore(str(tmp_path / "attendance_master.json"))
+    store.ensure_students([("20250001", "a", "AI", SUBJECTS), ("20250002", "b", "DS", SUBJECTS)])
+    store.apply([attendance_store.make_event("20250001", "TMA101")] * 3)
+    return store
+
+
+def _present(store, roll="20250001"):
+    return attendance_store.counts_of({"attendance_records": {roll: store.get_record(roll)}}, roll, "TMA101")[1]
+
+
+def test_split_and_export_round_trip(tmp_path):
+    master = tmp_path / "attendance_master.json"
+    doc = attendance_store.empty_document()
+    attendance_store.ensure_records(doc, [("20250001", "a", "AI", SUBJECTS), ("20250002", "b", "DS", SUBJECTS)])
+    attendance_store.apply_event(doc, attendance_store.make_event("20250002", "TMA101", present=0))
+    master.write_text(json.dumps(doc))
+
+    store = ShardedAttendanceStore(str(master))
+    assert store.sections() == ["AI", "DS"]
+    assert store.section_of("20250002") == "DS"
+    assert set(store.load_sections(["ds"])["attendance_records"]) == {"20250002"}
+
+    export = tmp_path / "export.json"
+    export_json(store.dir, str(export))
+    assert json.loads(export.read_text())["attendance_records"] == doc["attendance_records"]
+
+
+def test_moving_a_student_keeps_the_history(tmp_path):
+    store = _store(tmp_path)
+    store.ensure_students([("20250001", "a", "DS", SUBJECTS)])
+    assert store.section_of("20250001") == "DS"
+    assert _present(store) == 3
+    assert "20250001" not in store._shard("AI")["attendance_records"]
+    assert set(store.load()["attendance_records"]) == {"20250001", "20250002"}
+
+
+@pytest.mark.parametrize("fail_on", ["manifest", "old shard"])
+def test_crash_part_way_through_a_move_keeps_the_record(tmp_path, monkeypatch, fail_on):
+    store = _store(tmp_path)
+    target = store.manifest_path if fail_on == "manifest" else store.shard_path("AI")
+    real_save = datastore.save
+
+    def crashing_save(path, *args, **kwargs):
+        if path == target:
+            raise OSError("lock timeout")
+        return real_save(path, *args, **kwargs)
+
+    monkeypatch.setattr(datastore, "save", crashing_save)
+    with pytest.raises(OSError):
+        store.ensure_students([("20250001", "a", "DS", SUBJECTS)])
+    monkeypatch.setattr(datastore, "save", real_save)
+
+    assert store.section_of("20250001") == ("AI" if fail_on == "manifest" else "DS")
+    assert _present(store) == 3
+    assert store.load()["attendance_records"]["20250001"]["section"] == store.section_of("20250001")
+
+
+def test_mark_for_a_roll_moved_meanwhile_follows_it(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    other = ShardedAttendanceStore(store.json_path)
+    real_manifest = store._manifest
+    calls = []
+
+    def manifest_then_move(fresh=False):
+        doc = real_manifest(fresh)
+        if not calls:
+            # another writer moves the student after apply() routed the mark
+            calls.append(other.ensure_students([("20250001", "a", "DS", SUBJECTS)]))
+        return doc
+
+    monkeypatch.setattr(store, "_manifest", manifest_then_move)
+    store.apply([attendance_store.make_event("20250001", "TMA101")])
+    monkeypatch.setattr(store, "_manifest", real_manifest)
+
+    assert store.section_of("20250001") == "DS"
+    assert _present(store) == 4
+
+
+def test_revision_changes_with_any_shard(tmp_path):
+    store = _store(tmp_path)
+    before = store.revision()
+    assert store.revision() == before
+    store.apply([attendance_store.make_event("20250002", "TMA101")])
+    assert store.revision() != before
+    assert store.load() is store.load()
@@ -0,0 +1,75 @@
+import copy
+import sqlite3
+
+import attendance_store
+from attendance_store import SQLiteAttendanceStore
+
+
+def _document():
+    doc = attendance_store.empty_document()
+    attendance_store.ensure_records(doc, [("1", "a", "AI", {"TMA101": "Basic Maths"}),
+                                          ("2", "b", "DS", {"TMA101": "Maths I", "TCA101": "C Programming"})])
+    attendance_store.apply_event(doc, attendance_store.make_event("1", "TMA101", present=0, ts="2025-11-03T09:00:00"))
+    doc["metadata"] = {"academic_year": "2025-26", "total_students": 2}
+    return doc
+
+
+def test_json_round_trip_keeps_per_record_names(tmp_path):
+    doc = _document()
+    store = SQLiteAttendanceStore(str(tmp_path / "attendance_master.db"))
+    store.save(copy.deepcopy(doc))
+    assert store.load() == doc
+    assert store.get_record("2")["subjects"]["TMA101"]["subject_name"] == "Maths I"
+    assert store.get_record("1")["subjects"]["TMA101"]["subject_name"] == "Basic Maths"
+
+
+def test_save_rewrites_only_changed_rows(tmp_path):
+    doc = _document()
+    store = SQLiteAttendanceStore(str(tmp_path / "attendance_master.db"))
+    store.save(copy.deepcopy(doc))
+
+    conn = sqlite3.connect(store.db_path)
+    conn.executescript("""
+        CREATE TABLE writes (what TEXT);
+        CREATE TRIGGER counters_ins AFTER INSERT ON counters BEGIN INSERT INTO writes VALUES ('insert'); END;
+        CREATE TRIGGER counters_upd AFTER UPDATE ON counters BEGIN INSERT INTO writes VALUES ('update'); END;
+        CREATE TRIGGER counters_del AFTER DELETE ON counters BEGIN INSERT INTO writes VALUES ('delete'); END;
+    """)
+    conn.close()
+
+    attendance_store.apply_event(doc, attendance_store.make_event("2", "TCA101", ts="2025-11-04T09:00:00"))
+    del doc["attendance_records"]["1"]
+    store.save(copy.deepcopy(doc))
+    assert store.load() == doc
+
+    conn = sqlite3.connect(store.db_path)
+    writes = sorted(row[0] for row in conn.execute("SELECT what FROM writes"))
+    conn.close()
+    assert writes == ["delete", "update"]
+
+
+def test_apply_keeps_the_row_name(tmp_path):
+    store = SQLiteAttendanceStore(str(tmp_path / "attendance_master.db"))
+    store.save(_document())
+    det = store.apply([attendance_store.make_event("2", "TMA101", subject_name="Basic Maths")])[0]
+    assert det["subject_name"] == "Maths I"
+    assert (det["total_working_days"], det["total_present_days"]) == (1, 1)
+
+
+def test_store_without_row_names_is_migrated(tmp_path):
+    path = str(tmp_path / "attendance_master.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE students (roll TEXT PRIMARY KEY, name TEXT NOT NULL, section TEXT NOT NULL DEFAULT '');
+        CREATE TABLE subjects (code TEXT PRIMARY KEY, name TEXT NOT NULL);
+        CREATE TABLE counters (roll TEXT NOT NULL, subject TEXT NOT NULL, working INTEGER NOT NULL DEFAULT 0,
+            present INTEGER NOT NULL DEFAULT 0, percentage REAL NOT NULL DEFAULT 0.0,
+            last_updated TEXT NOT NULL DEFAULT '', PRIMARY KEY (roll, subject));
+        INSERT INTO students VALUES ('1', 'a', 'AI');
+        INSERT INTO subjects VALUES ('TMA101', 'Basic Maths');
+        INSERT INTO counters VALUES ('1', 'TMA101', 2, 1, 50.0, '2025-11-03');
+    """)
+    conn.close()
+    det = SQLiteAttendanceStore(path).get_record("1")["subjects"]["TMA101"]
+    assert det["subject_name"] == "Basic Maths"
+    assert det["total_working_days"] == 2
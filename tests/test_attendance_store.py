@@ -0,0 +1,60 @@
+import pytest
+
+import datastore
+import attendance_store
+from attendance_shards import ShardedAttendanceStore
+
+STUDENT = ("20250001", "a", "AI", {"TMA101": "Basic Maths"})
+
+
+def _stores(tmp_path):
+    path = str(tmp_path / "attendance_master.json")
+    return [attendance_store.JsonAttendanceStore(path), ShardedAttendanceStore(path)]
+
+
+def _present(store):
+    return attendance_store.counts_of(store.load(), "20250001", "TMA101")[1]
+
+
+@pytest.mark.parametrize("index", [0, 1], ids=["json", "sharded"])
+def test_failed_save_leaves_the_cache_untouched(tmp_path, monkeypatch, index):
+    store = _stores(tmp_path)[index]
+    store.ensure_students([STUDENT])
+    store.apply([attendance_store.make_event("20250001", "TMA101")])
+    assert _present(store) == 1
+
+    def broken_save(*args, **kwargs):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(datastore, "save", broken_save)
+    for write in (lambda: store.apply([attendance_store.make_event("20250001", "TMA101")]),
+                  lambda: store.ensure_students([("20250002", "b", "AI", {"TMA101": "Basic Maths"})]),
+                  lambda: store.rekey_subjects({"20250001": {"TMA101": "TMA102"}})):
+        with pytest.raises(OSError):
+            write()
+    monkeypatch.undo()
+
+    doc = store.load()
+    assert _present(store) == 1
+    assert set(doc["attendance_records"]) == {"20250001"}
+    assert list(doc["attendance_records"]["20250001"]["subjects"]) == ["TMA101"]
+
+
+def test_json_apply_counts(tmp_path):
+    store = attendance_store.JsonAttendanceStore(str(tmp_path / "attendance_master.json"))
+    store.ensure_students([STUDENT])
+    store.apply([attendance_store.make_event("20250001", "TMA101", present=p) for p in (1, 0, 1)])
+    det = store.get_record("20250001")["subjects"]["TMA101"]
+    assert (det["total_working_days"], det["total_present_days"]) == (3, 2)
+    assert det["attendance_percentage"] == 66.67
+
+
+def test_rekey_merges_counters():
+    doc = attendance_store.empty_document()
+    attendance_store.ensure_records(doc, [("1", "a", "AI", {"TMA101": "Basic Maths", "Basic Maths": "Basic Maths"})])
+    attendance_store.apply_event(doc, attendance_store.make_event("1", "TMA101"))
+    attendance_store.apply_event(doc, attendance_store.make_event("1", "Basic Maths", present=0))
+    assert attendance_store.rekey_records(doc, {"1": {"Basic Maths": "TMA101"}}) == 1
+    det = doc["attendance_records"]["1"]["subjects"]
+    assert list(det) == ["TMA101"]
+    assert (det["TMA101"]["total_working_days"], det["TMA101"]["total_present_days"]) == (2, 1)
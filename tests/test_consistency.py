@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+import datastore
+import attendance_store
+import consistency
+
+
+def _write(path, doc):
+    path.write_text(json.dumps(doc), encoding="utf-8")
+
+
+def _data_dir(tmp_path):
+    _write(tmp_path / "subjects.json", {"subjects": [{"name": "Basic Maths", "code": "TMA101"},
+                                                      {"name": "C Programming", "code": "TCA101"}]})
+    _write(tmp_path / "rollnumbers.json", {"map": {"student": {"a": "1", "b": "2", "c": "3"}},
+                                           "counters": {"student": 3}})
+    _write(tmp_path / "sectionlist.json", ["AI"])
+    _write(tmp_path / "sections.json", {"1": "AI", "2": "DS", "3": "AI"})
+    _write(tmp_path / "teachersections.json", {})
+    _write(tmp_path / "sectionsubjects.json", {"AI": ["Basic Maths"], "DS": ["C Programming"]})
+    _write(tmp_path / "studentsubjects.json", {"1": {"section": "DS", "subjects": ["Basic Maths"]},
+                                               "2": {"section": "DS", "subjects": ["C Programming"]}})
+    doc = attendance_store.empty_document()
+    attendance_store.ensure_records(doc, [("1", "a", "AI", {"Basic Maths": "Basic Maths"}),
+                                          ("2", "b", "AI", {"TCA101": "C Programming"})])
+    doc["attendance_records"]["1"]["subjects"]["Basic Maths"].update(
+        total_working_days=3, total_present_days=2, attendance_percentage=10.0)
+    _write(tmp_path / "attendance_master.json", doc)
+    return tmp_path, attendance_store.JsonAttendanceStore(str(tmp_path / "attendance_master.json"))
+
+
+def test_check_finds_each_kind_of_issue(tmp_path):
+    base, store = _data_dir(tmp_path)
+    report = consistency.check(str(base), store=store)
+    assert report.counts() == {
+        "unlisted-section": 1,          # DS
+        "section-drift": 2,             # studentsubjects[1], attendance[2]
+        "missing-student-subjects": 1,  # 3
+        "missing-attendance": 1,        # 3
+        "name-keyed": 1,                # attendance[1]["Basic Maths"]
+        "stale-percentage": 1,          # attendance[1]
+    }
+    assert all(issue.fixable for issue in report.issues)
+
+
+def test_repair_leaves_nothing_to_fix(tmp_path):
+    base, store = _data_dir(tmp_path)
+    done = consistency.repair(consistency.check(str(base), store=store))
+    assert set(done) == {"sectionlist.json", "studentsubjects.json", "attendance_master.json"}
+
+    again = consistency.check(str(base), store=store)
+    assert again.issues == []
+    det = store.get_record("1")["subjects"]["TMA101"]
+    assert (det["total_working_days"], det["attendance_percentage"]) == (3, 66.67)
+
+
+def test_repair_refuses_if_a_file_changed(tmp_path):
+    base, store = _data_dir(tmp_path)
+    report = consistency.check(str(base), store=store)
+    datastore.save(str(base / "studentsubjects.json"), {})
+    with pytest.raises(consistency.Changed):
+        consistency.repair(report)
+    assert json.loads((base / "sectionlist.json").read_text()) == ["AI"]
+
+
+def test_failed_write_reports_the_files_already_written(tmp_path, monkeypatch):
+    base, store = _data_dir(tmp_path)
+    report = consistency.check(str(base), store=store)
+
+    def broken(doc):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(store, "save", broken)
+    with pytest.raises(consistency.PartialRepair) as info:
+        consistency.repair(report)
+    assert info.value.done == ["sectionlist.json", "studentsubjects.json"]
+    assert info.value.failed == "attendance_master.json"
+
+    monkeypatch.undo()
+    consistency.repair(consistency.check(str(base), store=store))
+    assert consistency.check(str(base), store=store).issues == []
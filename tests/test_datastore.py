@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+
+import pytest
+
+import datastore
+
+
+def test_save_with_a_stale_version_conflicts(tmp_path):
+    path = str(tmp_path / "doc.json")
+    v1 = datastore.save(path, {"n": 1})
+    datastore.save(path, {"n": 2})
+    with pytest.raises(datastore.Conflict):
+        datastore.save(path, {"n": 3}, expected=v1)
+    assert datastore.load_fresh(path, None) == {"n": 2}
+
+
+def test_update_reruns_the_change_after_a_concurrent_save(tmp_path):
+    path = str(tmp_path / "doc.json")
+    datastore.save(path, {"items": []})
+    calls = []
+
+    def add(doc):
+        calls.append(1)
+        if len(calls) == 1:
+            # another writer saves between our read and our write
+            datastore.save(path, {"items": ["theirs"]})
+        doc["items"].append("ours")
+
+    datastore.update(path, {}, add)
+    assert len(calls) == 2
+    assert datastore.load_fresh(path, None) == {"items": ["theirs", "ours"]}
+
+
+def test_concurrent_updates_lose_nothing(tmp_path):
+    path = str(tmp_path / "counter.json")
+    datastore.save(path, {"n": 0})
+
+    def bump(doc):
+        doc["n"] += 1
+
+    def worker():
+        for _ in range(20):
+            datastore.update(path, {"n": 0}, bump)
+
+    threads = [threading.Thread(target=worker) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert datastore.load_fresh(path, None) == {"n": 80}
+
+
+def test_locked_is_reentrant(tmp_path):
+    path = str(tmp_path / "doc.json")
+    with datastore.locked(path):
+        with datastore.locked(path):
+            datastore.save(path, {"ok": True})
+    assert datastore.load(path, None) == {"ok": True}
+
+
+def _count_fsyncs(monkeypatch):
+    calls = []
+    real = os.fsync
+
+    def counting_fsync(fd):
+        calls.append(fd)
+        real(fd)
+
+    monkeypatch.setattr(os, "fsync", counting_fsync)
+    return calls
+
+
+def test_strict_durability_fsyncs_file_and_directory(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "DURABILITY", "strict")
+    calls = _count_fsyncs(monkeypatch)
+    with datastore.atomic_file(str(tmp_path / "doc.json"), encoding="utf-8") as f:
+        f.write("{}")
+    assert len(calls) == 2
+    assert (tmp_path / "doc.json").read_text() == "{}"
+
+
+def test_batched_durability_defers_fsyncs_to_flush(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "DURABILITY", "batched")
+    monkeypatch.setattr(datastore, "_last_flush", time.monotonic())
+    monkeypatch.setattr(datastore, "BATCH_INTERVAL", 3600)
+    datastore.flush()
+    calls = _count_fsyncs(monkeypatch)
+    path = str(tmp_path / "doc.json")
+    for n in range(3):
+        datastore.save(path, {"n": n})
+    assert calls == []
+    assert (os.path.abspath(path), False) in datastore._dirty
+    assert (str(tmp_path), True) in datastore._dirty
+
+    datastore.flush()
+    assert len(calls) == 2            # the file and its directory, once each
+    assert not datastore._dirty
+
+
+def test_batched_durability_flushes_once_the_interval_passed(tmp_path, monkeypatch):
+    monkeypatch.setattr(datastore, "DURABILITY", "batched")
+    monkeypatch.setattr(datastore, "_last_flush", 0.0)
+    calls = _count_fsyncs(monkeypatch)
+    datastore.save(str(tmp_path / "doc.json"), {"n": 1})
+    assert calls
+    assert not datastore._dirty
+
+
+@pytest.mark.parametrize("mode", ["strict", "batched"])
+def test_failed_write_leaves_the_target_and_no_temp_file(tmp_path, monkeypatch, mode):
+    monkeypatch.setattr(datastore, "DURABILITY", mode)
+    path = tmp_path / "doc.json"
+    path.write_text("old")
+    with pytest.raises(RuntimeError):
+        with datastore.atomic_file(str(path), encoding="utf-8") as f:
+            f.write("half")
+            raise RuntimeError("crash")
+    assert path.read_text() == "old"
+    assert os.listdir(tmp_path) == ["doc.json"]
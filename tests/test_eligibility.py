@@ -0,0 +1,78 @@
+import copy
+import json
+import random
+
+import pytest
+
+pytest.importorskip("numpy")
+
+import attendance_store  # noqa: E402
+import subject_catalogue  # noqa: E402
+import eligibility  # noqa: E402
+
+ROLLS = [f"2025{i:04d}" for i in range(12)]
+CODES = ["TMA101", "TCA101"]
+
+
+def _setup(tmp_path):
+    (tmp_path / "subjects.json").write_text(json.dumps({"subjects": [
+        {"name": "Basic Maths", "code": "TMA101"}, {"name": "C Programming", "code": "TCA101"}]}))
+    (tmp_path / "exam_date.json").write_text(json.dumps({"exam_schedule": [
+        {"subject_code": "TCA101", "exam_date": "2025-12-01", "attendance_cutoff": 60}]}))
+    store = attendance_store.JsonAttendanceStore(str(tmp_path / "attendance_master.json"))
+    store.ensure_students([(roll, roll, "AI", {"TMA101": "Basic Maths", "TCA101": "C Programming"})
+                           for roll in ROLLS])
+    catalogue = subject_catalogue.get_catalogue(str(tmp_path / "subjects.json"))
+    return store, catalogue, str(tmp_path / "exam_date.json")
+
+
+def test_incremental_updates_match_a_rebuild(tmp_path):
+    store, catalogue, exam_path = _setup(tmp_path)
+    engine = eligibility.EligibilityEngine(store, catalogue, exam_path)
+    try:
+        assert engine.results() == {}
+        rng = random.Random(7)
+        for _ in range(40):
+            store.apply([attendance_store.make_event(rng.choice(ROLLS), rng.choice(CODES),
+                                                     present=rng.random() < 0.7) for _ in range(5)])
+            incremental = engine.results()
+            fresh = eligibility.EligibilityEngine(store, catalogue, exam_path)
+            try:
+                assert incremental == fresh.results()
+            finally:
+                fresh.close()
+        assert engine.stats["rebuilds"] == 1
+        assert engine.stats["updates"] == 40
+    finally:
+        engine.close()
+
+
+def test_per_subject_cutoff_and_margin(tmp_path):
+    store, catalogue, exam_path = _setup(tmp_path)
+    engine = eligibility.EligibilityEngine(store, catalogue, exam_path)
+    try:
+        roll = ROLLS[0]
+        store.apply([attendance_store.make_event(roll, "TMA101", "set", 10, 7),
+                     attendance_store.make_event(roll, "TCA101", "set", 10, 7)])
+        assert engine.status(roll, "TMA101") == (eligibility.DEBARRED, 70.0)    # under 75
+        assert engine.status(roll, "TCA101") == (eligibility.ELIGIBLE, None)    # 70 >= 60 + 5
+        store.apply([attendance_store.make_event(roll, "TCA101", "set", 10, 6)])
+        assert engine.status(roll, "TCA101") == (eligibility.AT_RISK, 60.0)
+        assert engine.for_student(roll) == {"TMA101": (eligibility.DEBARRED, 70.0),
+                                            "TCA101": (eligibility.AT_RISK, 60.0)}
+    finally:
+        engine.close()
+
+
+def test_whole_document_write_triggers_a_rebuild(tmp_path):
+    store, catalogue, exam_path = _setup(tmp_path)
+    engine = eligibility.EligibilityEngine(store, catalogue, exam_path)
+    try:
+        engine.results()
+        doc = copy.deepcopy(store.load())
+        attendance_store.apply_event(doc, attendance_store.make_event(ROLLS[1], "TMA101", present=0))
+        store.save(doc)
+        assert engine.status(ROLLS[1], "TMA101") == (eligibility.DEBARRED, 0.0)
+        assert engine.stats["rebuilds"] == 2
+    finally:
+        engine.close()
@@ -0,0 +1,24 @@
+import pytest
+
+import datastore
+
+pytest.importorskip("tkinter")
+import gui  # noqa: E402
+
+
+def test_every_student_view_is_a_read_path():
+    views = [name for name in vars(gui.App) if name.startswith("student_") and name != "student_roll_and_section"]
+    assert len(views) == 6
+    for name in views:
+        assert hasattr(getattr(gui.App, name), "__wrapped__"), name
+
+
+def test_a_write_from_a_read_path_is_counted(tmp_path):
+    @gui.read_path
+    def student_view_example(self):
+        datastore.save(str(tmp_path / "x.json"), {})
+
+    datastore.reset_stats()
+    student_view_example(None)
+    assert datastore.stats()["read_path_writes"] == 1
+    assert ("student_view_example", str(tmp_path / "x.json")) in datastore.read_path_writes()
@@ -0,0 +1,57 @@
+import pytest
+
+import login
+
+
+@pytest.fixture
+def datafile(tmp_path, monkeypatch):
+    path = str(tmp_path / "userdata.bin")
+    monkeypatch.setattr(login, "DATAFILE", path)
+    return path
+
+
+def _user(users, name, role="student", password="secret1"):
+    salt = login.make_salt()
+    ans_salt = login.make_salt()
+    return users.add(name, role, salt, login.make_hash(password, salt), "Pet?", ans_salt,
+                     login.make_hash("rex", ans_salt))
+
+
+def test_appends_and_tombstones_round_trip(datafile):
+    users = login.load_users()
+    a = _user(users, "ayush")
+    assert login.save_user(users, a)
+    assert login.save_user(users, _user(users, "neha", "teacher"))
+    a.role = "admin"
+    assert login.save_user(users, a)
+    assert login.delete_user(users, "neha")
+
+    loaded = login.load_users()
+    assert [u.username for u in loaded] == ["ayush"]
+    assert loaded.find("ayush").role == "admin"
+    assert loaded.lines == 4
+
+
+def test_torn_append_is_dropped_not_completed(datafile):
+    users = login.load_users()
+    assert login.save_user(users, _user(users, "ayush"))
+    good = open(datafile, "rb").read()
+
+    # a crash part-way through a record, inside its ans_hash
+    torn = ":".join(_user(login.UserRegistry(), "ghost").record())
+    with open(datafile, "ab") as f:
+        f.write(torn[:-10].encode("utf-8"))
+    assert [u.username for u in login.load_users()] == ["ayush"]
+
+    users = login.load_users()
+    assert login.save_user(users, _user(users, "neha"))
+    data = open(datafile, "rb").read()
+    assert data.startswith(good) and b"ghost" not in data
+    assert [u.username for u in login.load_users()] == ["ayush", "neha"]
+
+
+def test_rows_with_truncated_hashes_are_rejected():
+    rec = ":".join(_user(login.UserRegistry(), "ghost").record())
+    assert login._parse_user_line((rec + "\n").encode()) is not None
+    assert login._parse_user_line((rec[:-10] + "\n").encode()) is None
+    assert login._parse_user_line(rec.encode()) is None
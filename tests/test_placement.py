@@ -0,0 +1,55 @@
+import json
+
+import pytest
+
+import datastore
+import attendance_store
+import placement
+
+CHANGES = [("20250001", "a", None, "AI", ["Basic Maths"])]
+
+
+def _setup(tmp_path):
+    (tmp_path / "sections.json").write_text("{}")
+    (tmp_path / "teachersections.json").write_text("{}")
+    return str(tmp_path), attendance_store.JsonAttendanceStore(str(tmp_path / "attendance_master.json"))
+
+
+def _read(tmp_path, name):
+    path = tmp_path / name
+    return json.loads(path.read_text()) if path.exists() else None
+
+
+def test_failed_attendance_step_writes_nothing(tmp_path, monkeypatch):
+    base, store = _setup(tmp_path)
+
+    def broken(students):
+        raise OSError("journal busy")
+
+    monkeypatch.setattr(store, "ensure_students", broken)
+    with pytest.raises(OSError):
+        placement.commit(CHANGES, base, subject_key=lambda nm: "TMA101", store=store)
+    assert _read(tmp_path, "sections.json") == {}
+    assert _read(tmp_path, "studentsubjects.json") is None
+
+
+def test_later_failure_reports_the_partial_commit(tmp_path, monkeypatch):
+    base, store = _setup(tmp_path)
+    real_update = datastore.update
+
+    def broken_update(path, default, change, *args, **kwargs):
+        if path.endswith("studentsubjects.json"):
+            raise OSError("disk full")
+        return real_update(path, default, change, *args, **kwargs)
+
+    monkeypatch.setattr(datastore, "update", broken_update)
+    with pytest.raises(placement.PartialCommit) as info:
+        placement.commit(CHANGES, base, subject_key=lambda nm: "TMA101", store=store)
+    assert info.value.done == ["attendance", "sections"]
+    assert info.value.failed == "studentsubjects"
+    assert store.get_record("20250001") is not None
+
+    monkeypatch.setattr(datastore, "update", real_update)
+    timings = placement.commit(CHANGES, base, subject_key=lambda nm: "TMA101", store=store)
+    assert list(timings) == ["attendance", "sections", "studentsubjects"]
+    assert _read(tmp_path, "studentsubjects.json") == {"20250001": {"section": "AI", "subjects": ["Basic Maths"]}}
@@ -0,0 +1,81 @@
+import csv
+import json
+
+import pytest
+
+import login
+import provision
+import subject
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(login, "DATAFILE", str(tmp_path / "userdata.bin"))
+    monkeypatch.chdir(tmp_path)   # subject.py resolves rollnumbers.json here
+    return tmp_path
+
+
+def _csv(path, rows):
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        w = csv.writer(f)
+        w.writerow(["username", "role", "initial_password", "security_question", "security_answer"])
+        w.writerows(rows)
+    return str(path)
+
+
+def _rows(n, role="student"):
+    return [(f"{role}{i:03d}", role, f"pass{i:04d}", "Pet?", "rex") for i in range(n)]
+
+
+def test_large_files_are_hashed_in_a_process_pool(data_dir, monkeypatch):
+    pools = []
+
+    class RecordingPool(provision.ProcessPoolExecutor):
+        def __init__(self, *args, **kwargs):
+            pools.append(kwargs)
+            super().__init__(*args, **kwargs)
+
+    monkeypatch.setattr(provision, "ProcessPoolExecutor", RecordingPool)
+    rows = _rows(provision.POOL_THRESHOLD, "student") + _rows(3, "teacher")
+    result = provision.bulk_import(_csv(data_dir / "in.csv", rows), workers=2)
+
+    assert pools == [{"max_workers": 2}]
+    assert (result["created"], result["failed"]) == (len(rows), 0)
+    users = login.load_users()
+    first = users.find("student000")
+    assert first.pwd_hash == login.make_hash("pass0000", first.salt)
+    assert subject.lookupRollNumber("teacher002", "teacher") == result["rolls"]["teacher002"]
+
+
+def test_small_files_stay_in_process(data_dir, monkeypatch):
+    monkeypatch.setattr(provision, "ProcessPoolExecutor", None)
+    result = provision.bulk_import(_csv(data_dir / "in.csv", _rows(3)))
+    assert result["created"] == 3
+
+
+def test_invalid_rows_are_reported_not_created(data_dir):
+    rows = _rows(2) + [("student000", "student", "pass0000", "Pet?", "rex"),   # duplicate
+                       ("x", "admin", "pass0000", "Pet?", "rex"),
+                       ("y", "student", "abc", "Pet?", "rex")]
+    report = data_dir / "errors.csv"
+    result = provision.bulk_import(_csv(data_dir / "in.csv", rows), report_path=str(report))
+    assert (result["created"], result["failed"]) == (2, 3)
+    assert [line[1] for line in csv.reader(open(report, encoding="utf-8"))][1:] == ["student000", "x", "y"]
+
+
+def test_no_roll_numbers_when_saving_the_accounts_fails(data_dir, monkeypatch):
+    monkeypatch.setattr(login, "save_many", lambda users, changed: False)
+    users = login.load_users()
+    with pytest.raises(OSError):
+        provision.bulk_import(_csv(data_dir / "in.csv", _rows(3)), users=users)
+    assert users.find("student000") is None
+    assert not (data_dir / "rollnumbers.json").exists()
+
+
+def test_dry_run_writes_nothing(data_dir):
+    path = data_dir / "in.jsonl"
+    path.write_text("\n".join(json.dumps(dict(zip(["username", "role", "password", "question", "answer"], r)))
+                              for r in _rows(2)) + "\n")
+    result = provision.bulk_import(str(path), dry_run=True)
+    assert (result["valid"], result["created"]) == (2, 0)
+    assert not (data_dir / "userdata.bin").exists()
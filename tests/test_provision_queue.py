@@ -0,0 +1,54 @@
+import json
+
+import datastore
+import rollnumbers
+import attendance_store
+import provision_queue
+
+
+def _write(path, doc):
+    path.write_text(json.dumps(doc), encoding="utf-8")
+
+
+def _data_dir(tmp_path):
+    _write(tmp_path / "subjects.json", {"subjects": [{"name": "Basic Maths", "code": "TMA101"}]})
+    _write(tmp_path / "sections.json", {"20250001": "AI"})
+    _write(tmp_path / "sectionsubjects.json", {"AI": ["Basic Maths"]})
+    _write(tmp_path / "rollnumbers.json", {"map": {"student": {"ayush": "20250001"}}, "counters": {"student": 1}})
+    return tmp_path
+
+
+def test_requests_are_deduplicated_and_do_not_count_as_read_writes(tmp_path):
+    queue = provision_queue.get_queue(provision_queue.queue_path_for(_data_dir(tmp_path)))
+    datastore.reset_stats()
+    with datastore.read_only("test"):
+        assert queue.request_roll("ghost")
+        assert not queue.request_roll("ghost")
+        assert not queue.request_roll("ghost")
+    assert len(queue.pending()) == 1
+    assert datastore.stats()["read_path_writes"] == 0
+
+
+def test_write_inside_read_only_is_flagged(tmp_path):
+    registry = rollnumbers.get_registry(str(_data_dir(tmp_path) / "rollnumbers.json"))
+    datastore.reset_stats()
+    with datastore.read_only("test"):
+        registry.get_or_allocate("ghost")
+    assert datastore.stats()["read_path_writes"] == 1
+    assert [label for label, _ in datastore.read_path_writes()] == ["test"]
+
+
+def test_drain_allocates_and_seeds(tmp_path):
+    base = _data_dir(tmp_path)
+    queue = provision_queue.get_queue(provision_queue.queue_path_for(base))
+    queue.request_roll("ghost")
+    queue.request_attendance("20250001")
+    store = attendance_store.JsonAttendanceStore(str(base / "attendance_master.json"))
+
+    result = queue.drain(store)
+
+    assert (result["rolls"], result["attendance"], result["skipped"]) == (1, 1, 0)
+    assert rollnumbers.get_registry(str(base / "rollnumbers.json")).lookup("ghost") == "20250002"
+    assert list(store.get_record("20250001")["subjects"]) == ["TMA101"]
+    assert queue.pending() == []
+    assert queue.request_roll("ghost")  # a drained request can be queued again
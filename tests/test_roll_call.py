@@ -0,0 +1,70 @@
+import io
+
+import pytest
+
+import attendance
+
+ROLLS = ["1", "2", "3", "4"]
+
+
+class Roster:
+    def sections_of(self, teacher):
+        return ["AI"]
+
+    def rolls_in(self, section):
+        return list(ROLLS)
+
+
+class Catalogue:
+    def resolve(self, code):
+        return "TMA101"
+
+    def name_for(self, code):
+        return "Basic Maths"
+
+
+@pytest.fixture
+def roll_call(tmp_path, monkeypatch):
+    sessions = []
+    monkeypatch.setattr(attendance, "_resolve_path", lambda name: str(tmp_path / name))
+    monkeypatch.setattr(attendance, "get_roster", Roster)
+    monkeypatch.setattr(attendance, "get_subject_catalogue", Catalogue)
+    monkeypatch.setattr(attendance, "take_session", lambda *args, **kwargs: sessions.append((args, kwargs)) or {
+        "present": len(args[3]), "students": len(kwargs["marked"]), "changed": len(kwargs["marked"])})
+
+    def run(keys, save="y"):
+        answers = iter(["tma101", "2025-11-03", save])
+        keys = iter(keys)
+        monkeypatch.setattr("builtins.input", lambda prompt="": next(answers))
+        monkeypatch.setattr(attendance, "_read_key", lambda: next(keys))
+        attendance.roll_call_interactive("t")
+        return sessions
+    return run
+
+
+def test_keys_mark_skip_and_undo(roll_call):
+    # p, a, skip, undo (back to 3), a, unknown key, p
+    sessions = roll_call(["p", "a", " ", "u", "a", "x", "p"])
+    (args, kwargs), = sessions
+    assert args[:5] == ("t", "AI", "TMA101", ["1", "4"], "2025-11-03")
+    assert kwargs["marked"] == {"1": True, "2": False, "3": False, "4": True}
+
+
+def test_quit_keeps_what_was_marked(roll_call):
+    (args, kwargs), = roll_call(["P", "\r", "q"])
+    assert args[3] == ["1"]
+    assert kwargs["marked"] == {"1": True}
+
+
+def test_undo_at_the_first_student_does_nothing(roll_call):
+    (_, kwargs), = roll_call(["\x7f", "a", "a", "a", "a"])
+    assert kwargs["marked"] == dict.fromkeys(ROLLS, False)
+
+
+def test_discarded_roll_call_saves_nothing(roll_call):
+    assert roll_call(["p", "p", "p", "p"], save="n") == []
+
+
+def test_read_key_without_a_terminal_reads_lines(monkeypatch):
+    monkeypatch.setattr("sys.stdin", io.StringIO("p\n\nabsent\n"))
+    assert [attendance._read_key() for _ in range(4)] == ["p", "\n", "a", "q"]
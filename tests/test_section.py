@@ -0,0 +1,13 @@
+import os
+
+import attendance
+import section
+import topics
+
+
+def test_roster_uses_the_same_files_as_attendance(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    ours, theirs = section.getRoster(), attendance.get_roster()
+    assert ours is theirs is topics.get_roster()
+    root = os.path.abspath(os.path.join(os.path.dirname(section.__file__), ".."))
+    assert ours.sections_path == os.path.join(root, section.sectionsFile)
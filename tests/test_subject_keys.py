@@ -0,0 +1,72 @@
+import json
+
+import pytest
+
+import attendance_store
+import subject_catalogue
+import subject_keys
+
+
+@pytest.fixture
+def setup(tmp_path, monkeypatch):
+    monkeypatch.setattr(subject_catalogue, "COMPAT", None)
+    (tmp_path / "subjects.json").write_text(json.dumps({"subjects": [
+        {"name": "Basic Maths", "code": "TMA101"}, {"name": "C Lang", "code": "TCA101"}]}), encoding="utf-8")
+    master = str(tmp_path / "attendance_master.json")
+    store = attendance_store.JsonAttendanceStore(master)
+    store.ensure_students([(str(r), str(r), "AI", {"Basic Maths": "Basic Maths", "TCA101": "C Lang"})
+                           for r in range(1, 6)])
+    store.ensure_students([("1", "1", "AI", {"TMA101": "Basic Maths"})], fill_subjects=True)
+    store.apply([attendance_store.make_event("1", "Basic Maths"), attendance_store.make_event("1", "TMA101")])
+    catalogue = subject_catalogue.get_catalogue(str(tmp_path / "subjects.json"))
+    return store, catalogue, subject_keys.checkpoint_path_for(master)
+
+
+def test_migrate_rekeys_and_merges(setup):
+    store, catalogue, checkpoint = setup
+    state = subject_keys.migrate(store, catalogue, checkpoint, batch=2)
+    assert state["complete"] and state["rolls"] == 5
+    assert (state["rekeyed"], state["merged"]) == (5, 1)
+    records = store.load()["attendance_records"]
+    assert all(sorted(rec["subjects"]) == ["TCA101", "TMA101"] for rec in records.values())
+    assert attendance_store.counts_of(store.load(), "1", "TMA101") == (2, 2)
+    # idempotent
+    again = subject_keys.migrate(store, catalogue, checkpoint, restart=True)
+    assert (again["rekeyed"], again["merged"]) == (0, 0)
+
+
+def test_migrate_resumes_from_the_checkpoint(setup, monkeypatch):
+    store, catalogue, checkpoint = setup
+    real = store.rekey_subjects
+    calls = []
+
+    def crash_after_first(changes):
+        if calls:
+            raise KeyboardInterrupt
+        calls.append(changes)
+        return real(changes)
+
+    monkeypatch.setattr(store, "rekey_subjects", crash_after_first)
+    with pytest.raises(KeyboardInterrupt):
+        subject_keys.migrate(store, catalogue, checkpoint, batch=2)
+    monkeypatch.setattr(store, "rekey_subjects", real)
+    partial = subject_keys.load_checkpoint(checkpoint)
+    assert (partial["last"], partial["rolls"], partial["complete"]) == ("2", 2, False)
+
+    state = subject_keys.migrate(store, catalogue, checkpoint, batch=2)
+    assert state["complete"] and state["rolls"] == 5
+
+
+def test_name_key_fallback_turns_off_when_the_migration_completes(setup):
+    store, catalogue, checkpoint = setup
+    legacy = {"Basic Maths": {}}
+    assert catalogue.compat()
+    assert catalogue.record_key(legacy, "TMA101") == "Basic Maths"
+
+    subject_keys.migrate(store, catalogue, checkpoint, dry_run=True)
+    assert catalogue.compat()                      # a dry run does not count
+
+    subject_keys.migrate(store, catalogue, checkpoint)
+    assert not catalogue.compat()
+    assert catalogue.record_key(legacy, "TMA101") is None
+    assert catalogue.record_key({"TMA101": {}}, "Basic Maths") == "TMA101"
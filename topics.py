@@ -2,6 +2,9 @@ import json
 import os
 from datetime import datetime
 
+import datastore
+import roster
+
 TOPICS_FILE = "topics.json"
 TEACHER_SECTIONS_FILE = "teachersections.json"
 STUDENT_FILE = "students.json"  # used for student section lookup
@@ -12,17 +15,16 @@ SECTIONS_FILE = "sections.json"
 # -----------------------------------------------------------
 
 def load_json(filename):
-    if not os.path.exists(filename):
+    try:
+        return datastore.load(filename, {})
+    except json.JSONDecodeError:
         return {}
-    with open(filename, "r") as f:
-        try:
-            return json.load(f)
-        except json.JSONDecodeError:
-            return {}
 
 def save_json(filename, data):
-    with open(filename, "w") as f:
-        json.dump(data, f, indent=2)
+    datastore.save(filename, data)
+
+def update_json(filename, change):
+    return datastore.update(filename, {}, change)
 
 # -----------------------------------------------------------
 # Load teacher sections (from teachersections.json)
@@ -32,19 +34,18 @@ def load_teacher_sections():
     data = load_json(TEACHER_SECTIONS_FILE)
     return data if isinstance(data, dict) else {}
 
+def get_roster():
+    # Same project-root files as section.getRoster (and attendance.get_roster)
+    base_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+    return roster.get_roster(os.path.join(base_dir, SECTIONS_FILE), os.path.join(base_dir, TEACHER_SECTIONS_FILE))
+
 # -----------------------------------------------------------
 # Add topics for the section(s) assigned to the teacher
 # -----------------------------------------------------------
 
 def add_topic(teacher_name):
-    teacher_sections = load_teacher_sections()
-    teacher_name_lower = teacher_name.lower()
-
-    # Find all sections assigned to this teacher
-    assigned_sections = [
-        sec for sec, tname in teacher_sections.items()
-        if tname.lower() == teacher_name_lower
-    ]
+    # Find all sections assigned to this teacher (teachersections.json is teacher -> [sections])
+    assigned_sections = get_roster().sections_of(teacher_name)
 
     if not assigned_sections:
         print("You are not assigned to any section. Contact admin.")
@@ -73,18 +74,17 @@ def add_topic(teacher_name):
 
     date = datetime.now().strftime("%d/%m/%Y")
 
-    topics_data = load_json(TOPICS_FILE)
-
-    if section not in topics_data:
-        topics_data[section] = []
+    def add(topics_data):
+        if section not in topics_data:
+            topics_data[section] = []
 
-    topics_data[section].append({
-        "teacher": teacher_name,
-        "topic": topic,
-        "date": date
-    })
+        topics_data[section].append({
+            "teacher": teacher_name,
+            "topic": topic,
+            "date": date
+        })
 
-    save_json(TOPICS_FILE, topics_data)
+    update_json(TOPICS_FILE, add)
     print(f"Topic '{topic}' added successfully for section {section} on {date}.")
 
 # -----------------------------------------------------------
@@ -101,8 +101,7 @@ def view_topics_for_student(student_id):
         return
 
     # --- Step 2: Load student's section from sections.json ---
-    with open("sections.json", "r") as f:
-        sections_data = json.load(f)
+    sections_data = load_json(SECTIONS_FILE)
 
     student_section = sections_data.get(student_id)
     if not student_section:
@@ -110,8 +109,7 @@ def view_topics_for_student(student_id):
         return
 
     # --- Step 3: Load topics for that section from topics.json ---
-    with open("topics.json", "r") as f:
-        topics_data = json.load(f)
+    topics_data = load_json(TOPICS_FILE)
 
     section_topics = topics_data.get(student_section)
     if not section_topics: